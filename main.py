@@ -1,13 +1,17 @@
 import os
 import cv2
-import time
+import json
 import threading
 
 from dotenv import load_dotenv
 from src.servo.mover import MoveServo
 from src.expression.display_face import preload_images, display_face_fast
-from src.cv.classifier import BotClassifier, inference_worker
-from src.bt_function.bt_config_v2 import PodomoroBT
+from src.cv.classifier import REPLAYING, BotClassifier, inference_worker, open_camera
+from src.control.scheduler import EventScheduler
+from src.control.effects import EffectsExecutor
+from src.control.pomodoro_fsm import PomodoroFSM, VisionEvent
+from src.audio.audio_player import play_audio
+from src.hal import MOCK as HAL_MOCK, report as hal_report
 
 load_dotenv()
 
@@ -19,74 +23,223 @@ BOT_CONF_THRESH = float(os.getenv("BOT_CONF_THRESH", "0.25"))
 BOT_LABEL_CONF_THRESH = float(os.getenv("BOT_LABEL_CONF_THRESH", "0.6"))
 BOT_STATUS_CONF_THRESH = float(os.getenv("BOT_STATUS_CONF_THRESH", "0.85"))
 
+# Maks waktu thread classifier-feeder menunggu sample kamera baru (kamera dibaca thread sendiri)
+CLASSIFIER_WAIT = int(os.getenv("BOT_LOOP_WAIT_MS", "50")) / 1000.0
+
 # BOT_CAM_URL = os.getenv("CAM_URL", "http://10.238.183.49:81/stream")
 
 BT_UUID = os.getenv("BT_UUID", "not-so-random-uuid")
 BT_BUFFER_SIZE = int(os.getenv("BT_BUFFER_SIZE", "1024"))
 
+# Audio (file hasil src/audio/audio_player.py), diputar lewat effects executor
+BOT_SOUND = os.getenv("BOT_SOUND", "1") == "1"
+BOT_AUDIO_DIR = os.getenv("BOT_AUDIO_DIR", "audio")
+BOT_AUDIO_PLAYER = tuple(os.getenv("BOT_AUDIO_PLAYER", "mpg123 -q").split())
+
+# Benchmark / CI (biasanya dengan BOT_HAL=mock): berhenti setelah N detik (0 = sampai kamera habis),
+# lalu tulis stats + timeline perangkat palsu ke BOT_MOCK_REPORT (JSON)
+BOT_MOCK_DURATION_S = float(os.getenv("BOT_MOCK_DURATION_S", "0"))
+BOT_MOCK_REPORT = os.getenv("BOT_MOCK_REPORT", "")
+
 POMODORO_CONF = {
     "work_time": 25 * 60,
     "break_time": 5 * 60
 }
 
+# Jendela waktu (detik): gesture konfirmasi diterima antara OPEN dan CLOSE setelah ditanya
+CONFIRM_OPEN_S = 3
+CONFIRM_CLOSE_S = 6
+REMINDER_S = 3
+TRANSITION_S = 3
+
 # Preload Setup
-bot_bt = PodomoroBT(BT_UUID)
+if HAL_MOCK:
+    # Tanpa stack Bluetooth (bless/BlueZ) di mode mock; panggilan bot_bt di bawah masih dikomentari
+    bot_bt = None
+else:
+    from src.bt_function.bt_config_v2 import PodomoroBT
+    bot_bt = PodomoroBT(BT_UUID)
 servo = MoveServo(pin=BOT_SERVO_PIN)
-cap = cv2.VideoCapture(0, cv2.CAP_V4L2)
+cap = open_camera(0)
+scheduler = EventScheduler()
+cv_classifier = None
 
-bot_detection_status = "Idle" # Idle, Working, Break
-is_pomodoro_timer_running = False
-is_being_reminded = False
-is_await_confirmation = False
-is_on_transition = False
-
-timer_second = 0
-confirmation_delay = 0
-reminder_time = 0
-transition_time = 0
+# Servo & suara: perintah baru membatalkan yang sedang jalan. Display: latest-wins.
+effects = EffectsExecutor()
+effects.add_device("servo", pass_cancel=True)
+effects.add_device("display", coalesce=True)
+effects.add_device("sound", pass_cancel=True)
 
+# Task aktif dari aplikasi (bot_bt.get_most_recent_todo() saat pomodoro dimulai)
 current_task = None
 
-def start_podomoro(*servo: MoveServo):
+# -------- EFFECTS (tidak pernah blocking thread kontrol) --------
+
+def show_face(face_id):
+    effects.submit("display", face_id, display_face_fast, face_id)
+
+def move_servo(name, fn, *args):
+    effects.submit("servo", name, fn, *args, supersede=True)
+
+def play_sound(state):
+    if BOT_SOUND:
+        effects.submit("sound", state, play_audio, state, BOT_AUDIO_DIR, BOT_AUDIO_PLAYER, supersede=True)
+
+def start_podomoro(servo: MoveServo):
     print("Pomodoro Work Timer Started")
-    display_face_fast("working")
-    servo.work_move(POMODORO_CONF["work_time"])
+    show_face("working")
+    play_sound("WORK_SESSION_START")
+    move_servo("work_move", servo.work_move, POMODORO_CONF["work_time"])
 
-def break_podomoro(*servo: MoveServo):
+def break_podomoro(servo: MoveServo):
     print("Pomodoro Break Timer Started")
-    display_face_fast("break")
-    servo.break_move(POMODORO_CONF["break_time"])
+    show_face("break")
+    play_sound("BREAK_SESSION_START")
+    move_servo("break_move", servo.break_move, POMODORO_CONF["break_time"])
 
-def stop_podomoro(*servo: MoveServo):
+def stop_podomoro(servo: MoveServo):
     print("Pomodoro Break Timer Stopped")
-    display_face_fast("idle")
-    servo.default_move()
+    show_face("idle")
+    # Membatalkan sweep work/break yang sedang berjalan
+    move_servo("default_move", servo.default_move)
 
 def transition_podomoro(transition_type):
     if transition_type == "break":
         print("It is time to break")
-        display_face_fast("idle")
-        time.sleep(3)
+        show_face("idle")
     if transition_type == "working":
         print("It is time to working")
-        display_face_fast("idle")
-        time.sleep(3)
+        show_face("idle")
 
-def distraction_reminder(result):
-    print(f"Distraction detected! Label: {result['label']} | Confidence: {result['confidence']}")
-    display_face_fast("distracted")
+def distraction_reminder(event):
+    print(f"Distraction detected! Label: {event.label} | Confidence: {event.confidence}")
+    show_face("distracted")
+    play_sound("DISTRACTION_DETECTED")
 
 def break_reminder():
     print("Human detected! It is time to break")
-    display_face_fast("break-reminder")
+    show_face("break-reminder")
+    play_sound("BREAK_REMINDER")
 
 def asking_confirmation(confirm_to):
     if confirm_to == "task-done":
         print("Is your task finished?")
-        display_face_fast("loading")
+        show_face("loading")
     if confirm_to == "end":
         print("Are you sure going to end pomodoro timer?")
-        display_face_fast("loading")
+        show_face("loading")
+
+def task_todo():
+    # bot_bt.update_task_status(current_task["task_id"], "TODO")
+    print("task returned to todo")
+
+def task_finished():
+    # bot_bt.update_task_status(current_task["task_id"], "FINISHED")
+    print("task updated to finished")
+
+# -------- DECISION (src/control/pomodoro_fsm.py) --------
+
+# Output state machine -> efek perangkat
+OUTPUTS = {
+    "start_work": lambda arg: start_podomoro(servo),
+    "start_break": lambda arg: break_podomoro(servo),
+    "stop": lambda arg: stop_podomoro(servo),
+    "transition": transition_podomoro,
+    "ask_confirmation": asking_confirmation,
+    "remind_distraction": distraction_reminder,
+    "remind_break": lambda arg: break_reminder(),
+    "task_todo": lambda arg: task_todo(),
+    "task_finished": lambda arg: task_finished(),
+}
+
+def on_output(name, arg, now):
+    OUTPUTS[name](arg)
+
+fsm = PomodoroFSM(
+    work_time=POMODORO_CONF["work_time"],
+    break_time=POMODORO_CONF["break_time"],
+    confirm_open=CONFIRM_OPEN_S,
+    confirm_close=CONFIRM_CLOSE_S,
+    reminder=REMINDER_S,
+    transition=TRANSITION_S,
+    on_output=on_output,
+)
+fsm_timer = None
+# Replay: clock FSM = capture_ts rekaman terakhir, bukan wall clock (CV_REPLAY_REALTIME=0 memampatkan waktu)
+replay_clock = None
+
+def schedule_fsm_timer():
+    """Satu wakeup scheduler pada deadline FSM berikutnya (akhir fase, jendela konfirmasi, dst.)."""
+    global fsm_timer
+
+    if REPLAYING:
+        # Timer dijalankan fsm.advance pada timeline rekaman, lihat on_vision
+        return
+    due = fsm.next_deadline()
+    if fsm_timer is not None:
+        if fsm_timer.due == due and not fsm_timer.cancelled:
+            return
+        fsm_timer.cancel()
+    fsm_timer = scheduler.call_at(due, on_fsm_timer) if due != float("inf") else None
+
+def sync_sampler_state():
+    # State bot menentukan rate sampling kamera (idle lambat, konfirmasi cepat)
+    if cv_classifier is not None:
+        cv_classifier.set_state(fsm.state, fsm.awaiting is not None)
+
+def on_fsm_timer():
+    global fsm_timer
+
+    fsm_timer = None
+    # Fase selesai tepat waktu walaupun tidak ada hasil vision baru
+    effects.set_trigger(None)
+    fsm.advance(scheduler.now())
+    sync_sampler_state()
+    schedule_fsm_timer()
+
+def on_vision(status, result):
+    """Hasil vision baru (di-post thread receiver ke scheduler). status = "Working" | "Distracted". result = {"found": boolean; "label": string; "confidence": float}"""
+    global replay_clock
+
+    print(f"Status: {status} | Result: {result}")
+    now = scheduler.now()
+    if REPLAYING:
+        capture_ts = result.get("capture_ts")
+        if capture_ts is not None:
+            replay_clock = capture_ts if replay_clock is None else max(replay_clock, capture_ts)
+        now = replay_clock if replay_clock is not None else 0.0
+        # Timer yang jatuh tempo sebelum frame ini dijalankan dulu, tanpa frame pemicu
+        effects.set_trigger(None)
+        fsm.advance(now)
+
+    # Latency reaksi efek dihitung dari waktu capture frame pemicu
+    effects.set_trigger(result.get("capture_ts"))
+    fsm.dispatch(VisionEvent.from_result(status, result, BOT_STATUS_CONF_THRESH), now)
+    sync_sampler_state()
+    schedule_fsm_timer()
+
+def check_replay_finished():
+    if cv_classifier is not None and cv_classifier.finished:
+        finish_run("Replay finished")
+
+def finish_run(reason):
+    stats = {
+        "classifier": cv_classifier.stats(),
+        "effects": effects.stats(),
+        "pomodoro": fsm.stats(),
+        "scheduler": scheduler.stats(),
+    }
+    print(f"[BOT] {reason}: {stats['classifier']}")
+    print(f"[BOT] Effects: {stats['effects']}")
+    print(f"[BOT] Pomodoro: {stats['pomodoro']}")
+
+    if BOT_MOCK_REPORT:
+        if HAL_MOCK:
+            stats["hal"] = hal_report()
+        with open(BOT_MOCK_REPORT, "w") as f:
+            json.dump(stats, f, indent=2, default=str)
+        print(f"[BOT] Report saved to {BOT_MOCK_REPORT}")
+    scheduler.stop()
 
 # ----------------------------------------------------------------------------------------------------
 
@@ -94,18 +247,7 @@ def main():
     # Preload Setup
     global POMODORO_CONF
 
-    global bot_detection_status
-    global is_pomodoro_timer_running
-    global is_being_reminded
-    global is_await_confirmation
-    global is_on_transition
-
-    global timer_second
-    global confirmation_delay
-    global reminder_time
-    global transition_time
-
-    global current_task
+    global cv_classifier
 
     global bot_bt
     global servo
@@ -128,14 +270,26 @@ def main():
     worker_t.start()
 
     # First Boot Scene
-    servo.taunt()
-    display_face_fast("idle")
+    move_servo("taunt", servo.taunt)
+    show_face("idle")
     # Play Sound: Hallo, Podomoro siap berjalan
-    time.sleep(3.5)
+    play_sound("SYSTEM_READY")
+
+    # Boot scene 3.5 detik sebagai event terjadwal (thread kontrol tidak tidur)
+    scheduler.call_later(3.5, finish_boot)
+    scheduler.call_every(0.5, check_replay_finished)
+    if BOT_MOCK_DURATION_S > 0:
+        scheduler.call_later(BOT_MOCK_DURATION_S, finish_run, f"Stopped after {BOT_MOCK_DURATION_S:g}s")
+    scheduler.run_forever()
 
+    # Replay / durasi selesai
+    cv_classifier.stop()
+    effects.shutdown()
+    servo.cleanup()
 
+def finish_boot():
     # Connecting to Bluetooth
-    display_face_fast("loading")
+    show_face("loading")
     # bot_bt.start_server()
     # Play Sound: Bluetooth Connected
 
@@ -145,140 +299,15 @@ def main():
     if response is not None:
         POMODORO_CONF["work_time"] = response["work_time"]
         POMODORO_CONF["break_time"] = response["break_time"]
-    display_face_fast("connected")
+        fsm.work_time = POMODORO_CONF["work_time"]
+        fsm.break_time = POMODORO_CONF["break_time"]
+    show_face("connected")
 
     #--- Main Loop ---
-    display_face_fast("idle")
-    prev_sec = 0 # time now
-
-    while True:
-        current_sec = 0 # time now
-
-        # One Second Timer
-        if prev_sec - current_sec >= 1:
-            prev_sec = current_sec
-
-            if is_pomodoro_timer_running is True and timer_second > 0:
-                timer_second -= 1
-            if is_await_confirmation is True and confirmation_delay < 3:
-                confirmation_delay += 1
-            if is_being_reminded is True and reminder_time < 3:
-                reminder_time += 1
-            if is_on_transition is True and transition_time < 3:
-                transition_time += 1
-        
-        status, result = cv_classifier.classifier_loop() # status = "Working" | "Distracted". result = {"found": boolean; "label": string; "confidence": float}
-
-        print(f"Status: {status} | Result: {result}")
-
-        if is_on_transition is True and transition_time < 3:
-            continue
-
-        if is_on_transition is True and transition_time >= 3:
-            is_on_transition = False
-            transition_time = 0
-
-        # --- Idle Logic ---
-        if bot_detection_status == "Idle":
-            if is_pomodoro_timer_running is False and result["label"] == "start_pomodoro" and result["confidence"] > BOT_STATUS_CONF_THRESH:
-                # current_task = bot_bt.get_most_recent_todo()
-
-                # if current_task is None:
-                #     continue
-
-                # bot_bt.update_task_status(current_task["task_id"], "ONGOING")
-                
-                bot_detection_status = "Working"
-                is_pomodoro_timer_running = True
-                timer_second = POMODORO_CONF["work_time"]
-                start_podomoro(servo)
-                continue
-        
-        # --- Working Logic ---
-        if bot_detection_status == "Working":
-            print("is Working")
-            
-            if is_being_reminded is True and reminder_time >= 3:
-                is_being_reminded = False
-                reminder_time = 0
-
-            if is_await_confirmation is True:
-                if confirmation_delay > 2 and confirmation_delay < 6:
-                    if result["label"] == "stop_pomodoro" and result["confidence"] > BOT_STATUS_CONF_THRESH:
-                        print("[BOT] Stopping the pomodoro")
-
-                        # bot_bt.update_task_status(current_task["task_id"], "TODO")
-
-                        bot_detection_status = "Idle"
-                        is_pomodoro_timer_running = False
-                        timer_second = 0
-                        stop_podomoro(servo)
-                        continue
-
-                if confirmation_delay >= 6:
-                    is_await_confirmation = False
-                    confirmation_delay = 0
-
-            if result["label"] == "stop_pomodoro" and result["confidence"] > BOT_STATUS_CONF_THRESH and is_await_confirmation is False:
-                print("[BOT] Stop gesture detected, asking for confirmation")
-                
-                is_await_confirmation = True
-                asking_confirmation("end")
-                continue
-
-            if status == "Distracted":
-                if is_being_reminded is False:
-                    is_being_reminded = True
-                    distraction_reminder(result=result)
-                    continue
-            
-            if timer_second == 0:
-                is_pomodoro_timer_running = False
-                transition_podomoro("break")
-                bot_detection_status = "Break"
-                continue
-        
-        # --- Break Logic ---
-        if bot_detection_status == "Break":
-            print("is on break")
-
-            if is_await_confirmation is True:
-                if confirmation_delay > 2 and confirmation_delay < 6:
-                    if result["label"] == "stop_pomodoro" and result["confidence"] > BOT_STATUS_CONF_THRESH:
-                        # bot_bt.update_task_status(current_task["task_id"], "TODO")
-                        print("task returned to todo")
-
-                    if result["label"] == "start_pomodoro" and result["confidence"] > BOT_STATUS_CONF_THRESH:
-                        # bot_bt.update_task_status(current_task["task_id"], "FINISHED")
-                        print("task updated to finished")
-                    
-                    bot_detection_status = "Idle"
-                    is_pomodoro_timer_running = False
-                    timer_second = 0
-                    stop_podomoro(servo)
-                    continue
-                
-                if confirmation_delay >= 6:
-                    is_await_confirmation = False
-                    confirmation_delay = 0
-
-            if result["found"] is True:
-                if result["label"] == "stop_pomodoro" and result["confidence"] > BOT_STATUS_CONF_THRESH and is_await_confirmation is False:
-                    print("[BOT] Stop gesture detected, asking for task done confirmation")
-                    
-                    is_await_confirmation = True
-                    asking_confirmation("task-done")
-                    continue
-
-                if is_being_reminded is False:
-                    is_being_reminded = True
-                    break_reminder()
-                    continue
-
-            if timer_second == 0:
-                is_pomodoro_timer_running = False
-                transition_podomoro("working")
-                bot_detection_status = "Working"
+    show_face("idle")
+
+    # Hasil vision masuk sebagai event; thread kontrol tidur sampai ada event / timer jatuh tempo
+    cv_classifier.start(lambda status, result: scheduler.post(on_vision, status, result), wait=CLASSIFIER_WAIT)
 
 
 if __name__ == "__main__":
@@ -288,5 +317,6 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         print("[BOT] Shutting Down...")
         # bot_bt.close_connection()
+        effects.shutdown()
         servo.cleanup()
         exit(1)
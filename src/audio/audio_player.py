@@ -1,5 +1,5 @@
-from gtts import gTTS
 import os
+import subprocess
 
 texts = {
     # Kondisi Bluetooth
@@ -41,6 +41,9 @@ texts = {
 
 def generate_audio_files(output_folder="audio"):
     """Generate semua file audio untuk Pomodoro Robot"""
+    # gTTS hanya dibutuhkan saat generate, bukan saat robot memutar audio
+    from gtts import gTTS
+
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
     
@@ -126,6 +129,28 @@ def get_audio_path_for_state(state, audio_folder="audio"):
         # Fallback ke idle state
         return f"{audio_folder}/idle.mp3"
 
+def play_audio(state, audio_folder="audio", player=("mpg123", "-q"), cancel=None):
+    """
+    Putar audio untuk state (blocking sampai selesai). Jika `cancel`
+    (threading.Event) di-set, pemutar dihentikan.
+    """
+    path = get_audio_path_for_state(state, audio_folder)
+    if not os.path.exists(path):
+        print(f"[WARNING] Audio tidak ditemukan: {path}")
+        return
+    try:
+        proc = subprocess.Popen([*player, path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError as e:
+        print(f"[WARNING] Gagal memutar audio: {e}")
+        return
+    if cancel is None:
+        proc.wait()
+        return
+    while proc.poll() is None:
+        if cancel.wait(0.05):
+            proc.terminate()
+            break
+
 # Contoh penggunaan
 if __name__ == "__main__":
     # Generate semua file audio
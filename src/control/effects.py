@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import deque
+
+# Jumlah sample latency terakhir per device untuk p50/p95
+LATENCY_WINDOW = 256
+
+
+class Effect:
+    __slots__ = ("name", "fn", "args", "cancel", "trigger_ts", "submitted_at")
+
+    def __init__(self, name, fn, args, trigger_ts=None):
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.cancel = threading.Event()
+        self.trigger_ts = trigger_ts  # wall clock kejadian pemicu (mis. capture_ts frame gesture)
+        self.submitted_at = time.monotonic()
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class DeviceWorker:
+    """
+    Satu thread + antrian per perangkat (servo, display, suara).
+
+    - `coalesce=True` (display): hanya perintah terbaru yang menunggu yang
+      dijalankan (latest-wins), perintah lama yang belum jalan dibuang.
+    - `supersede=True` saat submit: buang antrian dan batalkan perintah yang
+      sedang jalan lewat Event `cancel` (mis. gesture stop menghentikan sweep servo).
+    - `pass_cancel=True`: fungsi perangkat menerima `cancel=Event` dan wajib
+      berhenti secepatnya saat Event di-set.
+    """
+
+    def __init__(self, name, coalesce=False, pass_cancel=False):
+        self.name = name
+        self.coalesce = coalesce
+        self.pass_cancel = pass_cancel
+
+        self._pending = deque()
+        self._current = None
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"effects-{name}", daemon=True)
+        self._thread.start()
+
+        # Stats
+        self.executed = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.errors = 0
+        self.dispatch_ms = deque(maxlen=LATENCY_WINDOW)
+        self.reaction_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def submit(self, effect, supersede=False):
+        with self._cond:
+            if supersede or self.coalesce:
+                dropped = len(self._pending)
+                self._pending.clear()
+                if self.coalesce:
+                    self.coalesced += dropped
+                else:
+                    self.cancelled += dropped
+            if supersede and self._current is not None:
+                self._current.cancel.set()
+                self.cancelled += 1
+            self._pending.append(effect)
+            self._cond.notify()
+        return effect
+
+    def cancel_all(self):
+        with self._cond:
+            self.cancelled += len(self._pending)
+            self._pending.clear()
+            if self._current is not None:
+                self._current.cancel.set()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                effect = self._current = self._pending.popleft()
+
+            if not effect.cancel.is_set():
+                self.dispatch_ms.append((time.monotonic() - effect.submitted_at) * 1000.0)
+                if effect.trigger_ts is not None:
+                    self.reaction_ms.append((time.time() - effect.trigger_ts) * 1000.0)
+                try:
+                    if self.pass_cancel:
+                        effect.fn(*effect.args, cancel=effect.cancel)
+                    else:
+                        effect.fn(*effect.args)
+                    self.executed += 1
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[effects] {self.name}.{effect.name} failed: {e}")
+
+            with self._cond:
+                self._current = None
+
+    def busy(self):
+        with self._cond:
+            return self._current is not None or bool(self._pending)
+
+    def stop(self, timeout=1.0):
+        self.cancel_all()
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def stats(self):
+        dispatch = list(self.dispatch_ms)
+        reaction = list(self.reaction_ms)
+        return {
+            "executed": self.executed,
+            "pending": len(self._pending),
+            "running": self._current.name if self._current is not None else None,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+            "dispatch_p50_ms": _percentile(dispatch, 0.5),
+            "dispatch_p95_ms": _percentile(dispatch, 0.95),
+            "reaction_p50_ms": _percentile(reaction, 0.5),
+            "reaction_p95_ms": _percentile(reaction, 0.95),
+            "reaction_max_ms": max(reaction) if reaction else None,
+        }
+
+
+class EffectsExecutor:
+    """
+    Semua aksi perangkat dari logika kontrol lewat sini, jadi thread kontrol
+    tidak pernah menunggu hardware. Latency reaksi = waktu mulai aksi dikurangi
+    `trigger_ts` (capture_ts frame yang memicu keputusan), diset lewat
+    `set_trigger` sebelum logika keputusan berjalan.
+    """
+
+    def __init__(self):
+        self.devices = {}
+        self.trigger_ts = None
+
+    def add_device(self, name, coalesce=False, pass_cancel=False):
+        self.devices[name] = DeviceWorker(name, coalesce=coalesce, pass_cancel=pass_cancel)
+        return self.devices[name]
+
+    def set_trigger(self, trigger_ts):
+        self.trigger_ts = trigger_ts
+
+    def submit(self, device, name, fn, *args, supersede=False):
+        effect = Effect(name, fn, args, trigger_ts=self.trigger_ts)
+        return self.devices[device].submit(effect, supersede=supersede)
+
+    def cancel(self, device):
+        self.devices[device].cancel_all()
+
+    def shutdown(self):
+        for worker in self.devices.values():
+            worker.stop()
+
+    def stats(self):
+        return {name: worker.stats() for name, worker in self.devices.items()}
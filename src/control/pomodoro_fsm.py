@@ -0,0 +1,393 @@
+IDLE = "Idle"
+WORKING = "Working"
+BREAK = "Break"
+
+START_LABEL = "start_pomodoro"
+STOP_LABEL = "stop_pomodoro"
+
+_INF = float("inf")
+
+
+# -------- EVENTS --------
+
+class Event:
+    __slots__ = ()
+
+
+class VisionEvent(Event):
+    """Satu hasil classifier. Subclass menentukan baris tabel yang dipakai."""
+    __slots__ = ("status", "found", "label", "confidence", "capture_ts")
+
+    def __init__(self, status, found, label, confidence, capture_ts=None):
+        self.status = status
+        self.found = found
+        self.label = label
+        self.confidence = confidence
+        self.capture_ts = capture_ts
+
+    @staticmethod
+    def from_result(status, result, conf_thresh):
+        """status = "Working" | "Distracted" | ..., result = dict hasil classifier -> event bertipe."""
+        label = result.get("label", "")
+        confidence = result.get("confidence", 0.0)
+        found = result.get("found", False)
+        if confidence > conf_thresh and label == START_LABEL:
+            cls = StartGesture
+        elif confidence > conf_thresh and label == STOP_LABEL:
+            cls = StopGesture
+        elif status == "Distracted":
+            cls = Distracted
+        elif found:
+            cls = Present
+        else:
+            cls = Nothing
+        return cls(status, found, label, confidence, result.get("capture_ts"))
+
+
+class StartGesture(VisionEvent):
+    __slots__ = ()
+
+
+class StopGesture(VisionEvent):
+    __slots__ = ()
+
+
+class Distracted(VisionEvent):
+    __slots__ = ()
+
+
+class Present(VisionEvent):
+    __slots__ = ()
+
+
+class Nothing(VisionEvent):
+    __slots__ = ()
+
+
+class PhaseTimeout(Event):
+    __slots__ = ()
+
+
+class ConfirmExpired(Event):
+    __slots__ = ()
+
+
+class ReminderExpired(Event):
+    __slots__ = ()
+
+
+class TransitionDone(Event):
+    __slots__ = ()
+
+
+VISION_EVENTS = (StartGesture, StopGesture, Distracted, Present, Nothing)
+
+# Event timer tidak membawa data, cukup satu instance
+PHASE_TIMEOUT = PhaseTimeout()
+CONFIRM_EXPIRED = ConfirmExpired()
+REMINDER_EXPIRED = ReminderExpired()
+TRANSITION_DONE = TransitionDone()
+
+
+# -------- TABLE --------
+#
+# (state, tipe event) -> daftar baris (guard, aksi, state berikutnya), dicoba
+# berurutan; baris pertama yang guard-nya lolos dipakai. guard None = selalu,
+# state berikutnya None = tetap. State None = berlaku di semua state.
+
+TRANSITIONS = {
+    (IDLE, StartGesture): [
+        (None, ("start_work",), WORKING),
+    ],
+
+    (WORKING, StopGesture): [
+        ("confirm_window_open", ("stop",), IDLE),
+        ("not_awaiting", ("ask_end",), None),
+        ("distracted_not_reminded", ("remind_distraction",), None),
+    ],
+    (WORKING, Distracted): [
+        ("not_reminded", ("remind_distraction",), None),
+    ],
+    # Akhir fase: face idle selama jeda transisi, fase baru (servo + timer) baru
+    # dimulai saat TransitionDone, seperti sleep(3) di loop lama
+    (WORKING, PhaseTimeout): [
+        (None, ("transition_break",), BREAK),
+    ],
+    (WORKING, ReminderExpired): [
+        (None, ("clear_reminder",), None),
+    ],
+
+    # Saat break, hasil apa pun di dalam jendela konfirmasi mengakhiri pomodoro
+    (BREAK, StopGesture): [
+        ("confirm_window_open", ("task_todo", "stop"), IDLE),
+        ("not_awaiting", ("ask_task_done",), None),
+        ("found_not_reminded", ("remind_break",), None),
+    ],
+    (BREAK, StartGesture): [
+        ("confirm_window_open", ("task_finished", "stop"), IDLE),
+        ("found_not_reminded", ("remind_break",), None),
+    ],
+    (BREAK, Distracted): [
+        ("confirm_window_open", ("stop",), IDLE),
+        ("found_not_reminded", ("remind_break",), None),
+    ],
+    (BREAK, Present): [
+        ("confirm_window_open", ("stop",), IDLE),
+        ("found_not_reminded", ("remind_break",), None),
+    ],
+    (BREAK, Nothing): [
+        ("confirm_window_open", ("stop",), IDLE),
+    ],
+    (BREAK, PhaseTimeout): [
+        (None, ("transition_working",), WORKING),
+    ],
+    (BREAK, TransitionDone): [
+        (None, ("end_transition", "start_break"), None),
+    ],
+    (WORKING, TransitionDone): [
+        (None, ("end_transition", "start_work"), None),
+    ],
+
+    (None, ConfirmExpired): [
+        (None, ("clear_confirmation",), None),
+    ],
+    (IDLE, TransitionDone): [
+        (None, ("end_transition",), None),
+    ],
+}
+
+
+class PomodoroFSM:
+    """
+    State machine Idle / Working / Break berbasis tabel `TRANSITIONS`.
+
+    Tidak ada thread, sleep, atau clock sendiri: semua waktu masuk lewat
+    argumen `now` (detik, clock apa pun yang monotonic). Timer (akhir fase,
+    jendela konfirmasi, cooldown pengingat, jeda transisi) disimpan sebagai
+    deadline dan diubah jadi event oleh `advance(now)`, tepat pada waktu
+    deadline-nya, jadi hasilnya sama di clock asli maupun virtual.
+
+    Efek keluar lewat `on_output(name, arg, now)`:
+    transition("break"|"working") saat fase habis, lalu start_break /
+    start_work setelah jeda `transition` detik; stop,
+    ask_confirmation("end"|"task-done"), remind_distraction(event),
+    remind_break, task_todo, task_finished.
+    """
+
+    def __init__(self, work_time=25 * 60, break_time=5 * 60, confirm_open=3.0, confirm_close=6.0,
+                 reminder=3.0, transition=3.0, on_output=None):
+        self.work_time = work_time
+        self.break_time = break_time
+        self.confirm_open = confirm_open
+        self.confirm_close = confirm_close
+        self.reminder = reminder
+        self.transition = transition
+        self.on_output = on_output
+
+        self.state = IDLE
+        self.awaiting = None          # "end" | "task-done" | None
+        self.reminded = False
+        self.in_transition = False
+
+        self.confirm_started = None
+        self.phase_deadline = _INF
+        self.confirm_deadline = _INF
+        self.reminder_deadline = _INF
+        self.transition_deadline = _INF
+        self._next_deadline = _INF
+
+        # Tabel di-resolve sekali ke bound method supaya dispatch cukup satu lookup dict
+        self._table = {}
+        for (state, event_type), rows in TRANSITIONS.items():
+            resolved = tuple(
+                (getattr(self, "_g_" + guard) if guard else None,
+                 tuple(getattr(self, "_a_" + action) for action in actions),
+                 next_state)
+                for guard, actions, next_state in rows
+            )
+            states = (IDLE, WORKING, BREAK) if state is None else (state,)
+            for s in states:
+                self._table[(s, event_type)] = resolved
+
+        # Stats
+        self.events = 0
+        self.ignored = 0
+        self.transitions = 0
+
+    # -------- TIME --------
+
+    def remaining(self, now):
+        """Sisa detik fase berjalan (0 saat Idle)."""
+        if self.phase_deadline == _INF:
+            return 0.0
+        return max(0.0, self.phase_deadline - now)
+
+    def next_deadline(self):
+        """Waktu timer berikutnya (inf jika tidak ada); pemanggil cukup `advance` pada waktu ini."""
+        return self._next_deadline
+
+    def _update_next_deadline(self):
+        self._next_deadline = min(self.phase_deadline, self.confirm_deadline,
+                                  self.reminder_deadline, self.transition_deadline)
+
+    def advance(self, now):
+        """Jalankan semua timer yang jatuh tempo <= now, urut deadline, masing-masing pada waktunya."""
+        while self._next_deadline <= now:
+            due = self._next_deadline
+            if self.transition_deadline == due:
+                self.transition_deadline = _INF
+                event = TRANSITION_DONE
+            elif self.confirm_deadline == due:
+                self.confirm_deadline = _INF
+                event = CONFIRM_EXPIRED
+            elif self.reminder_deadline == due:
+                self.reminder_deadline = _INF
+                event = REMINDER_EXPIRED
+            else:
+                self.phase_deadline = _INF
+                event = PHASE_TIMEOUT
+            self._update_next_deadline()
+            self._dispatch(event, due)
+
+    # -------- DISPATCH --------
+
+    def dispatch(self, event, now):
+        """Proses satu event pada waktu `now`. Return True jika ada baris tabel yang dijalankan."""
+        if self._next_deadline <= now:
+            self.advance(now)
+        return self._dispatch(event, now)
+
+    def _dispatch(self, event, now):
+        self.events += 1
+        if self.in_transition and isinstance(event, VisionEvent):
+            # Hasil vision diabaikan selama jeda transisi
+            self.ignored += 1
+            return False
+
+        rows = self._table.get((self.state, type(event)))
+        if rows is not None:
+            for guard, actions, next_state in rows:
+                if guard is None or guard(event, now):
+                    if next_state is not None and next_state != self.state:
+                        self.state = next_state
+                        self.transitions += 1
+                    for action in actions:
+                        action(event, now)
+                    return True
+        self.ignored += 1
+        return False
+
+    def _emit(self, name, now, arg=None):
+        if self.on_output is not None:
+            self.on_output(name, arg, now)
+
+    # -------- GUARDS --------
+
+    def _g_confirm_window_open(self, event, now):
+        return (self.awaiting is not None
+                and self.confirm_open <= now - self.confirm_started < self.confirm_close)
+
+    def _g_not_awaiting(self, event, now):
+        return self.awaiting is None
+
+    def _g_not_reminded(self, event, now):
+        return not self.reminded
+
+    def _g_distracted_not_reminded(self, event, now):
+        return event.status == "Distracted" and not self.reminded
+
+    def _g_found_not_reminded(self, event, now):
+        return event.found and not self.reminded
+
+    # -------- ACTIONS --------
+
+    def _a_start_work(self, event, now):
+        self.reminded = False
+        self.reminder_deadline = _INF
+        self.phase_deadline = now + self.work_time
+        self._update_next_deadline()
+        self._emit("start_work", now)
+
+    def _a_start_break(self, event, now):
+        self.phase_deadline = now + self.break_time
+        self._update_next_deadline()
+        self._emit("start_break", now)
+
+    def _a_stop(self, event, now):
+        self.awaiting = None
+        self.confirm_started = None
+        self.phase_deadline = _INF
+        self.confirm_deadline = _INF
+        self._update_next_deadline()
+        self._emit("stop", now)
+
+    def _a_transition_break(self, event, now):
+        self._start_transition(now)
+        self._emit("transition", now, "break")
+
+    def _a_transition_working(self, event, now):
+        self._start_transition(now)
+        self._emit("transition", now, "working")
+
+    def _start_transition(self, now):
+        # Pertanyaan konfirmasi dari fase sebelumnya tidak dibawa ke fase baru
+        self.awaiting = None
+        self.confirm_started = None
+        self.confirm_deadline = _INF
+        self.in_transition = True
+        self.transition_deadline = now + self.transition
+        self._update_next_deadline()
+
+    def _a_end_transition(self, event, now):
+        self.in_transition = False
+
+    def _ask(self, confirm_to, now):
+        self.awaiting = confirm_to
+        self.confirm_started = now
+        self.confirm_deadline = now + self.confirm_close
+        self._update_next_deadline()
+        self._emit("ask_confirmation", now, confirm_to)
+
+    def _a_ask_end(self, event, now):
+        self._ask("end", now)
+
+    def _a_ask_task_done(self, event, now):
+        self._ask("task-done", now)
+
+    def _a_clear_confirmation(self, event, now):
+        self.awaiting = None
+        self.confirm_started = None
+
+    def _remind(self, now):
+        self.reminded = True
+        self.reminder_deadline = now + self.reminder
+        self._update_next_deadline()
+
+    def _a_remind_distraction(self, event, now):
+        self._remind(now)
+        self._emit("remind_distraction", now, event)
+
+    def _a_remind_break(self, event, now):
+        self._remind(now)
+        self._emit("remind_break", now)
+
+    def _a_clear_reminder(self, event, now):
+        # Saat break pengingat hanya sekali; di-reset saat kembali Working
+        self.reminded = False
+
+    def _a_task_todo(self, event, now):
+        self._emit("task_todo", now)
+
+    def _a_task_finished(self, event, now):
+        self._emit("task_finished", now)
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "events": self.events,
+            "ignored": self.ignored,
+            "transitions": self.transitions,
+            "awaiting": self.awaiting,
+            "reminded": self.reminded,
+            "in_transition": self.in_transition,
+        }
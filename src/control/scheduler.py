@@ -0,0 +1,132 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+
+class ScheduledCall:
+    __slots__ = ("due", "fn", "args", "interval", "cancelled")
+
+    def __init__(self, due, fn, args, interval=None):
+        self.due = due
+        self.fn = fn
+        self.args = args
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class EventScheduler:
+    """
+    Loop event untuk thread kontrol, berbasis clock monotonic + heapq.
+
+    - `call_at` / `call_later`: panggil fungsi sekali pada waktu tertentu.
+    - `call_every`: periodik tanpa drift, jadwal berikutnya = jadwal sebelumnya
+      + interval (bukan waktu selesai + interval), jadi 1500 tick = 1500 detik.
+    - `post`: thread lain (mis. receiver hasil vision) memasukkan event; thread
+      kontrol dibangunkan segera.
+
+    Semua callback jalan di thread yang memanggil `run_forever`, jadi state
+    kontrol tidak butuh lock. Saat tidak ada yang jatuh tempo thread tidur.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._heap = []
+        self._counter = itertools.count()
+        self._posted = deque()
+        self._cond = threading.Condition()
+        self._running = False
+
+        # Stats
+        self.dispatched = 0
+        self.posted = 0
+        self.max_lateness = 0.0
+
+    def now(self):
+        return self.clock()
+
+    # -------- SCHEDULING --------
+
+    def _push(self, call):
+        with self._cond:
+            heapq.heappush(self._heap, (call.due, next(self._counter), call))
+            self._cond.notify()
+        return call
+
+    def call_at(self, due, fn, *args):
+        return self._push(ScheduledCall(due, fn, args))
+
+    def call_later(self, delay, fn, *args):
+        return self._push(ScheduledCall(self.clock() + delay, fn, args))
+
+    def call_every(self, interval, fn, *args, first_delay=None):
+        first = interval if first_delay is None else first_delay
+        return self._push(ScheduledCall(self.clock() + first, fn, args, interval=interval))
+
+    def post(self, fn, *args):
+        """Thread-safe: jalankan fn(*args) di thread kontrol secepatnya."""
+        with self._cond:
+            self._posted.append((fn, args))
+            self.posted += 1
+            self._cond.notify()
+
+    # -------- LOOP --------
+
+    def _next_ready(self, now):
+        """Ambil satu pekerjaan yang siap (posted dulu, lalu timer jatuh tempo)."""
+        if self._posted:
+            return self._posted.popleft()
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        if self._heap and self._heap[0][0] <= now:
+            _, _, call = heapq.heappop(self._heap)
+            self.max_lateness = max(self.max_lateness, now - call.due)
+            if call.interval is not None:
+                call.due += call.interval
+                heapq.heappush(self._heap, (call.due, next(self._counter), call))
+            return call.fn, call.args
+        return None
+
+    def run_once(self, timeout=None):
+        """Jalankan semua yang siap; jika belum ada, tidur sampai timer berikutnya / post / timeout."""
+        with self._cond:
+            job = self._next_ready(self.clock())
+            if job is None:
+                wait = timeout
+                if self._heap:
+                    until_due = max(0.0, self._heap[0][0] - self.clock())
+                    wait = until_due if wait is None else min(wait, until_due)
+                self._cond.wait(wait)
+                job = self._next_ready(self.clock())
+
+        ran = 0
+        while job is not None:
+            fn, args = job
+            fn(*args)
+            ran += 1
+            with self._cond:
+                job = self._next_ready(self.clock())
+        self.dispatched += ran
+        return ran
+
+    def run_forever(self):
+        self._running = True
+        while self._running:
+            self.run_once(timeout=1.0)
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify()
+
+    def stats(self):
+        return {
+            "pending_timers": len(self._heap),
+            "dispatched": self.dispatched,
+            "posted": self.posted,
+            "max_lateness_ms": self.max_lateness * 1000.0,
+        }
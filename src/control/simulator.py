@@ -0,0 +1,196 @@
+"""
+Simulator headless untuk PomodoroFSM dengan waktu virtual.
+
+Stream classifier sintetis (skrip atau acak) dibuat dulu sebagai list
+(t, event), lalu dimasukkan ke state machine secepat mungkin; waktu hanya
+maju lewat timestamp event, jadi sesi 25 menit selesai dalam milidetik dan
+hasilnya deterministik. Tidak butuh kamera, servo, display, atau server.
+
+    # benchmark biaya keputusan per hasil classifier
+    python -m src.control.simulator --steps 2000000 --rate 10
+
+    # uji jendela gesture konfirmasi (diterima 3-6 detik setelah ditanya)
+    python -m src.control.simulator --window
+"""
+import argparse
+import json
+import random
+import time
+
+from src.control.pomodoro_fsm import (
+    BREAK, START_LABEL, STOP_LABEL, WORKING, PomodoroFSM, VisionEvent,
+)
+
+# status, label, confidence, found
+NOTHING = ("Working", "", 0.0, False)
+PRESENT = ("Working", "person", 0.9, True)
+DISTRACTED = ("Distracted", "phone", 0.9, True)
+START = ("Working", START_LABEL, 0.95, True)
+STOP = ("Working", STOP_LABEL, 0.95, True)
+
+RANDOM_MIX = (
+    (NOTHING, 0.30),
+    (PRESENT, 0.50),
+    (DISTRACTED, 0.15),
+    (START, 0.025),
+    (STOP, 0.025),
+)
+
+
+def _event(sample, conf_thresh):
+    status, label, confidence, found = sample
+    result = {"found": found, "label": label, "confidence": confidence}
+    return VisionEvent.from_result(status, result, conf_thresh)
+
+
+def scripted_stream(script, rate=10.0, start=0.0, conf_thresh=0.85):
+    """
+    script = [(durasi_detik, sample), ...], sample salah satu konstanta di atas
+    (atau tuple status, label, confidence, found). Return list (t, event) pada `rate` Hz.
+    """
+    stream = []
+    i = 0
+    end = start
+    for duration, sample in script:
+        event = _event(sample, conf_thresh)
+        end += duration
+        # Waktu dari indeks (bukan t += dt) supaya tidak ada akumulasi error float
+        while start + i / rate < end - 1e-9:
+            stream.append((start + i / rate, event))
+            i += 1
+    return stream
+
+
+def random_stream(steps, rate=10.0, seed=0, mix=RANDOM_MIX, mean_dwell=2.0, conf_thresh=0.85):
+    """
+    `steps` hasil classifier acak (seed tetap = deterministik). Tiap sample
+    ditahan rata-rata `mean_dwell` detik seperti gesture/aktivitas asli.
+    """
+    rng = random.Random(seed)
+    samples = [sample for sample, _ in mix]
+    weights = [w for _, w in mix]
+    events = {sample: _event(sample, conf_thresh) for sample in samples}
+
+    stream = []
+    dt = 1.0 / rate
+    t = 0.0
+    while len(stream) < steps:
+        event = events[rng.choices(samples, weights)[0]]
+        for _ in range(max(1, int(rng.expovariate(1.0 / mean_dwell) * rate))):
+            stream.append((t, event))
+            t += dt
+    del stream[steps:]
+    return stream
+
+
+def run(stream, fsm=None, trace=None, **fsm_kwargs):
+    """
+    Jalankan stream lewat FSM. `trace` (list) opsional diisi (t, state, output, arg).
+    Return FSM (state + stats) setelah event terakhir.
+    """
+    if fsm is None:
+        fsm = PomodoroFSM(**fsm_kwargs)
+    if trace is not None:
+        fsm.on_output = lambda name, arg, now: trace.append((now, fsm.state, name, arg))
+
+    dispatch = fsm.dispatch
+    for t, event in stream:
+        dispatch(event, t)
+    if stream:
+        fsm.advance(stream[-1][0])
+    return fsm
+
+
+# -------- SCENARIOS --------
+
+def confirmation_window(delays, phase=BREAK, conf_thresh=0.85, **fsm_kwargs):
+    """
+    Untuk tiap delay: tanya konfirmasi (satu frame gesture stop), lalu satu
+    frame gesture jawaban `delay` detik kemudian, tanpa frame lain di antaranya
+    (waktu virtual tetap maju lewat timer). Return [(delay, diterima)], diterima =
+    jawaban itu yang menghentikan pomodoro.
+    `phase` = WORKING (konfirmasi "end") atau BREAK (konfirmasi "task-done").
+    """
+    fsm_kwargs.setdefault("work_time", 60)
+    fsm_kwargs.setdefault("break_time", 60)
+    ask_at = 5.0
+    if phase == BREAK:
+        ask_at += fsm_kwargs["work_time"] + fsm_kwargs.get("transition", 3.0)
+    answer = STOP if phase == WORKING else START
+
+    results = []
+    for delay in delays:
+        stream = [
+            (0.0, _event(START, conf_thresh)),
+            (ask_at, _event(STOP, conf_thresh)),
+            (ask_at + delay, _event(answer, conf_thresh)),
+        ]
+        trace = []
+        run(stream, trace=trace, **fsm_kwargs)
+        results.append((delay, any(name == "stop" and t == ask_at + delay for t, _, name, _ in trace)))
+    return results
+
+
+def benchmark(steps=1_000_000, rate=10.0, seed=0, repeat=3, **fsm_kwargs):
+    """Biaya keputusan murni (stream sudah dibuat sebelum diukur). Ambil run tercepat dari `repeat`."""
+    fsm_kwargs.setdefault("work_time", 25 * 60)
+    fsm_kwargs.setdefault("break_time", 5 * 60)
+    stream = random_stream(steps, rate, seed)
+
+    best = None
+    fsm = None
+    for _ in range(repeat):
+        outputs = []
+        fsm = PomodoroFSM(on_output=lambda name, arg, now: outputs.append(name), **fsm_kwargs)
+        t0 = time.perf_counter()
+        run(stream, fsm)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    simulated = stream[-1][0] if stream else 0.0
+    return {
+        "steps": steps,
+        "rate_hz": rate,
+        "seconds": best,
+        "steps_per_s": steps / best if best else 0.0,
+        "ns_per_step": best / steps * 1e9 if steps else 0.0,
+        "simulated_hours": simulated / 3600.0,
+        "speedup": simulated / best if best else 0.0,
+        "outputs": len(outputs),
+        "fsm": fsm.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless virtual-time simulator for the pomodoro state machine")
+    parser.add_argument("--steps", type=int, default=1_000_000, help="classifier results per benchmark run")
+    parser.add_argument("--rate", type=float, default=10.0, help="classifier results per virtual second")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--window", action="store_true", help="sweep the confirmation gesture window instead")
+    parser.add_argument("--output", help="write result JSON here")
+    args = parser.parse_args()
+
+    if args.window:
+        delays = [round(0.25 * i, 2) for i in range(1, 30)]
+        result = {}
+        for phase in (WORKING, BREAK):
+            rows = confirmation_window(delays, phase=phase)
+            result[phase] = rows
+            accepted = [d for d, ok in rows if ok]
+            print(f"{phase:8s} accepted delays: {accepted}")
+    else:
+        result = benchmark(args.steps, args.rate, args.seed, args.repeat)
+        print(f"{result['steps']} steps in {result['seconds']:.3f}s: "
+              f"{result['steps_per_s'] / 1e6:.2f}M steps/s, {result['ns_per_step']:.0f} ns/step")
+        print(f"simulated {result['simulated_hours']:.1f} h ({result['speedup']:.0f}x realtime), "
+              f"{result['outputs']} outputs, fsm {result['fsm']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
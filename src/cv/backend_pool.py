@@ -0,0 +1,187 @@
+import threading
+import time
+
+from src.cv.inference_client import PipelinedInferenceClient
+
+
+class Backend:
+    def __init__(self, client):
+        self.client = client
+        self.url = client.url
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.routed = 0
+        self.last_used = 0.0
+        self._seen_timeouts = 0
+
+    @property
+    def healthy(self):
+        return self.client.connected and time.monotonic() >= self.ejected_until
+
+    def score(self):
+        # Estimasi waktu tunggu: RTT EMA dikali antrian in-flight. RTT belum diketahui = 0
+        # supaya backend baru langsung dapat frame dan estimasinya terisi.
+        rtt = self.client.rtt_ema or 0.0
+        return rtt * (1 + self.client.in_flight())
+
+
+class BackendPool:
+    """
+    Beberapa inference server sekaligus (CV_URL dipisah koma), satu
+    PipelinedInferenceClient per backend, semua koneksi tetap hangat.
+
+    - Frame dikirim ke backend sehat dengan skor (RTT EMA x in-flight) terkecil;
+      tiap `probe_every` frame satu frame dikirim ke backend sehat yang paling
+      lama tidak dipakai supaya estimasi latency-nya tidak basi.
+    - Backend di-eject (koneksi ditutup) setelah `eject_after` timeout dan
+      dicoba lagi oleh thread prober setelah `reprobe_interval` detik.
+    - Balasan dari backend berbeda diurutkan lewat capture_ts: hasil untuk
+      frame yang lebih lama dari hasil terakhir dibuang.
+
+    Antarmuka sama dengan PipelinedInferenceClient (connected, connect, send,
+    in_flight, rtt_ema, labels, stats), jadi satu URL berperilaku seperti dulu.
+    """
+
+    def __init__(self, urls, on_result, eject_after=2, reprobe_interval=5.0, probe_every=20,
+                 log=print, **client_kwargs):
+        self.on_result = on_result
+        self.eject_after = max(1, int(eject_after))
+        self.reprobe_interval = reprobe_interval
+        self.probe_every = probe_every
+        self.log = log
+
+        self.backends = [
+            Backend(PipelinedInferenceClient(url, on_result=self._make_handler(url), log=log, **client_kwargs))
+            for url in urls
+        ]
+        self.max_in_flight = self.backends[0].client.max_in_flight if self.backends else 1
+
+        self._lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._last_capture_ts = 0.0
+        self._frames = 0
+        self._prober = None
+        self._running = False
+        self.out_of_order = 0
+
+    # -------- RESULTS --------
+
+    def _make_handler(self, url):
+        def handle(result, rtt):
+            capture_ts = result.get("capture_ts")
+            with self._lock:
+                if capture_ts is not None:
+                    if capture_ts < self._last_capture_ts:
+                        # Backend lain sudah membalas frame yang lebih baru
+                        self.out_of_order += 1
+                        return
+                    self._last_capture_ts = capture_ts
+            self.on_result(dict(result, backend=url), rtt)
+        return handle
+
+    # -------- CONNECTION --------
+
+    @property
+    def connected(self):
+        return any(b.healthy for b in self.backends)
+
+    @property
+    def labels(self):
+        return next((b.client.labels for b in self.backends if b.client.labels), None)
+
+    @property
+    def hello_reply(self):
+        return next((b.client.hello_reply for b in self.backends if b.client.hello_reply), None)
+
+    @property
+    def rtt_ema(self):
+        rtts = [b.client.rtt_ema for b in self.backends if b.healthy and b.client.rtt_ema is not None]
+        return min(rtts) if rtts else None
+
+    def connect(self):
+        """Sambungkan backend yang putus dan sudah jatuh tempo re-probe. Return True jika ada yang sehat."""
+        with self._connect_lock:
+            now = time.monotonic()
+            for b in self.backends:
+                if b.client.connected or now < b.ejected_until:
+                    continue
+                if b.client.connect():
+                    b._seen_timeouts = b.client.timeouts
+                else:
+                    b.ejected_until = time.monotonic() + self.reprobe_interval
+        if not self._running:
+            self.start()
+        return self.connected
+
+    def _eject(self, backend, reason):
+        backend.ejections += 1
+        backend.ejected_until = time.monotonic() + self.reprobe_interval
+        print(f"Backend {backend.url} ejected ({reason})")
+        self.log(f"Backend {backend.url} ejected ({reason})")
+        backend.client.close()
+
+    def _probe_loop(self):
+        while self._running:
+            for b in self.backends:
+                new_timeouts = b.client.timeouts - b._seen_timeouts
+                if b.client.connected and new_timeouts >= self.eject_after:
+                    self._eject(b, f"{new_timeouts} timeouts")
+                b._seen_timeouts = b.client.timeouts
+            self.connect()
+            time.sleep(0.5)
+
+    def start(self):
+        if self._prober is None:
+            self._running = True
+            self._prober = threading.Thread(target=self._probe_loop, name="backend-prober", daemon=True)
+            self._prober.start()
+
+    def close(self):
+        self._running = False
+        for b in self.backends:
+            b.client.close()
+
+    # -------- SEND --------
+
+    def _choose(self):
+        healthy = [b for b in self.backends if b.healthy]
+        if not healthy:
+            return None
+        self._frames += 1
+        if len(healthy) > 1 and self.probe_every and self._frames % self.probe_every == 0:
+            return min(healthy, key=lambda b: b.last_used)
+        free = [b for b in healthy if b.client.in_flight() < b.client.max_in_flight]
+        return min(free or healthy, key=Backend.score)
+
+    def send(self, frame_data):
+        backend = self._choose()
+        if backend is None:
+            return False
+        backend.routed += 1
+        backend.last_used = time.monotonic()
+        if not backend.client.send(frame_data):
+            # Client sudah menutup koneksinya sendiri; tunggu re-probe
+            backend.ejected_until = time.monotonic() + self.reprobe_interval
+            return False
+        return True
+
+    def in_flight(self):
+        return sum(b.client.in_flight() for b in self.backends)
+
+    def can_send(self):
+        """Ada backend sehat dengan slot in-flight kosong (send tidak akan menunggu)."""
+        return any(b.healthy and b.client.in_flight() < b.client.max_in_flight for b in self.backends)
+
+    def stats(self):
+        now = time.monotonic()
+        backends = []
+        for b in self.backends:
+            s = b.client.stats()
+            s.update({
+                "healthy": b.healthy,
+                "routed": b.routed,
+                "ejections": b.ejections,
+                "reprobe_in_s": max(0.0, b.ejected_until - now),
+            })
+            backends.append(s)
+        return {"backends": backends, "out_of_order": self.out_of_order}
@@ -0,0 +1,172 @@
+import threading
+import time
+
+
+class CapturedFrame:
+    """Frame hasil sampling. Buffer `img` dipinjam dari FrameGrabber sampai `release()`."""
+
+    __slots__ = ("img", "capture_ts", "seq", "_grabber", "_slot")
+
+    def __init__(self, img, capture_ts, seq, grabber, slot):
+        self.img = img
+        self.capture_ts = capture_ts
+        self.seq = seq
+        self._grabber = grabber
+        self._slot = slot
+
+    def release(self):
+        if self._grabber is not None:
+            self._grabber._release(self._slot)
+            self._grabber = None
+
+
+class FrameGrabber:
+    """
+    Thread kamera tersendiri: `grab()` tiap frame supaya buffer V4L2 tidak
+    menumpuk (frame tetap segar), tapi `retrieve()` (decode) hanya tiap
+    `sample_every` frame (atau saat `sampler.due()` jika sampler diberikan),
+    langsung ke buffer yang dipakai ulang (ring `buffers` slot).
+
+    Konsumen tidak pernah menunggu kamera:
+    - `acquire(after_seq)` non-blocking: frame terbaru dengan seq > after_seq, atau None.
+    - `wait(after_seq, timeout)`: sama, tapi menunggu maks `timeout` detik.
+    Frame yang di-acquire harus di-`release()`; slot yang masih dipinjam tidak
+    ditimpa. Jika semua slot dipinjam, sample dilewati (`skipped`).
+
+    `clock()` memberi capture timestamp (default time.time; replay memakai
+    timestamp rekaman supaya balasan terekam bisa dicocokkan).
+    """
+
+    FAIL_THRESHOLD = 30
+
+    def __init__(self, cap, sample_every=1, buffers=4, name="camera", sampler=None, clock=time.time):
+        self.cap = cap
+        self.sample_every = max(1, int(sample_every))
+        self.sampler = sampler
+        self.clock = clock
+        self.name = name
+
+        self._slots = [None] * max(3, int(buffers))
+        self._leases = [0] * len(self._slots)
+        self._published = -1  # slot frame terbaru
+        self._published_ts = None
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        # Stats
+        self.grabbed = 0
+        self.retrieved = 0
+        self.skipped = 0
+        self.failures = 0
+        self._consecutive_failures = 0
+        self.started_at = time.monotonic()
+
+    @property
+    def failed(self):
+        """True jika kamera gagal grab berturut-turut (kamera lepas / stream mati)."""
+        return self._consecutive_failures >= self.FAIL_THRESHOLD
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self.started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-grabber", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # -------- CAPTURE THREAD --------
+
+    def _free_slot(self):
+        for i in range(len(self._slots)):
+            if i != self._published and self._leases[i] == 0:
+                return i
+        return None
+
+    def _run(self):
+        count = 0
+        while self._running:
+            if not self.cap.grab():
+                self.failures += 1
+                self._consecutive_failures += 1
+                time.sleep(0.01)
+                continue
+            self._consecutive_failures = 0
+            self.grabbed += 1
+
+            if self.sampler is not None:
+                if not self.sampler.due():
+                    continue
+            else:
+                count += 1
+                if count < self.sample_every:
+                    continue
+                count = 0
+
+            with self._cond:
+                slot = self._free_slot()
+            if slot is None:
+                self.skipped += 1
+                continue
+
+            # retrieve menulis ke buffer slot jika ukuran/tipe cocok (tanpa alokasi baru)
+            capture_ts = self.clock()
+            buf = self._slots[slot]
+            ret, img = self.cap.retrieve(buf) if buf is not None else self.cap.retrieve()
+            if not ret or img is None:
+                self.failures += 1
+                continue
+            self.retrieved += 1
+
+            with self._cond:
+                self._slots[slot] = img
+                self._published = slot
+                self._published_ts = capture_ts
+                self._seq += 1
+                self._cond.notify_all()
+
+    # -------- CONSUMER --------
+
+    def _acquire_locked(self, after_seq):
+        if self._published < 0 or self._seq <= after_seq:
+            return None
+        slot = self._published
+        self._leases[slot] += 1
+        return CapturedFrame(self._slots[slot], self._published_ts, self._seq, self, slot)
+
+    def acquire(self, after_seq=0):
+        with self._cond:
+            return self._acquire_locked(after_seq)
+
+    def wait(self, after_seq=0, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: not self._running or self._seq > after_seq, timeout)
+            return self._acquire_locked(after_seq)
+
+    def _release(self, slot):
+        with self._cond:
+            self._leases[slot] -= 1
+
+    def latest_seq(self):
+        return self._seq
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "grabbed": self.grabbed,
+            "retrieved": self.retrieved,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "failed": self.failed,
+            "grab_fps": (self.grabbed / elapsed) if elapsed > 0 else 0.0,
+            "sample_fps": (self.retrieved / elapsed) if elapsed > 0 else 0.0,
+        }
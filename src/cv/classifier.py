@@ -1,199 +1,492 @@
 import time
-import cv2
 import os
-import psutil
 import threading
+import atexit
+import psutil
 import queue
 import json
+import cv2
+from websocket import create_connection
 from datetime import datetime
-from collections import deque
 from dotenv import load_dotenv
-from websocket import create_connection, WebSocketTimeoutException
+from src.cv.backend_pool import BackendPool
+from src.cv.log_writer import BatchedLogWriter
+from src.cv.capture import FrameGrabber
+from src.cv.sampler import AdaptiveSampler
+from src.cv.smoothing import StatusSmoother
+from src.cv.local_fallback import LocalFallbackEngine, PRESENCE_LABEL, load_labels, save_labels
+from src.cv.resource_monitor import ResourceSampler
+from src.cv.recorder import Recorder, RecordingReader, ReplayCapture, ReplayWebSocket
+from src.hal import MOCK as HAL_MOCK
 
 load_dotenv()
 
 # -------- CONFIG --------
 DETECT_EVERY_N_FRAMES = 5
-HISTORY_SIZE = 5
 CPU_CORES = os.cpu_count() or 1
-LOG_FILE_PATH = "/home/raspberry/podomoro-bot-codes/cvlog.log"
+LOG_FILE_PATH = os.getenv("CV_LOG_PATH", "/home/raspberry/podomoro-bot-codes/cvlog.log")
 
 WS_TIMEOUT = 2.0 
 
-DOCKER_WS_URL = os.getenv("CV_URL", "ws://localhost:8000/ws/inference")
+# Satu atau beberapa inference server dipisah koma; frame dirutekan ke yang tercepat
+DOCKER_WS_URLS = [u.strip() for u in os.getenv("CV_URL", "ws://localhost:8000/ws/inference").split(",") if u.strip()]
+CV_BACKEND_EJECT_AFTER = int(os.getenv("CV_BACKEND_EJECT_AFTER", "2"))
+CV_BACKEND_REPROBE_S = float(os.getenv("CV_BACKEND_REPROBE_S", "5"))
+
+# Protokol frame (lihat src/docker/frame_protocol.py)
+# CV_FRAME_ENCODING: jpeg | raw, CV_PIXEL_FORMAT: bgr (tanpa konversi di Pi) | rgb | gray
+CV_FRAME_ENCODING = os.getenv("CV_FRAME_ENCODING", "jpeg")
+CV_PIXEL_FORMAT = os.getenv("CV_PIXEL_FORMAT", "bgr")
+CV_JPEG_QUALITY = int(os.getenv("CV_JPEG_QUALITY", "80"))
+CV_FRAME_MAX_SIDE = int(os.getenv("CV_FRAME_MAX_SIDE", "0"))
+
+# Jumlah frame yang boleh dikirim sebelum balasannya datang
+CV_MAX_IN_FLIGHT = int(os.getenv("CV_MAX_IN_FLIGHT", "3"))
+
+# Sampling adaptif: interval kirim frame tergantung state bot, gerakan, confidence dan RTT server.
+# CV_ADAPTIVE_SAMPLING=0 kembali ke tiap DETECT_EVERY_N_FRAMES frame.
+CV_ADAPTIVE_SAMPLING = os.getenv("CV_ADAPTIVE_SAMPLING", "1") == "1"
+CV_SAMPLE_IDLE_MS = float(os.getenv("CV_SAMPLE_IDLE_MS", "1000"))
+CV_SAMPLE_ACTIVE_MS = float(os.getenv("CV_SAMPLE_ACTIVE_MS", "200"))
+CV_SAMPLE_FAST_MS = float(os.getenv("CV_SAMPLE_FAST_MS", "66"))
+CV_MOTION_THRESHOLD = float(os.getenv("CV_MOTION_THRESHOLD", "6.0"))
+CV_STATIC_AFTER_S = float(os.getenv("CV_STATIC_AFTER_S", "10"))
+MOTION_THUMB_SIZE = 32
+
+# Rekam frame + balasan server ke CV_RECORD_PATH, atau putar ulang CV_REPLAY_PATH
+# (kamera dan server diganti rekaman). CV_REPLAY_REALTIME=0: secepat mungkin (lockstep).
+CV_RECORD_PATH = os.getenv("CV_RECORD_PATH", "")
+CV_REPLAY_PATH = os.getenv("CV_REPLAY_PATH", "")
+CV_REPLAY_REALTIME = os.getenv("CV_REPLAY_REALTIME", "1") == "1"
+CV_REPLAY_LOOP = os.getenv("CV_REPLAY_LOOP", "0") == "1"
+# Saat replay, smoothing (dan FSM di main.py) memakai capture_ts rekaman sebagai clock,
+# jadi replay cepat memberi keputusan yang sama dengan sesi aslinya
+REPLAYING = bool(CV_REPLAY_PATH)
+
+# Sampler resource Pi (CPU per thread, RSS, suhu, throttling, FPS, RTT) ke ring buffer.
+# CV_MONITOR_DUMP_S > 0: ringkasan satu baris ke log tiap N detik.
+CV_MONITOR = os.getenv("CV_MONITOR", "1") == "1"
+CV_MONITOR_INTERVAL_S = float(os.getenv("CV_MONITOR_INTERVAL_S", "1.0"))
+CV_MONITOR_SIZE = int(os.getenv("CV_MONITOR_SIZE", "300"))
+CV_MONITOR_DUMP_S = float(os.getenv("CV_MONITOR_DUMP_S", "30"))
+
+# Smoothing status: EMA p(working) dengan konstanta waktu CV_SMOOTH_TAU_S + hysteresis
+CV_SMOOTH_TAU_S = float(os.getenv("CV_SMOOTH_TAU_S", "2.0"))
+CV_DISTRACTED_ENTER = float(os.getenv("CV_DISTRACTED_ENTER", "0.35"))
+CV_DISTRACTED_EXIT = float(os.getenv("CV_DISTRACTED_EXIT", "0.6"))
+CV_STATUS_HOLD_S = float(os.getenv("CV_STATUS_HOLD_S", "1.0"))
+
+# Fallback lokal saat server mati / lebih lambat dari CV_LATENCY_BUDGET_MS.
+# LOCAL_MODEL_PATH (ONNX) + label -> gesture tetap dikenali; tanpa model hanya presence (HOG).
+CV_LOCAL_FALLBACK = os.getenv("CV_LOCAL_FALLBACK", "1") == "1"
+CV_LATENCY_BUDGET_MS = float(os.getenv("CV_LATENCY_BUDGET_MS", "1000"))
+CV_RECONNECT_INTERVAL_S = float(os.getenv("CV_RECONNECT_INTERVAL_S", "2"))
+# Default: ONNX HAR hasil export server (HAR_ENGINE=onnx, ENGINE_CACHE_DIR) + label dari hello server.
+# Path relatif dihitung dari root repo, bukan dari working directory.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def repo_path(path):
+    return os.path.join(REPO_ROOT, path) if path and not os.path.isabs(path) else path
+
+LOCAL_MODEL_PATH = repo_path(os.getenv("LOCAL_MODEL_PATH", "model/engines/har_model.onnx"))
+LOCAL_LABELS_PATH = repo_path(os.getenv("LOCAL_LABELS_PATH", "model/engines/har_labels.json"))
+LOCAL_MODEL_SIZE = int(os.getenv("LOCAL_MODEL_SIZE", "224"))
+
+# Log ditulis di background: fsync tiap N ms / N baris, rotasi per ukuran
+CV_LOG_QUEUE_SIZE = int(os.getenv("CV_LOG_QUEUE_SIZE", "1000"))
+CV_LOG_FSYNC_MS = int(os.getenv("CV_LOG_FSYNC_MS", "1000"))
+CV_LOG_FSYNC_LINES = int(os.getenv("CV_LOG_FSYNC_LINES", "200"))
+CV_LOG_MAX_BYTES = int(os.getenv("CV_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+CV_LOG_BACKUPS = int(os.getenv("CV_LOG_BACKUPS", "3"))
 
 current_mode = "Working" 
 
 latest_result = {
     "found": False,
     "label": "",
-    "confidence": 0.0
+    "confidence": 0.0,
+    "engine": "server"
 }
 
-result_lock = threading.Lock()
+# Engine yang sedang dipakai: "server" atau "local"
+active_engine = "server"
+results_published = 0
+
+# Dipanggil (status, result) tiap hasil baru, dari thread yang mempublikasikan hasil
+result_listeners = []
+
 frame_queue = queue.Queue(maxsize=1)
 running = True
 
-label_detection_history = deque(maxlen=HISTORY_SIZE)
-status_detection_history = deque(maxlen=HISTORY_SIZE)
+# PRESENCE_LABEL: fallback tanpa model HAR hanya tahu ada orang; anggap bekerja supaya tidak salah menegur
+working_labels = {"sitting", "using_laptop", "writing", "reading", "start_pomodoro", "stop_pomodoro", PRESENCE_LABEL}
+
+status_smoother = StatusSmoother(
+    working_labels,
+    tau=CV_SMOOTH_TAU_S,
+    enter_distracted=CV_DISTRACTED_ENTER,
+    exit_distracted=CV_DISTRACTED_EXIT,
+    hold=CV_STATUS_HOLD_S,
+)
+
+log_writer = BatchedLogWriter(
+    LOG_FILE_PATH,
+    queue_size=CV_LOG_QUEUE_SIZE,
+    fsync_interval_ms=CV_LOG_FSYNC_MS,
+    fsync_every_lines=CV_LOG_FSYNC_LINES,
+    max_bytes=CV_LOG_MAX_BYTES,
+    backup_count=CV_LOG_BACKUPS,
+)
+# Sisa queue tetap ditulis + fsync saat proses keluar normal
+atexit.register(log_writer.close)
 
-working_labels = {"sitting", "using_laptop", "writing", "reading", "start_pomodoro", "stop_pomodoro"}
+replay_reader = RecordingReader(CV_REPLAY_PATH) if CV_REPLAY_PATH else None
+replay_capture = None
+recorder = Recorder(CV_RECORD_PATH) if CV_RECORD_PATH and replay_reader is None else None
+if recorder is not None:
+    atexit.register(recorder.close)
 
-def determine_final_status(history):
-    if not history: return "Working"
-    
-    distracted_count = sum(1 for status in history if status['label'] not in working_labels)
-    threshold = len(history) - 1
+def open_camera(index=0):
+    """Kamera V4L2, ReplayCapture jika CV_REPLAY_PATH di-set, atau kamera file jika BOT_HAL=mock."""
+    global replay_capture
+    if replay_reader is not None:
+        replay_capture = ReplayCapture(replay_reader, realtime=CV_REPLAY_REALTIME, loop=CV_REPLAY_LOOP)
+        return replay_capture
+    if HAL_MOCK:
+        from src.hal.camera import open_mock_camera
+        return open_mock_camera()
+    return cv2.VideoCapture(index, cv2.CAP_V4L2)
 
-    if distracted_count >= threshold:
-        return "Distracted"
-    return "Working"
+def replay_connect(url, timeout):
+    return ReplayWebSocket(replay_reader, timeout=timeout, realtime=CV_REPLAY_REALTIME)
+
+def server_connect_fn():
+    """Rekaman (CV_REPLAY_PATH) > server palsu lokal (BOT_HAL=mock) > WebSocket asli."""
+    if replay_reader is not None:
+        return replay_connect
+    if HAL_MOCK:
+        from src.hal.inference import mock_connect
+        return mock_connect
+    return create_connection
 
 def tulis_log(pesan):
     """
-    Menulis pesan ke file log dengan flush paksa agar tertulis saat sudo.
+    Masukkan pesan ke queue log (non-blocking). Penulisan + fsync dilakukan
+    thread log-writer, jadi thread inference tidak pernah menunggu disk.
     """
-    try:
-        sekarang = datetime.now()
-        timestamp = sekarang.strftime("[%H:%M:%S %d-%m-%Y]")
-        log_msg = f"{timestamp} {pesan}\n"
-        
-        # Mode 'a' append
-        with open(LOG_FILE_PATH, "a", encoding="utf-8") as file:
-            file.write(log_msg)
-            file.flush()     # Paksa write buffer internal Python ke OS
-            os.fsync(file.fileno()) # Paksa OS menulis ke Disk fisik
-            
-    except Exception as e:
-        print(f"Gagal menulis log: {e}")
+    timestamp = datetime.now().strftime("[%H:%M:%S %d-%m-%Y]")
+    log_writer.write(f"{timestamp} {pesan}\n")
 
-def inference_worker():
-    global latest_result, label_detection_history, status_detection_history
-    
-    ws = None
-    
-    def connect_ws():
-        try:
-            # Set timeout saat connect juga
-            conn = create_connection(DOCKER_WS_URL, timeout=WS_TIMEOUT)
-            print("websocket connected!")
-            tulis_log("websocket connected!")
-            return conn
-        except Exception as e:
-            # Jangan spam log jika gagal connect terus menerus
-            print(f"Failed to connect to Docker: {e}")
-            return None
+def publish_result(result_json, rtt=None):
+    """
+    Dipanggil untuk tiap hasil baru: thread receiver (server) atau inference worker (fallback lokal).
+    latest_result diganti dengan dict baru (rebind atomik), bukan dimutasi di bawah lock,
+    jadi pembaca selalu melihat hasil yang utuh.
+    """
+    global latest_result, results_published
+
+    results_published += 1
+    result_str = json.dumps(result_json)
+    print(f"cv result: {result_str}")
+    tulis_log(f"cv result: {result_str}")
+
+    sampler.observe_result(result_json.get('label'), result_json.get('confidence', 0.0))
+
+    engine = result_json.get('engine', "server")
+    latest_result = {
+        "found": result_json['found'],
+        "label": result_json['label'],
+        "confidence": result_json['confidence'],
+        "engine": engine,
+        "capture_ts": result_json.get('capture_ts')
+    }
+
+    if result_json['found']:
+        print(f"Detected [{engine}]: {result_json['label']} ({result_json['confidence']:.2f})")
+        tulis_log(f"Detected [{engine}]: {result_json['label']} ({result_json['confidence']:.2f})")
+
+    # Tidak ditemukan juga dihitung (bukti distraksi), bukan hanya hasil found
+    status_smoother.update(result_json, now=result_json.get('capture_ts') if REPLAYING else None)
+
+    status = status_smoother.status or "Working - nothing detected"
+    for listener in result_listeners:
+        listener(status, latest_result)
+
+    if replay_capture is not None:
+        replay_capture.advance()
+
+def on_server_result(result_json, rtt=None):
+    if recorder is not None:
+        recorder.record_response(result_json)
+    # Balasan yang datang saat fallback lokal aktif hanya probe latency, tidak dipakai
+    if active_engine != "server":
+        return
+    publish_result(dict(result_json, engine="server"), rtt)
+
+inference_client = BackendPool(
+    DOCKER_WS_URLS,
+    on_result=on_server_result,
+    eject_after=CV_BACKEND_EJECT_AFTER,
+    reprobe_interval=CV_BACKEND_REPROBE_S,
+    max_in_flight=CV_MAX_IN_FLIGHT,
+    timeout=WS_TIMEOUT,
+    log=tulis_log,
+    encoding=CV_FRAME_ENCODING,
+    pixel_format=CV_PIXEL_FORMAT,
+    jpeg_quality=CV_JPEG_QUALITY,
+    max_side=CV_FRAME_MAX_SIDE,
+    connect_fn=server_connect_fn(),
+)
+
+sampler = AdaptiveSampler(
+    idle_interval=CV_SAMPLE_IDLE_MS / 1000.0,
+    active_interval=CV_SAMPLE_ACTIVE_MS / 1000.0,
+    fast_interval=CV_SAMPLE_FAST_MS / 1000.0,
+    motion_threshold=CV_MOTION_THRESHOLD,
+    static_after=CV_STATIC_AFTER_S,
+    latency_fn=lambda: sample_latency(),
+    max_in_flight=CV_MAX_IN_FLIGHT,
+)
+
+local_engine = None
+if CV_LOCAL_FALLBACK:
+    local_engine = LocalFallbackEngine(
+        model_path=LOCAL_MODEL_PATH,
+        labels=load_labels(LOCAL_LABELS_PATH) if LOCAL_LABELS_PATH and os.path.exists(LOCAL_LABELS_PATH) else None,
+        img_size=LOCAL_MODEL_SIZE,
+        log=tulis_log,
+    )
 
+def sample_latency():
+    """Latency engine aktif untuk batas bawah interval sampling."""
+    if active_engine == "local" and local_engine is not None:
+        # Fallback lokal tidak di-pipeline: satu frame per latency
+        return local_engine.latency_ema * CV_MAX_IN_FLIGHT if local_engine.latency_ema is not None else None
+    return inference_client.rtt_ema
+
+def select_engine():
+    """
+    Pilih server atau fallback lokal. Pindah ke lokal jika koneksi putus atau
+    RTT EMA > CV_LATENCY_BUDGET_MS; kembali ke server setelah RTT turun di
+    bawah 80% budget (hysteresis supaya tidak bolak-balik).
+    """
+    global active_engine
+
+    if local_engine is None:
+        return active_engine
+
+    rtt = inference_client.rtt_ema
+    budget = CV_LATENCY_BUDGET_MS / 1000.0
+    if not inference_client.connected:
+        engine = "local"
+    elif active_engine == "server":
+        engine = "local" if rtt is not None and rtt > budget else "server"
+    else:
+        engine = "server" if rtt is None or rtt <= 0.8 * budget else "local"
+
+    if engine != active_engine:
+        print(f"Inference engine: {active_engine} -> {engine}")
+        tulis_log(f"Inference engine: {active_engine} -> {engine} (rtt_ema={rtt})")
+        active_engine = engine
+    return engine
+
+def motion_thumbnail(img):
+    """Thumbnail grayscale kecil untuk skor gerakan antar sample (murah di Pi)."""
+    small = cv2.resize(img, (MOTION_THUMB_SIZE, MOTION_THUMB_SIZE), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return small
+
+def release_frame(frame_data):
+    """Kembalikan buffer kamera ke FrameGrabber setelah frame selesai di-encode."""
+    release = frame_data.get('release')
+    if release is not None:
+        release()
+
+def inference_worker():
+    """
+    Ambil frame dari queue lalu kirim; balasan diproses thread receiver (publish_result).
+    Saat server tidak bisa dipakai frame diklasifikasi lokal, sambil tetap reconnect /
+    mengirim frame probe supaya bisa kembali ke server.
+    """
+    next_reconnect = 0.0
+    hello_applied = False
     while running:
         try:
             # 1. Ambil frame dari queue
             frame_data = frame_queue.get(timeout=0.1)
-            frame_rgb = frame_data['img']
-            
+        except queue.Empty:
+            continue
+
+        try:
             # 2. Cek koneksi WS
-            if ws is None or not ws.connected:
-                ws = connect_ws()
-                if ws is None:
-                    frame_queue.task_done()
-                    time.sleep(1) 
-                    continue
-
-            # 3. Encode gambar
-            frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
-            _, buffer = cv2.imencode('.jpg', frame_bgr, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-            frame_bytes = buffer.tobytes()
-
-            # 4. Kirim dan Terima (Critical Section)
-            try:
-                ws.send_binary(frame_bytes)
-                
-                # RECV SEKARANG AMAN KARENA ADA TIMEOUT
-                result_str = ws.recv() 
-                
-                result_json = json.loads(result_str)
-
-                print(f"cv result: {result_str}")
-                tulis_log(f"cv result: {result_str}")
-                
-                with result_lock:
-                    latest_result['found'] = result_json['found']
-                    latest_result['label'] = result_json['label']
-                    latest_result['confidence'] = result_json['confidence']
-
-                if result_json['found']:
-                    print(f"Docker Detected: {result_json['label']} ({result_json['confidence']:.2f})")
-                    tulis_log(f"Docker Detected: {result_json['label']} ({result_json['confidence']:.2f})")
-                    label_detection_history.append({
-                        "label": result_json['label'], 
-                        "confidence": result_json['confidence']
-                    })
-                    
-                    new_status = determine_final_status(label_detection_history)
-                    status_detection_history.append(new_status)
-
-            except (TimeoutError, WebSocketTimeoutException):
-                print("WebSocket Timeout - Docker lambat merespon")
-                tulis_log("WebSocket Timeout")
-                # Close socket agar reconnect di loop berikutnya
-                try: ws.close()
-                except: pass
-                ws = None
-                
-            except Exception as e:
-                print(f"Error during WS send/recv: {e}")
-                tulis_log(f"Error during WS send/recv: {e}")
-                try: ws.close()
-                except: pass
-                ws = None
+            if not inference_client.connected and time.monotonic() >= next_reconnect:
+                if not inference_client.connect():
+                    if local_engine is None:
+                        time.sleep(1) 
+                        continue
+                    next_reconnect = time.monotonic() + CV_RECONNECT_INTERVAL_S
 
-            frame_queue.task_done()
+            # Backend bisa tersambung dari thread prober; label dipakai sekali saja
+            if not hello_applied and inference_client.hello_reply is not None:
+                hello_applied = True
+                if recorder is not None:
+                    recorder.record_hello(inference_client.hello_reply)
+                status_smoother.set_labels(inference_client.labels)
+                if local_engine is not None:
+                    local_engine.set_labels(inference_client.labels)
+                    if LOCAL_LABELS_PATH and inference_client.labels and not os.path.exists(LOCAL_LABELS_PATH):
+                        try:
+                            save_labels(LOCAL_LABELS_PATH, inference_client.labels)
+                        except OSError as e:
+                            tulis_log(f"Failed to save local labels: {e}")
+
+            # 3. Encode + kirim tanpa menunggu balasan (maks CV_MAX_IN_FLIGHT frame di jalan)
+            if select_engine() == "server":
+                inference_client.send(frame_data)
+            else:
+                # Probe latency server hanya jika ada slot kosong (tidak menunggu)
+                if inference_client.can_send():
+                    inference_client.send(frame_data)
+                publish_result(dict(local_engine(frame_data['img']), capture_ts=frame_data['capture_ts']))
 
-        except queue.Empty:
-            continue
         except Exception as e:
             print(f"Critical Error in inference worker: {e}")
             tulis_log(f"Critical Error in inference worker: {e}")
             time.sleep(1) # Sleep agar tidak cpu spike jika error loop
+        finally:
+            release_frame(frame_data)
+            frame_queue.task_done()
 
 class BotClassifier():
     def __init__(self, cap):
-        self.prev_time = time.time()
-        self.frame_count = 0
         self.cap = cap
         self.pid = os.getpid()
         self.process = psutil.Process(self.pid)
 
-    def classifier_loop(self):
-        global status_detection_history, latest_result, frame_queue
-        
-        ret, frame = self.cap.read()
-        if not ret: return "Error", latest_result
-        
-        self.frame_count += 1
-        frame_h, frame_w = frame.shape[:2]
-        
-        if self.frame_count % DETECT_EVERY_N_FRAMES == 0:
-            self.frame_count = 0
-            
+        # Kamera dibaca thread sendiri; hanya frame yang jatuh tempo (sampler) yang di-decode.
+        # Rekaman sudah berisi frame sample saja: replay memakai semua frame + timestamp aslinya.
+        if isinstance(cap, ReplayCapture):
+            self.grabber = FrameGrabber(cap, sample_every=1, clock=cap.capture_time).start()
+        else:
+            self.grabber = FrameGrabber(
+                cap,
+                sample_every=DETECT_EVERY_N_FRAMES,
+                sampler=sampler if CV_ADAPTIVE_SAMPLING else None,
+            ).start()
+        self.last_seq = 0
+        self.prev_thumb = None
+
+        self.monitor = None
+        if CV_MONITOR:
+            self.monitor = ResourceSampler(
+                self.process,
+                interval=CV_MONITOR_INTERVAL_S,
+                size=CV_MONITOR_SIZE,
+                counters={
+                    "grabbed": lambda: self.grabber.grabbed,
+                    "sampled": lambda: self.grabber.retrieved,
+                    "sent": lambda: sum(b.client.sent for b in inference_client.backends),
+                    "results": lambda: results_published,
+                    "timeouts": lambda: sum(b.client.timeouts for b in inference_client.backends),
+                },
+                gauges={
+                    "rtt_ms": lambda: round(inference_client.rtt_ema * 1000.0, 1) if inference_client.rtt_ema is not None else None,
+                    "engine": lambda: active_engine,
+                },
+                dump_fn=tulis_log,
+                dump_every=int(CV_MONITOR_DUMP_S / CV_MONITOR_INTERVAL_S) if CV_MONITOR_DUMP_S > 0 else 0,
+            ).start()
+
+    def start(self, on_result, wait=0.5):
+        """
+        Event-driven: thread classifier-feeder menyerahkan frame ke inference worker,
+        dan on_result(status, result) dipanggil tiap ada hasil baru (bukan di-poll).
+        """
+        result_listeners.append(on_result)
+
+        def feed():
+            failed = False
+            while running:
+                status, result = self.classifier_loop(timeout=wait)
+                if status == "Error" and not failed:
+                    on_result(status, result)
+                failed = status == "Error"
+                if failed:
+                    time.sleep(wait)
+
+        self.feeder = threading.Thread(target=feed, name="classifier-feeder", daemon=True)
+        self.feeder.start()
+
+    def stop(self):
+        self.grabber.stop()
+        if self.monitor is not None:
+            self.monitor.stop()
+
+    def resource_snapshot(self, last=None):
+        """Sample resource terakhir (lihat ResourceSampler.sample untuk field-nya)."""
+        return self.monitor.snapshot(last) if self.monitor is not None else []
+
+    @property
+    def finished(self):
+        """Replay selesai: semua frame rekaman sudah dikirim dan dibalas."""
+        return (getattr(self.cap, "finished", False) and frame_queue.unfinished_tasks == 0
+                and inference_client.in_flight() == 0 and self.grabber.latest_seq() == self.last_seq)
+
+    def stats(self):
+        return {
+            "capture": self.grabber.stats(),
+            "client": inference_client.stats(),
+            "engine": active_engine,
+            "smoother": status_smoother.stats(),
+            "sampler": sampler.stats(),
+            "log": log_writer.stats(),
+            "resources": self.resource_snapshot(last=1),
+        }
+
+    def set_state(self, bot_status, awaiting_confirmation=False):
+        """Dipanggil main loop: state bot menentukan rate sampling."""
+        sampler.set_state(bot_status, awaiting_confirmation)
+
+    def update_motion(self, img):
+        thumb = motion_thumbnail(img)
+        if self.prev_thumb is not None:
+            sampler.observe_motion(float(cv2.absdiff(thumb, self.prev_thumb).mean()))
+        self.prev_thumb = thumb
+
+    def classifier_loop(self, timeout=0.0):
+        """
+        Serahkan frame sample terbaru (jika ada) ke inference worker lalu return status.
+        Tidak menunggu kamera; `timeout` > 0 hanya membatasi berapa lama menunggu sample baru.
+        """
+        global latest_result, frame_queue
+
+        if timeout > 0:
+            frame = self.grabber.wait(self.last_seq, timeout)
+        else:
+            frame = self.grabber.acquire(self.last_seq)
+
+        if frame is None:
+            if self.grabber.failed: return "Error", latest_result
+        else:
+            self.last_seq = frame.seq
+            if recorder is not None:
+                recorder.record_frame(frame.img, frame.capture_ts)
+            if CV_ADAPTIVE_SAMPLING:
+                self.update_motion(frame.img)
             if frame_queue.empty():
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                frame_h, frame_w = frame.img.shape[:2]
                 frame_data = {
-                    'img': rgb_frame,
+                    'img': frame.img,
                     'size': (frame_h, frame_w),
-                    'mode': current_mode
+                    'mode': current_mode,
+                    'capture_ts': frame.capture_ts,
+                    'release': frame.release,
                 }
                 frame_queue.put(frame_data)
-            
-            # --- Debug Performance ---
-            # cur_time = time.time()
-            # fps = 1.0 / (cur_time - self.prev_time) if (cur_time - self.prev_time) > 0 else 0.0
-            # self.prev_time = cur_time
+            else:
+                frame.release()
 
-        if not status_detection_history:
+        if status_smoother.status is None:
             return "Working - nothing detected", latest_result
-
-        distracted_count = sum(1 for status in status_detection_history if status == "Distracted")
-        threshold = len(status_detection_history) - 1
-        if distracted_count >= threshold:
-            return "Distracted", latest_result
-        return "Working", latest_result
\ No newline at end of file
+        return status_smoother.status, latest_result
@@ -0,0 +1,239 @@
+import json
+import threading
+import time
+
+import cv2
+from websocket import create_connection, WebSocketTimeoutException
+
+from src.docker.frame_protocol import encode_frame, downscale, hello_request, PIXFMT_NAMES, ENCODING_NAMES
+
+
+class PipelinedInferenceClient:
+    """
+    Klien WebSocket ke inference server dengan beberapa frame sekaligus di jalan.
+
+    Sender (thread pemanggil `send`) mengirim frame bertanda sequence number
+    selama jumlah frame in-flight < `max_in_flight`. Thread receiver membaca
+    balasan, mencocokkan `seq` yang di-echo server, dan membuang balasan yang
+    sudah basi (seq <= seq terakhir yang dipakai) atau tidak dikenal. Jadi RTT
+    jaringan tidak lagi membatasi sample rate seperti send/recv lockstep.
+
+    `on_result(result, rtt)` dipanggil dari thread receiver untuk tiap balasan
+    yang masih baru. `connect_fn(url, timeout)` bisa diganti (mis. ReplayWebSocket).
+    """
+
+    def __init__(self, url, on_result, max_in_flight=3, timeout=2.0, log=print,
+                 encoding="jpeg", pixel_format="bgr", jpeg_quality=80, max_side=0,
+                 connect_fn=create_connection):
+        self.url = url
+        self.connect_fn = connect_fn
+        self.on_result = on_result
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.timeout = timeout
+        self.log = log
+
+        self.pixel_format = pixel_format
+        self.frame_conf = {"encoding": encoding, "jpeg_quality": jpeg_quality, "max_side": max_side}
+
+        self.ws = None
+        self.labels = None  # label kelas dari balasan hello
+        self.hello_reply = None
+        self._receiver = None
+        self._seq = 0
+        self._last_applied = 0
+        self._pending = {}  # seq -> waktu kirim (monotonic)
+        self._cond = threading.Condition()
+
+        # Stats
+        self.sent = 0
+        self.received = 0
+        self.stale = 0
+        self.timeouts = 0
+        self.rtt_ema = None
+
+    @property
+    def connected(self):
+        return self.ws is not None and self.ws.connected
+
+    def in_flight(self):
+        with self._cond:
+            return len(self._pending)
+
+    # -------- CONNECTION --------
+
+    def connect(self):
+        try:
+            # Set timeout saat connect juga
+            conn = self.connect_fn(self.url, timeout=self.timeout)
+            self.log("websocket connected!")
+
+            # Negosiasi encoding / kualitas / ukuran frame
+            preferred = self.frame_conf["encoding"]
+            encodings = [preferred] + [e for e in ENCODING_NAMES if e != preferred]
+            conn.send(hello_request(encodings, (self.pixel_format,),
+                                    self.frame_conf["jpeg_quality"], self.frame_conf["max_side"]))
+            reply = json.loads(conn.recv())
+            if reply.get("type") == "hello":
+                self.frame_conf["encoding"] = reply["encoding"]
+                self.frame_conf["jpeg_quality"] = reply["jpeg_quality"]
+                self.frame_conf["max_side"] = reply["max_side"]
+                self.labels = reply.get("labels")
+                self.hello_reply = reply
+                self.log(f"frame protocol: {self.frame_conf}")
+        except Exception as e:
+            # Jangan spam log jika gagal connect terus menerus
+            print(f"Failed to connect to Docker: {e}")
+            return False
+
+        with self._cond:
+            self.ws = conn
+            self._pending.clear()
+            self._last_applied = self._seq
+        self._receiver = threading.Thread(target=self._receive_loop, args=(conn,), name="ws-receiver", daemon=True)
+        self._receiver.start()
+        return True
+
+    def close(self):
+        with self._cond:
+            conn, self.ws = self.ws, None
+            self._pending.clear()
+            self._cond.notify_all()
+        if conn is not None:
+            try: conn.close()
+            except Exception: pass
+
+    # -------- SEND --------
+
+    def _encode(self, frame_data, seq):
+        # Frame kamera BGR dikirim apa adanya (tanpa konversi warna) kecuali
+        # dikonfigurasi lain; server yang mengubah ke RGB sekali.
+        frame = downscale(frame_data['img'], self.frame_conf["max_side"])
+        if self.pixel_format == "gray":
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        elif self.pixel_format == "rgb":
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return encode_frame(
+            frame,
+            PIXFMT_NAMES[self.pixel_format],
+            ENCODING_NAMES[self.frame_conf["encoding"]],
+            seq=seq,
+            capture_ts=frame_data['capture_ts'],
+            quality=self.frame_conf["jpeg_quality"],
+        )
+
+    def _expire_locked(self, now):
+        expired = [s for s, t in self._pending.items() if now - t > self.timeout]
+        for s in expired:
+            del self._pending[s]
+        self.timeouts += len(expired)
+        return len(expired)
+
+    def expire(self):
+        """Buang frame in-flight yang melewati timeout. Return jumlah yang dibuang."""
+        with self._cond:
+            return self._expire_locked(time.monotonic())
+
+    def send(self, frame_data):
+        """
+        Kirim satu frame. Menunggu slot in-flight kosong (maks `timeout`).
+        Return False jika koneksi putus / server tidak membalas (koneksi ditutup).
+        """
+        with self._cond:
+            deadline = time.monotonic() + self.timeout
+            while self.ws is not None and len(self._pending) >= self.max_in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            if self.ws is None:
+                return False
+            stalled = len(self._pending) >= self.max_in_flight
+            if stalled:
+                # Semua slot habis sampai timeout: server macet / koneksi mati
+                self._expire_locked(time.monotonic())
+            else:
+                self._seq += 1
+                seq = self._seq
+
+        if stalled:
+            print("WebSocket Timeout - Docker lambat merespon")
+            self.log("WebSocket Timeout")
+            self.close()
+            return False
+
+        try:
+            payload = self._encode(frame_data, seq)
+            with self._cond:
+                self._pending[seq] = time.monotonic()
+            self.ws.send_binary(payload)
+            self.sent += 1
+            return True
+        except Exception as e:
+            print(f"Error during WS send: {e}")
+            self.log(f"Error during WS send: {e}")
+            self.close()
+            return False
+
+    # -------- RECEIVE --------
+
+    def _receive_loop(self, conn):
+        while self.ws is conn:
+            try:
+                result_str = conn.recv()
+            except (TimeoutError, WebSocketTimeoutException):
+                # Tidak ada balasan selama `timeout`: wajar jika tidak ada frame in-flight
+                if self.expire() and self.ws is conn:
+                    print("WebSocket Timeout - Docker lambat merespon")
+                    self.log("WebSocket Timeout")
+                continue
+            except Exception as e:
+                if self.ws is conn:
+                    print(f"Error during WS recv: {e}")
+                    self.log(f"Error during WS recv: {e}")
+                    self.close()
+                return
+
+            try:
+                result = json.loads(result_str)
+            except ValueError:
+                continue
+            self._handle(result)
+
+    def _handle(self, result):
+        seq = result.get("seq")
+        now = time.monotonic()
+        with self._cond:
+            if seq is None:
+                # Server lama tanpa echo seq: anggap urut (lockstep)
+                sent_at = self._pending.pop(min(self._pending), None) if self._pending else None
+                fresh = True
+            else:
+                sent_at = self._pending.pop(seq, None)
+                fresh = sent_at is not None and seq > self._last_applied
+                if fresh:
+                    self._last_applied = seq
+            self._cond.notify_all()
+
+        self.received += 1
+        if not fresh:
+            # Balasan out-of-order / sudah timeout: hasil yang lebih baru sudah dipakai
+            self.stale += 1
+            return
+
+        rtt = (now - sent_at) if sent_at is not None else None
+        if rtt is not None:
+            self.rtt_ema = rtt if self.rtt_ema is None else 0.8 * self.rtt_ema + 0.2 * rtt
+        self.on_result(result, rtt)
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "connected": self.connected,
+            "in_flight": self.in_flight(),
+            "sent": self.sent,
+            "received": self.received,
+            "stale": self.stale,
+            "timeouts": self.timeouts,
+            "rtt_ema_ms": self.rtt_ema * 1000.0 if self.rtt_ema is not None else None,
+        }
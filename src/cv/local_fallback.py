@@ -0,0 +1,159 @@
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+# Label hasil mode presence-only (tanpa model HAR lokal): ada orang di depan kamera
+PRESENCE_LABEL = "present"
+
+_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+def load_labels(path):
+    """File label: JSON list atau satu label per baris."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        labels = json.loads(text)
+    except ValueError:
+        labels = [line.strip() for line in text.splitlines() if line.strip()]
+    return [str(label) for label in labels]
+
+
+def save_labels(path, labels):
+    """Simpan label (JSON list), mis. dari hello server, supaya boot offline berikutnya tetap punya label."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(list(labels), f)
+
+
+class LocalFallbackEngine:
+    """
+    Klasifikasi di Pi saat inference server tidak bisa dipakai (mode degradasi).
+
+    - Deteksi orang: HOG people detector bawaan OpenCV (badan penuh), lalu
+      Haar cascade upper body / wajah (orang duduk dekat kamera). Tanpa file
+      model tambahan.
+    - Jika `model_path` (ONNX, mis. har_model.onnx hasil export engines.py)
+      ada: crop orang diklasifikasi lewat cv2.dnn, jadi gesture start/stop
+      tetap dikenali. Kalau tidak ada deteksi, seluruh frame yang
+      diklasifikasi dan `found` tetap True, sama seperti crop_person di server.
+    - Tanpa model: hanya presence, label `PRESENCE_LABEL` (gesture mati
+      offline); `found` hanya True jika salah satu detector menemukan orang.
+
+    Hasil berformat sama dengan balasan server, plus field "engine".
+    Dipanggil dari satu thread saja (inference worker).
+    """
+
+    def __init__(self, model_path=None, labels=None, img_size=224, max_side=320, log=print):
+        self.img_size = img_size
+        self.max_side = max_side
+        self.log = log
+        self.labels = list(labels or [])
+
+        self.net = None
+        if model_path and os.path.exists(model_path):
+            try:
+                self.net = cv2.dnn.readNetFromONNX(model_path)
+                self.log(f"local fallback model loaded: {model_path}")
+            except cv2.error as e:
+                self.log(f"local fallback model failed to load: {e}")
+        if self.net is None:
+            # File ini hanya ada jika server pernah jalan dengan HAR_ENGINE=onnx di checkout yang sama
+            warning = (f"local fallback: no HAR model at {model_path!r}, presence only "
+                       f"(start/stop gestures disabled offline). Copy har_model.onnx from the server's "
+                       f"ENGINE_CACHE_DIR (exported with HAR_ENGINE=onnx) or set LOCAL_MODEL_PATH.")
+            print(warning)
+            self.log(warning)
+
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+        # HOG mencari pejalan kaki 64x128 (badan penuh); cascade menangkap orang duduk
+        self.cascades = []
+        cascade_dir = getattr(getattr(cv2, "data", None), "haarcascades", "")
+        for name in ("haarcascade_upperbody.xml", "haarcascade_frontalface_default.xml"):
+            cascade = cv2.CascadeClassifier(os.path.join(cascade_dir, name))
+            if not cascade.empty():
+                self.cascades.append(cascade)
+
+        # Stats
+        self.frames = 0
+        self.latency_ema = None
+
+    @property
+    def engine_name(self):
+        return "local-dnn" if self.net is not None and self.labels else "local-hog"
+
+    def set_labels(self, labels):
+        """Label dari balasan hello server (urutan output model sama dengan server)."""
+        if labels and not self.labels:
+            self.labels = list(labels)
+
+    def _detect_person(self, frame_bgr):
+        h, w = frame_bgr.shape[:2]
+        scale = 1.0
+        if self.max_side and max(h, w) > self.max_side:
+            scale = self.max_side / float(max(h, w))
+            frame_bgr = cv2.resize(frame_bgr, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+        rects, weights = self.hog.detectMultiScale(frame_bgr, winStride=(8, 8), padding=(8, 8), scale=1.05)
+        if len(rects) > 0:
+            best = int(np.argmax(np.ravel(weights)))
+            x, y, bw, bh = (int(v / scale) for v in rects[best])
+            return (x, y, bw, bh), float(np.ravel(weights)[best])
+
+        if self.cascades:
+            gray = cv2.equalizeHist(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY))
+            for cascade in self.cascades:
+                rects = cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4, minSize=(40, 40))
+                if len(rects) > 0:
+                    # Box terbesar, tanpa skor: anggap cukup yakin
+                    x, y, bw, bh = max(rects, key=lambda r: r[2] * r[3])
+                    return tuple(int(v / scale) for v in (x, y, bw, bh)), 1.0
+        return None, 0.0
+
+    def _classify(self, crop_bgr):
+        rgb = cv2.cvtColor(cv2.resize(crop_bgr, (self.img_size, self.img_size)), cv2.COLOR_BGR2RGB)
+        x = (rgb.astype(np.float32) / 255.0 - _MEAN) / _STD
+        self.net.setInput(x.transpose(2, 0, 1)[np.newaxis])
+        logits = self.net.forward().ravel()
+        exp = np.exp(logits - logits.max())
+        probs = exp / exp.sum()
+        top_idx = int(np.argmax(probs))
+        label = self.labels[top_idx] if top_idx < len(self.labels) else "Unknown"
+        return label, float(probs[top_idx])
+
+    def __call__(self, frame_bgr):
+        t0 = time.perf_counter()
+        result = {"found": False, "label": "Unknown", "confidence": 0.0, "engine": self.engine_name}
+
+        box, score = self._detect_person(frame_bgr)
+        if self.net is not None and self.labels:
+            # Sama seperti server: tanpa deteksi, klasifikasi seluruh frame
+            crop = frame_bgr
+            if box is not None:
+                x, y, bw, bh = box
+                crop = frame_bgr[max(0, y):y + bh, max(0, x):x + bw]
+                if crop.shape[0] <= 10 or crop.shape[1] <= 10:
+                    crop = frame_bgr
+            label, conf = self._classify(crop)
+            result.update(found=True, label=label, confidence=conf)
+        elif box is not None:
+            result.update(found=True, label=PRESENCE_LABEL, confidence=min(1.0, max(0.0, score)))
+
+        elapsed = time.perf_counter() - t0
+        self.latency_ema = elapsed if self.latency_ema is None else 0.8 * self.latency_ema + 0.2 * elapsed
+        self.frames += 1
+        return result
+
+    def stats(self):
+        return {
+            "engine": self.engine_name,
+            "frames": self.frames,
+            "latency_ema_ms": self.latency_ema * 1000.0 if self.latency_ema is not None else None,
+        }
@@ -0,0 +1,156 @@
+import os
+import queue
+import threading
+import time
+
+
+class BatchedLogWriter:
+    """
+    Sink log di background thread supaya inference tidak pernah menunggu SD card.
+
+    - `write()` hanya memasukkan baris ke queue terbatas; jika penuh baris dibuang
+      dan dihitung (`dropped`), tidak pernah blocking.
+    - Thread writer menulis per batch, lalu fsync setiap `fsync_every_lines`
+      baris atau `fsync_interval_ms` milidetik (mana yang duluan). 0 = tidak pernah fsync.
+    - Rotasi berdasarkan ukuran: file.log -> file.log.1 -> ... -> file.log.N.
+    """
+
+    def __init__(self, path, queue_size=1000, fsync_interval_ms=1000, fsync_every_lines=200,
+                 max_bytes=5 * 1024 * 1024, backup_count=3, batch_size=256):
+        self.path = path
+        self.fsync_interval = fsync_interval_ms / 1000.0
+        self.fsync_every_lines = fsync_every_lines
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._unsynced_lines = 0
+        self._last_fsync = time.monotonic()
+
+        self.written = 0
+        self.dropped = 0
+        self._reported_dropped = 0
+        self.rotations = 0
+
+    # -------- PRODUCER --------
+
+    def write(self, line):
+        """Non-blocking. Return False jika queue penuh dan baris dibuang."""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(line)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self, timeout=2.0):
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    # -------- WRITER THREAD --------
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+
+    def _fsync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced_lines = 0
+        self._last_fsync = time.monotonic()
+
+    def _rotate(self):
+        self._fsync()
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+        self._open()
+
+    def _drain(self, first):
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        try:
+            self._open()
+        except Exception as e:
+            print(f"Gagal membuka log: {e}")
+            return
+
+        stop = False
+        while not stop:
+            timeout = self.fsync_interval if self.fsync_interval > 0 else None
+            try:
+                batch = self._drain(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                batch = []
+
+            if None in batch:
+                stop = True
+                batch = [line for line in batch if line is not None]
+
+            if self.dropped != self._reported_dropped:
+                batch.append(f"[log] {self.dropped - self._reported_dropped} lines dropped (queue full)\n")
+                self._reported_dropped = self.dropped
+
+            try:
+                if batch:
+                    data = "".join(batch)
+                    self._file.write(data)
+                    # Rotasi dihitung dalam byte (tell() juga byte), bukan jumlah karakter
+                    self._size += len(data.encode("utf-8"))
+                    self._unsynced_lines += len(batch)
+                    self.written += len(batch)
+
+                due = (self.fsync_every_lines > 0 and self._unsynced_lines >= self.fsync_every_lines) or \
+                      (self.fsync_interval > 0 and self._unsynced_lines > 0 and
+                       time.monotonic() - self._last_fsync >= self.fsync_interval)
+                if due or stop:
+                    self._fsync()
+                elif batch:
+                    self._file.flush()
+
+                if self.max_bytes > 0 and self._size >= self.max_bytes:
+                    self._rotate()
+            except Exception as e:
+                print(f"Gagal menulis log: {e}")
+
+        self._file.close()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+        }
@@ -0,0 +1,279 @@
+"""
+Rekam & putar ulang pipeline vision (frame kamera + balasan server).
+
+Format file (little endian):
+
+    magic b"PBREC1\\n"
+    record*:  kind (uint8) | wall time (float64) | length (uint32) | payload
+
+    kind 1  FRAME     payload = pesan frame_protocol (JPEG BGR, capture_ts di header)
+    kind 2  RESPONSE  payload = JSON balasan server (berisi capture_ts yang di-echo)
+    kind 3  HELLO     payload = JSON balasan hello (encoding, labels, ...)
+
+Record ditulis per chunk (buffer di memori, flush tiap `chunk_records`), jadi
+perekaman tidak menulis ke disk tiap frame. File yang terpotong (robot mati)
+tetap terbaca sampai record utuh terakhir.
+
+Pembaca memakai mmap: hanya index offset yang dibangun saat buka, frame
+di-decode saat diminta.
+"""
+import bisect
+import json
+import mmap
+import queue
+import struct
+import threading
+import time
+
+import cv2
+import numpy as np
+from websocket import WebSocketTimeoutException
+
+from src.docker.frame_protocol import encode_frame, HEADER, PIXFMT_BGR, ENCODING_JPEG
+
+MAGIC = b"PBREC1\n"
+RECORD = struct.Struct("<BdI")
+
+KIND_FRAME = 1
+KIND_RESPONSE = 2
+KIND_HELLO = 3
+
+
+class Recorder:
+    """Thread-safe: frame dari main loop, balasan dari thread receiver."""
+
+    def __init__(self, path, jpeg_quality=90, chunk_records=32):
+        self.path = path
+        self.jpeg_quality = jpeg_quality
+        self.chunk_records = max(1, int(chunk_records))
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._chunk = []
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.responses = 0
+
+    def _append(self, kind, payload):
+        with self._lock:
+            if self._file is None:
+                return
+            self._chunk.append(RECORD.pack(kind, time.time(), len(payload)) + payload)
+            if len(self._chunk) >= self.chunk_records:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._chunk:
+            self._file.write(b"".join(self._chunk))
+            self._file.flush()
+            self._chunk = []
+
+    def record_frame(self, frame_bgr, capture_ts):
+        payload = encode_frame(frame_bgr, PIXFMT_BGR, ENCODING_JPEG, capture_ts=capture_ts,
+                               quality=self.jpeg_quality)
+        self._append(KIND_FRAME, payload)
+        self.frames += 1
+
+    def record_response(self, result):
+        self._append(KIND_RESPONSE, json.dumps(result).encode("utf-8"))
+        self.responses += 1
+
+    def record_hello(self, reply):
+        self._append(KIND_HELLO, json.dumps(reply).encode("utf-8"))
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            self._flush_locked()
+            self._file.close()
+            self._file = None
+
+
+class RecordingReader:
+    def __init__(self, path):
+        self.path = path
+        self._fh = open(path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a recording")
+
+        self.frames = []       # (capture_ts, offset, length)
+        self.responses = []    # dict, urut capture_ts
+        self.hello = None
+
+        offset = len(MAGIC)
+        size = len(self._mm)
+        while offset + RECORD.size <= size:
+            kind, wall_ts, length = RECORD.unpack_from(self._mm, offset)
+            start = offset + RECORD.size
+            if start + length > size:
+                break  # record terakhir terpotong
+            if kind == KIND_FRAME:
+                capture_ts = HEADER.unpack_from(self._mm, start)[-1]
+                self.frames.append((capture_ts, start, length))
+            elif kind == KIND_RESPONSE:
+                result = json.loads(self._mm[start:start + length])
+                result["_received_at"] = wall_ts
+                self.responses.append(result)
+            elif kind == KIND_HELLO:
+                self.hello = json.loads(self._mm[start:start + length])
+            offset = start + length
+
+        self.responses.sort(key=lambda r: r.get("capture_ts", 0.0))
+        self._response_ts = [r.get("capture_ts", 0.0) for r in self.responses]
+
+    def frame(self, index):
+        """Frame ke-index sebagai array BGR (decode dari mmap, tanpa copy file)."""
+        _, start, length = self.frames[index]
+        payload = np.frombuffer(self._mm, np.uint8, count=length - HEADER.size, offset=start + HEADER.size)
+        return cv2.imdecode(payload, cv2.IMREAD_COLOR)
+
+    def response_for(self, capture_ts):
+        """Balasan untuk frame dengan capture_ts ini, atau balasan terakhir sebelumnya."""
+        i = bisect.bisect_right(self._response_ts, capture_ts) - 1
+        return self.responses[i] if i >= 0 else None
+
+    def close(self):
+        self._mm.close()
+        self._fh.close()
+
+
+class ReplayCapture:
+    """
+    Pengganti cv2.VideoCapture dari rekaman. `realtime=True` menjaga jarak
+    waktu antar frame seperti saat rekam. False: secepat mungkin tapi lockstep,
+    frame berikutnya baru di-grab setelah `advance()` (hasil frame sebelumnya
+    sudah dipakai), jadi tiap frame diproses tepat sekali dan hasilnya deterministik.
+    """
+
+    def __init__(self, reader, realtime=True, loop=False, step_timeout=5.0):
+        self.reader = reader
+        self.realtime = realtime
+        self.loop = loop
+        self.step_timeout = step_timeout
+        self._step = threading.Event()
+        self._step.set()
+        self.index = -1
+        self._opened = True
+        self._t0_wall = None
+        self._t0_rec = reader.frames[0][0] if reader.frames else 0.0
+
+    @property
+    def finished(self):
+        return not self.loop and self.index >= len(self.reader.frames) - 1
+
+    def isOpened(self):
+        return self._opened and bool(self.reader.frames)
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.reader.frames))
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.index + 1)
+        return 0.0
+
+    def capture_time(self):
+        """capture_ts asli frame yang terakhir di-grab (dipakai FrameGrabber sebagai clock)."""
+        return self.reader.frames[max(0, self.index)][0]
+
+    def grab(self):
+        if not self._opened or not self.reader.frames:
+            return False
+        if self.index + 1 >= len(self.reader.frames):
+            if not self.loop:
+                return False
+            self.index = -1
+            self._t0_wall = None
+        if not self.realtime:
+            # Timeout supaya replay tidak macet jika satu frame tidak menghasilkan apa-apa
+            self._step.wait(self.step_timeout)
+            self._step.clear()
+        self.index += 1
+
+        if self.realtime:
+            ts = self.reader.frames[self.index][0]
+            if self._t0_wall is None:
+                self._t0_wall, self._t0_rec = time.monotonic(), ts
+            delay = (ts - self._t0_rec) - (time.monotonic() - self._t0_wall)
+            if delay > 0:
+                time.sleep(delay)
+        return True
+
+    def advance(self):
+        """Mode lockstep: izinkan grab frame berikutnya."""
+        self._step.set()
+
+    def retrieve(self, image=None, flag=None):
+        if self.index < 0:
+            return False, None
+        frame = self.reader.frame(self.index)
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            np.copyto(image, frame)
+            frame = image
+        return frame is not None, frame
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def release(self):
+        self._opened = False
+        self._step.set()
+
+
+class ReplayWebSocket:
+    """
+    Pengganti koneksi websocket-client: membalas tiap frame dengan balasan
+    server yang terekam untuk capture_ts frame tersebut (seq diganti seq baru).
+    Realtime: balasan ditunda sebesar RTT saat rekam; fast: langsung.
+    """
+
+    def __init__(self, reader, timeout=2.0, realtime=True):
+        self.reader = reader
+        self.timeout = timeout
+        self.realtime = realtime
+        self.connected = True
+        self._inbox = queue.Queue()
+        self.replies = 0
+        self.misses = 0
+
+    def send(self, text):
+        request = json.loads(text)
+        if request.get("type") == "hello":
+            reply = self.reader.hello or {"type": "hello", "encoding": "jpeg", "jpeg_quality": 80, "max_side": 0}
+            self._inbox.put(json.dumps(reply))
+
+    def send_binary(self, payload):
+        seq, capture_ts = HEADER.unpack_from(payload)[-2:]
+        recorded = self.reader.response_for(capture_ts)
+        if recorded is None:
+            self.misses += 1
+            reply = {"found": False, "label": "Unknown", "confidence": 0.0}
+            delay = 0.0
+        else:
+            reply = {k: v for k, v in recorded.items() if not k.startswith("_")}
+            delay = max(0.0, recorded["_received_at"] - recorded.get("capture_ts", recorded["_received_at"]))
+        reply["seq"] = seq
+        reply["capture_ts"] = capture_ts
+        message = json.dumps(reply)
+        self.replies += 1
+
+        if self.realtime and delay > 0:
+            threading.Timer(min(delay, self.timeout), self._inbox.put, (message,)).start()
+        else:
+            self._inbox.put(message)
+
+    def recv(self):
+        if not self.connected:
+            raise ConnectionError("replay connection closed")
+        try:
+            return self._inbox.get(timeout=self.timeout)
+        except queue.Empty:
+            raise WebSocketTimeoutException("replay recv timeout")
+
+    def close(self):
+        self.connected = False
@@ -0,0 +1,196 @@
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+
+THERMAL_PATH = "/sys/class/thermal/thermal_zone0/temp"
+# Kernel Raspberry Pi baru: flag throttling tanpa spawn vcgencmd
+THROTTLED_PATH = "/sys/devices/platform/soc/soc:firmware/get_throttled"
+
+# Bit get_throttled (0-3 = sekarang, 16-19 = pernah terjadi sejak boot)
+THROTTLE_FLAGS = {
+    0: "under_voltage",
+    1: "freq_capped",
+    2: "throttled",
+    3: "soft_temp_limit",
+}
+
+
+def _read_sysfs(fd):
+    """Baca ulang file sysfs lewat fd yang tetap terbuka (tanpa open/close tiap sample)."""
+    os.lseek(fd, 0, os.SEEK_SET)
+    return os.read(fd, 64).decode().strip()
+
+
+def _open_sysfs(path):
+    try:
+        return os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+
+
+def decode_throttled(value):
+    if value is None:
+        return []
+    return [name for bit, name in THROTTLE_FLAGS.items() if value & (1 << bit)]
+
+
+class ResourceSampler:
+    """
+    Sampler resource Pi di background thread, satu sample tiap `interval` detik
+    ke ring buffer berukuran tetap (`size` sample terakhir).
+
+    Per sample: CPU% per thread (nama thread Python), CPU% proses, RSS, suhu SoC,
+    flag throttling, lalu laju (per detik) tiap `counters` dan nilai tiap
+    `gauges` (callable dari pemanggil, mis. frame kamera, hasil inference, RTT).
+
+    Biaya: beberapa baca /proc dan sysfs per detik (fd sysfs tetap terbuka);
+    vcgencmd hanya dipakai jika sysfs throttling tidak ada, dan jarang
+    (`vcgencmd_every` sample).
+
+    `snapshot()` mengembalikan copy ring buffer; `dump_fn(line)` opsional
+    dipanggil tiap `dump_every` sample dengan ringkasan satu baris.
+    """
+
+    def __init__(self, process, interval=1.0, size=300, counters=None, gauges=None,
+                 dump_fn=None, dump_every=0, vcgencmd_every=10):
+        self.process = process
+        self.interval = interval
+        self.counters = counters or {}
+        self.gauges = gauges or {}
+        self.dump_fn = dump_fn
+        self.dump_every = dump_every
+        self.vcgencmd_every = vcgencmd_every
+
+        self._samples = deque(maxlen=size)
+        self._thread = None
+        self._running = False
+        self._thermal_fd = _open_sysfs(THERMAL_PATH)
+        self._throttled_fd = _open_sysfs(THROTTLED_PATH)
+        self._last_throttled = None
+
+        self._prev_time = None
+        self._prev_cpu = None
+        self._prev_threads = {}
+        self._prev_counters = {}
+        self._count = 0
+        self.cost = 0.0  # total detik CPU dipakai sampler sendiri
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+
+    # -------- READERS --------
+
+    def _temperature(self):
+        if self._thermal_fd is None:
+            return None
+        try:
+            return int(_read_sysfs(self._thermal_fd)) / 1000.0
+        except (OSError, ValueError):
+            return None
+
+    def _throttled(self):
+        if self._throttled_fd is not None:
+            try:
+                return int(_read_sysfs(self._throttled_fd), 16)
+            except (OSError, ValueError):
+                return None
+        if self.vcgencmd_every and self._count % self.vcgencmd_every == 0:
+            try:
+                out = subprocess.run(["vcgencmd", "get_throttled"], capture_output=True, text=True, timeout=1)
+                self._last_throttled = int(out.stdout.strip().split("=")[1], 16)
+            except (OSError, ValueError, IndexError, subprocess.SubprocessError):
+                self._last_throttled = None
+        return self._last_throttled
+
+    def _thread_names(self):
+        return {t.native_id: t.name for t in threading.enumerate() if t.native_id is not None}
+
+    # -------- SAMPLING --------
+
+    def sample(self):
+        t_cost = time.thread_time()
+        now = time.monotonic()
+        dt = (now - self._prev_time) if self._prev_time is not None else None
+
+        cpu = self.process.cpu_times()
+        cpu_total = cpu.user + cpu.system
+        names = self._thread_names()
+        thread_cpu = {}
+        threads = {}
+        for t in self.process.threads():
+            total = t.user_time + t.system_time
+            threads[t.id] = total
+            prev = self._prev_threads.get(t.id)
+            if dt and prev is not None:
+                thread_cpu[names.get(t.id, str(t.id))] = round((total - prev) / dt * 100.0, 1)
+
+        rates = {}
+        for name, fn in self.counters.items():
+            value = fn()
+            prev = self._prev_counters.get(name)
+            if dt and prev is not None:
+                rates[name] = round((value - prev) / dt, 2)
+            self._prev_counters[name] = value
+
+        throttled = self._throttled()
+        sample = {
+            "ts": time.time(),
+            "cpu_percent": round((cpu_total - self._prev_cpu) / dt * 100.0, 1) if dt else None,
+            "threads": thread_cpu,
+            "rss_mb": round(self.process.memory_info().rss / (1024 * 1024), 1),
+            "temp_c": self._temperature(),
+            "throttled": throttled,
+            "throttle_flags": decode_throttled(throttled),
+            "rates": rates,
+            "gauges": {name: fn() for name, fn in self.gauges.items()},
+        }
+
+        self._prev_time = now
+        self._prev_cpu = cpu_total
+        self._prev_threads = threads
+        self._count += 1
+        if dt:
+            self._samples.append(sample)
+        self.cost += time.thread_time() - t_cost
+        return sample
+
+    def _run(self):
+        next_at = time.monotonic()
+        while self._running:
+            try:
+                sample = self.sample()
+                if self.dump_fn is not None and self.dump_every and self._count % self.dump_every == 0:
+                    self.dump_fn(self.format_line(sample))
+            except Exception as e:
+                print(f"Resource sampler error: {e}")
+            next_at += self.interval
+            time.sleep(max(0.0, next_at - time.monotonic()))
+
+    # -------- OUTPUT --------
+
+    def snapshot(self, last=None):
+        """Copy ring buffer (opsional hanya `last` sample terakhir), urut lama -> baru."""
+        samples = list(self._samples)
+        return samples[-last:] if last else samples
+
+    def overhead_percent(self):
+        elapsed = self._count * self.interval
+        return (self.cost / elapsed * 100.0) if elapsed > 0 else 0.0
+
+    @staticmethod
+    def format_line(sample):
+        threads = ",".join(f"{name}:{pct}" for name, pct in sorted(sample["threads"].items(), key=lambda kv: -kv[1])[:5])
+        rates = " ".join(f"{k}/s={v}" for k, v in sample["rates"].items())
+        gauges = " ".join(f"{k}={v}" for k, v in sample["gauges"].items())
+        throttled = hex(sample["throttled"]) if sample["throttled"] is not None else "-"
+        return (f"res cpu={sample['cpu_percent']}% rss={sample['rss_mb']}MB temp={sample['temp_c']}C "
+                f"thr={throttled} {rates} {gauges} threads={threads}")
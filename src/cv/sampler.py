@@ -0,0 +1,103 @@
+import time
+
+
+class AdaptiveSampler:
+    """
+    Menentukan kapan frame kamera berikutnya di-decode dan dikirim ke server.
+
+    Interval dasar per state bot (Idle lambat, Working/Break sedang), lalu:
+    - dipercepat ke `fast_interval` selama jendela konfirmasi gesture, saat ada
+      lonjakan gerakan, atau saat confidence label borderline;
+    - diperlambat (sampai `idle_interval`) jika scene statis cukup lama;
+    - tidak pernah lebih cepat dari yang sanggup dilayani server: interval >=
+      RTT / max_in_flight, supaya frame tidak menumpuk saat server melambat.
+
+    Dipanggil dari beberapa thread (grabber: `due`, main: `set_state`,
+    receiver: `observe_result`); semua field cukup assignment tunggal.
+    """
+
+    FAST_STATES = {"Confirm"}
+    SLOW_STATES = {"Idle"}
+
+    def __init__(self, idle_interval=1.0, active_interval=0.2, fast_interval=0.066,
+                 motion_threshold=6.0, motion_hold=2.0, static_after=10.0,
+                 borderline=(0.4, 0.85), latency_fn=None, max_in_flight=1):
+        self.idle_interval = idle_interval
+        self.active_interval = active_interval
+        self.fast_interval = fast_interval
+        self.motion_threshold = motion_threshold
+        self.motion_hold = motion_hold
+        self.static_after = static_after
+        self.borderline = borderline
+        self.latency_fn = latency_fn
+        self.max_in_flight = max(1, int(max_in_flight))
+
+        self.state = "Idle"
+        self.awaiting_confirmation = False
+        self._boost_until = 0.0
+        self._last_motion = time.monotonic()
+        self._last_sample = 0.0
+        self.last_motion_score = 0.0
+        self.reason = "idle"
+
+    # -------- INPUTS --------
+
+    def set_state(self, state, awaiting_confirmation=False):
+        self.state = state
+        self.awaiting_confirmation = awaiting_confirmation
+
+    def observe_motion(self, score, now=None):
+        """Skor gerakan antar sample (mis. mean abs diff thumbnail grayscale)."""
+        now = time.monotonic() if now is None else now
+        self.last_motion_score = score
+        if score >= self.motion_threshold:
+            self._last_motion = now
+            self._boost_until = now + self.motion_hold
+
+    def observe_result(self, label, confidence, now=None):
+        now = time.monotonic() if now is None else now
+        low, high = self.borderline
+        if label and low <= confidence < high:
+            self._boost_until = max(self._boost_until, now + self.motion_hold)
+
+    # -------- POLICY --------
+
+    def interval(self, now=None):
+        now = time.monotonic() if now is None else now
+
+        if self.awaiting_confirmation or self.state in self.FAST_STATES:
+            interval, reason = self.fast_interval, "confirmation"
+        elif now < self._boost_until:
+            interval, reason = self.fast_interval, "boost"
+        elif self.state in self.SLOW_STATES:
+            interval, reason = self.idle_interval, "idle"
+        elif now - self._last_motion >= self.static_after:
+            interval, reason = self.idle_interval, "static"
+        else:
+            interval, reason = self.active_interval, "active"
+
+        rtt = self.latency_fn() if self.latency_fn is not None else None
+        if rtt is not None:
+            floor = rtt / self.max_in_flight
+            if floor > interval:
+                interval, reason = floor, "backoff"
+
+        self.reason = reason
+        return interval
+
+    def due(self, now=None):
+        """True jika sudah waktunya sample berikutnya (dan tandai sebagai diambil)."""
+        now = time.monotonic() if now is None else now
+        if now - self._last_sample < self.interval(now):
+            return False
+        self._last_sample = now
+        return True
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "awaiting_confirmation": self.awaiting_confirmation,
+            "interval_ms": self.interval() * 1000.0,
+            "reason": self.reason,
+            "motion": self.last_motion_score,
+        }
@@ -0,0 +1,116 @@
+import math
+import threading
+import time
+
+
+class StatusSmoother:
+    """
+    Smoothing Working/Distracted secara inkremental: O(1) per hasil (terhadap
+    panjang histori), tanpa deque yang dihitung ulang tiap frame.
+
+    Tiap hasil diubah jadi p_work = peluang label termasuk `working_labels`:
+    - ada vektor `probs` (softmax server) + `labels`: jumlah probs kelas working;
+    - hanya label + confidence: conf jika label working, 1 - conf jika tidak;
+    - orang tidak ditemukan: 0 (tidak ada di depan kamera = bukti distraksi).
+
+    p_work di-EMA dengan konstanta waktu `tau` detik (alpha dihitung dari jarak
+    waktu antar hasil, jadi tidak tergantung sample rate). Keputusan pakai
+    hysteresis: Working -> Distracted jika EMA < `enter_distracted`, kembali
+    jika EMA > `exit_distracted`, dan kondisi harus bertahan `hold` detik.
+    Probabilitas per kelas juga di-EMA untuk laporan (`class_probs`).
+    """
+
+    WORKING = "Working"
+    DISTRACTED = "Distracted"
+
+    def __init__(self, working_labels, labels=None, tau=2.0, enter_distracted=0.35,
+                 exit_distracted=0.6, hold=1.0):
+        self.working_labels = set(working_labels)
+        self.tau = max(1e-3, float(tau))
+        self.enter_distracted = enter_distracted
+        self.exit_distracted = exit_distracted
+        self.hold = hold
+
+        self.labels = None
+        self._working_mask = None
+        self.set_labels(labels)
+
+        self.p_work = None
+        self.class_probs = {}
+        self.status = None
+        self._pending_since = None
+        self._last_update = None
+        self.updates = 0
+        self.transitions = 0
+        # Saat pindah engine hasil server dan lokal bisa datang dari dua thread sekaligus
+        self._lock = threading.Lock()
+
+    def set_labels(self, labels):
+        """Urutan label vektor probs (dari balasan hello server)."""
+        if labels:
+            self.labels = list(labels)
+            self._working_mask = [label in self.working_labels for label in self.labels]
+
+    def _evidence(self, result):
+        if not result.get("found"):
+            return 0.0
+        probs = result.get("probs")
+        if probs and self._working_mask is not None and len(probs) == len(self._working_mask):
+            return sum(p for p, working in zip(probs, self._working_mask) if working)
+        conf = float(result.get("confidence", 0.0))
+        return conf if result.get("label") in self.working_labels else 1.0 - conf
+
+    def update(self, result, now=None):
+        """Masukkan satu hasil inference. Return status setelah update."""
+        now = time.monotonic() if now is None else now
+        evidence = min(1.0, max(0.0, self._evidence(result)))
+        with self._lock:
+            return self._update(result, evidence, now)
+
+    def _update(self, result, evidence, now):
+
+        if self.p_work is None:
+            alpha = 1.0
+        else:
+            alpha = 1.0 - math.exp(-max(0.0, now - self._last_update) / self.tau)
+        self._last_update = now
+        self.updates += 1
+
+        self.p_work = evidence if self.p_work is None else self.p_work + alpha * (evidence - self.p_work)
+
+        probs = result.get("probs")
+        if result.get("found") and probs and self.labels and len(probs) == len(self.labels):
+            for label, p in zip(self.labels, probs):
+                prev = self.class_probs.get(label, p)
+                self.class_probs[label] = prev + alpha * (p - prev)
+
+        self._decide(now)
+        return self.status
+
+    def _decide(self, now):
+        if self.status is None:
+            # Mulai dari Working; distraksi tetap harus bertahan `hold` detik
+            self.status = self.WORKING
+
+        if self.status == self.WORKING:
+            wants_switch = self.p_work < self.enter_distracted
+        else:
+            wants_switch = self.p_work > self.exit_distracted
+
+        if not wants_switch:
+            self._pending_since = None
+            return
+        if self._pending_since is None:
+            self._pending_since = now
+        if now - self._pending_since >= self.hold:
+            self.status = self.DISTRACTED if self.status == self.WORKING else self.WORKING
+            self._pending_since = None
+            self.transitions += 1
+
+    def stats(self):
+        return {
+            "status": self.status,
+            "p_work": self.p_work,
+            "updates": self.updates,
+            "transitions": self.transitions,
+        }
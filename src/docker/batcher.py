@@ -0,0 +1,118 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HARBatcher:
+    """
+    Kumpulkan crop dari semua koneksi WebSocket lalu jalankan satu forward pass
+    batched. Batch dikirim saat sudah berisi `max_batch` item atau saat item
+    tertua sudah menunggu `max_wait_ms`.
+
+    `run_batch` adalah fungsi sinkron: list input -> list hasil (urutan sama).
+    `on_batch(batch_size, seconds)` opsional, dipanggil setelah tiap forward pass.
+    """
+
+    def __init__(self, run_batch, max_batch=8, max_wait_ms=10.0, on_batch=None):
+        self.run_batch = run_batch
+        self.on_batch = on_batch
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = None
+        self._task = None
+        # Satu thread saja: forward pass tidak saling tumpang tindih,
+        # event loop tetap bebas mengumpulkan batch berikutnya.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="har-batch")
+
+        # Stats
+        self.batches = 0
+        self.items = 0
+        self.busy_time = 0.0
+        self.started_at = time.perf_counter()
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, item):
+        """Masukkan satu input ke antrian, tunggu hasilnya sendiri."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _collect(self):
+        item, future = await self._queue.get()
+        batch = [(item, future)]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Item yang sudah ada di antrian tetap ikut walaupun deadline lewat
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Koneksi yang sudah putus tidak perlu ikut dihitung
+            batch = [(item, fut) for item, fut in batch if not fut.cancelled()]
+            if not batch:
+                continue
+
+            inputs = [item for item, _ in batch]
+            t0 = time.perf_counter()
+            try:
+                outputs = await loop.run_in_executor(self._executor, self.run_batch, inputs)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - t0
+            self.busy_time += elapsed
+            if self.on_batch is not None:
+                self.on_batch(len(batch), elapsed)
+
+            self.batches += 1
+            self.items += len(batch)
+            for (_, fut), out in zip(batch, outputs):
+                if not fut.done():
+                    fut.set_result(out)
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": (self.items / self.batches) if self.batches else 0.0,
+            "items_per_sec": (self.items / elapsed) if elapsed > 0 else 0.0,
+            "busy_ratio": (self.busy_time / elapsed) if elapsed > 0 else 0.0,
+            "queue_depth": self.queue_depth(),
+        }
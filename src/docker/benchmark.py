@@ -0,0 +1,342 @@
+"""
+Load generator + benchmark latency untuk /ws/inference.
+
+N robot simulasi mengirim frame JPEG (sintetis atau rekaman) dengan rate tetap,
+lockstep send/recv seperti classifier.py. Server diminta mengirim durasi tiap
+tahap (?timings=1), jadi hasilnya dipecah per stage.
+
+    # server sudah jalan
+    python benchmark.py --url ws://localhost:8000/ws/inference --robots 4 --fps 5
+
+    # server di-start di proses yang sama
+    python benchmark.py --inprocess --robots 4 --fps 5 --output run.json
+
+    # bandingkan dengan baseline, exit code 1 jika regresi
+    python benchmark.py --inprocess --robots 4 --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import cv2
+import numpy as np
+import websockets
+
+STAGES = ("rtt", "queue", "decode", "cache", "yolo", "crop", "har", "send")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+# -------- FRAMES --------
+
+def synthetic_frames(count, size, quality, seed=0):
+    """
+    Frame sintetis: background noise + blok 'orang' dengan posisi, ukuran dan warna
+    acak per frame. Tiap frame sengaja cukup berbeda (thumbnail 16x16 berselisih jauh
+    di atas FRAME_CACHE_THRESHOLD) supaya tidak kena frame cache server dan stage
+    YOLO/HAR mengukur inference sungguhan.
+    """
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 255, (size, size, 3), dtype=np.uint8)
+    background = cv2.GaussianBlur(background, (15, 15), 0)
+    frames = []
+    for i in range(count):
+        shift = rng.integers(0, size, 2)
+        frame = np.roll(background, (int(shift[0]), int(shift[1])), axis=(0, 1))
+        frame = cv2.convertScaleAbs(frame, alpha=float(rng.uniform(0.6, 1.4)), beta=float(rng.uniform(-40, 40)))
+        w = int(rng.integers(size // 5, size // 2))
+        x = int(rng.integers(0, size - w))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(frame, (x, size // 5), (x + w, size - 10), color, -1)
+        cv2.circle(frame, (x + w // 2, size // 5), size // 10, (150, 180, 210), -1)
+        _, buffer = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        frames.append(buffer.tobytes())
+    return frames
+
+
+def recorded_frames(folder, size, quality):
+    """Frame dari folder gambar, di-resize dan di-encode ulang seperti di robot."""
+    frames = []
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(IMAGE_EXTS):
+            continue
+        img = cv2.imread(os.path.join(folder, name), cv2.IMREAD_COLOR)
+        if img is None:
+            continue
+        img = cv2.resize(img, (size, size), interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        frames.append(buffer.tobytes())
+    if not frames:
+        raise RuntimeError(f"No frames found in {folder}")
+    return frames
+
+
+# -------- SERVER --------
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_inprocess_server(timeout=600):
+    """Jalankan server.app dengan uvicorn di thread, tunggu sampai /ready."""
+    import uvicorn
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import server
+
+    port = _free_port()
+    config = uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning")
+    uv_server = uvicorn.Server(config)
+    threading.Thread(target=uv_server.run, name="bench-server", daemon=True).start()
+
+    base = f"http://127.0.0.1:{port}"
+    wait_ready(base, timeout)
+    return f"ws://127.0.0.1:{port}/ws/inference", base, uv_server
+
+
+def wait_ready(base_url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/ready", timeout=2) as r:
+                if r.status == 200:
+                    return
+        except Exception:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} not ready after {timeout}s")
+
+
+def fetch_stats(base_url):
+    try:
+        with urllib.request.urlopen(f"{base_url}/stats", timeout=5) as r:
+            return json.loads(r.read())
+    except Exception:
+        return None
+
+
+# -------- LOAD --------
+
+async def robot(robot_id, url, frames, fps, duration, warmup, samples, counters):
+    """Satu robot: kirim frame tiap 1/fps detik, tunggu balasan, catat latency."""
+    interval = 1.0 / fps
+    sep = "&" if "?" in url else "?"
+    async with websockets.connect(f"{url}{sep}timings=1", max_size=None) as ws:
+        start = time.perf_counter()
+        measure_from = start + warmup
+        stop_at = measure_from + duration
+        next_send = start + (robot_id / max(1, counters["robots"])) * interval  # ratakan fase antar robot
+        i = 0
+
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                break
+            if now < next_send:
+                await asyncio.sleep(next_send - now)
+
+            t0 = time.perf_counter()
+            await ws.send(frames[i % len(frames)])
+            reply = json.loads(await ws.recv())
+            t1 = time.perf_counter()
+            i += 1
+
+            if t0 >= measure_from:
+                counters["responses"] += 1
+                samples["rtt"].append((t1 - t0) * 1000.0)
+                timings = reply.get("timings", {})
+                for stage, ms in timings.items():
+                    if stage in samples:
+                        samples[stage].append(ms)
+                # Balasan dari frame cache: ada tahap cache tapi YOLO/HAR tidak jalan
+                if "cache" in timings:
+                    counters["cache_lookups"] += 1
+                    counters["cache_hits"] += int("yolo" not in timings)
+
+            # Robot yang tertinggal tidak menumpuk frame: lompat ke slot berikutnya
+            next_send += interval
+            if next_send < t1:
+                skipped = int((t1 - next_send) / interval) + 1
+                counters["skipped"] += skipped if t0 >= measure_from else 0
+                next_send += skipped * interval
+
+
+async def run_load(url, robots, fps, duration, warmup, frames):
+    samples = {stage: [] for stage in STAGES}
+    counters = {"robots": robots, "responses": 0, "skipped": 0, "errors": 0, "cache_hits": 0, "cache_lookups": 0}
+
+    async def guarded(robot_id):
+        try:
+            await robot(robot_id, url, frames, fps, duration, warmup, samples, counters)
+        except Exception as e:
+            counters["errors"] += 1
+            print(f"robot {robot_id} error: {e}")
+
+    await asyncio.gather(*(guarded(r) for r in range(robots)))
+    return samples, counters
+
+
+def summarize(samples):
+    summary = {}
+    for stage, values in samples.items():
+        if not values:
+            continue
+        arr = np.asarray(values)
+        summary[stage] = {
+            "count": int(arr.size),
+            "mean": float(arr.mean()),
+            "p50": float(np.percentile(arr, 50)),
+            "p95": float(np.percentile(arr, 95)),
+            "p99": float(np.percentile(arr, 99)),
+        }
+    return summary
+
+
+# -------- REPORT --------
+
+def environment():
+    try:
+        rev = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                      stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        rev = None
+    env_keys = ("HAR_ENGINE", "YOLO_ENGINE", "HAR_MAX_BATCH", "HAR_MAX_WAIT_MS",
+                "INFERENCE_WORKERS", "TRACKING", "FRAME_CACHE", "FRAME_CACHE_THRESHOLD",
+                "FRAME_CACHE_TTL", "SERVER_WORKERS")
+    return {
+        "git_rev": rev,
+        "host": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "env": {k: os.environ[k] for k in env_keys if k in os.environ},
+    }
+
+
+def print_result(result):
+    cfg = result["config"]
+    print(f"\nrobots={cfg['robots']} fps={cfg['fps']} duration={cfg['duration']}s frames={cfg['frames']}")
+    print(f"throughput: {result['throughput']:.2f} resp/s (target {cfg['robots'] * cfg['fps']:.2f}), "
+          f"skipped={result['skipped']} errors={result['errors']}")
+    print(f"{'stage':<8}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for stage in STAGES:
+        s = result["stages"].get(stage)
+        if s:
+            print(f"{stage:<8}{s['count']:>8}{s['mean']:>10.2f}{s['p50']:>10.2f}{s['p95']:>10.2f}{s['p99']:>10.2f}")
+    cache = result["frame_cache"]
+    print(f"frame cache: enabled={cache['enabled']} hits={cache['hits']}/{cache['lookups']} "
+          f"hit_rate={cache['hit_rate']:.1%}")
+    if cache["hit_rate"] > 0.1:
+        print("Warning: many responses came from the frame cache, rtt/throughput do not reflect inference cost")
+
+
+def compare(result, baseline, tolerance):
+    """Return list regresi: throughput turun atau p95/p99 naik lebih dari `tolerance` (relatif)."""
+    regressions = []
+    if baseline.get("config", {}) != result["config"]:
+        print("Warning: baseline was run with a different config, comparison may be meaningless")
+    base_cache = baseline.get("frame_cache", {})
+    if base_cache.get("enabled") != result["frame_cache"]["enabled"]:
+        print(f"Warning: frame cache enabled={result['frame_cache']['enabled']}, "
+              f"baseline enabled={base_cache.get('enabled')}")
+
+    base_tp, tp = baseline.get("throughput", 0.0), result["throughput"]
+    if base_tp > 0 and tp < base_tp * (1.0 - tolerance):
+        regressions.append(f"throughput {tp:.2f} < baseline {base_tp:.2f}")
+
+    for stage, stats in result["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base:
+            continue
+        for q in ("p95", "p99"):
+            # Abaikan stage yang sangat cepat, noise-nya lebih besar dari sinyal
+            if base[q] >= 1.0 and stats[q] > base[q] * (1.0 + tolerance):
+                regressions.append(f"{stage} {q} {stats[q]:.2f}ms > baseline {base[q]:.2f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket load generator for /ws/inference")
+    parser.add_argument("--url", default=os.getenv("CV_URL", "ws://localhost:8000/ws/inference"))
+    parser.add_argument("--inprocess", action="store_true", help="start server.app in this process")
+    parser.add_argument("--robots", type=int, default=1)
+    parser.add_argument("--fps", type=float, default=5.0, help="frames per second per robot")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before measuring")
+    parser.add_argument("--frames", help="folder of recorded frames (default: synthetic)")
+    parser.add_argument("--count", type=int, default=50, help="number of synthetic frames")
+    parser.add_argument("--size", type=int, default=240)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--output", help="write result JSON here")
+    parser.add_argument("--compare", help="baseline result JSON")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.frames:
+        frames = recorded_frames(args.frames, args.size, args.quality)
+    else:
+        frames = synthetic_frames(args.count, args.size, args.quality)
+
+    base_url = None
+    if args.inprocess:
+        url, base_url, _ = start_inprocess_server()
+    else:
+        url = args.url
+        base_url = url.replace("ws://", "http://").replace("wss://", "https://").split("/ws/")[0]
+
+    samples, counters = asyncio.run(run_load(url, args.robots, args.fps, args.duration, args.warmup, frames))
+    server_stats = fetch_stats(base_url)
+
+    result = {
+        "config": {
+            "robots": args.robots,
+            "fps": args.fps,
+            "duration": args.duration,
+            "frames": args.frames or f"synthetic:{args.count}",
+            "size": args.size,
+            "quality": args.quality,
+        },
+        "environment": environment(),
+        "throughput": counters["responses"] / args.duration if args.duration > 0 else 0.0,
+        "responses": counters["responses"],
+        "skipped": counters["skipped"],
+        "errors": counters["errors"],
+        "stages": summarize(samples),
+        # Hit rate dihitung dari balasan yang diukur saja (tanpa warm-up)
+        "frame_cache": {
+            "enabled": ((server_stats or {}).get("frame_cache") or {}).get("enabled", counters["cache_lookups"] > 0),
+            "hits": counters["cache_hits"],
+            "lookups": counters["cache_lookups"],
+            "hit_rate": counters["cache_hits"] / counters["cache_lookups"] if counters["cache_lookups"] else 0.0,
+        },
+        "server_stats": server_stats,
+    }
+    print_result(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for r in regressions:
+                print(f"  - {r}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
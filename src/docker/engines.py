@@ -0,0 +1,273 @@
+import os
+import fcntl
+import shutil
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+import torch
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+HAR_ENGINES = ("eager", "torchscript", "onnx", "int8-dynamic", "int8-static")
+YOLO_ENGINES = ("pytorch", "torchscript", "onnx")
+
+
+def _is_stale(path, source_path):
+    """True jika file hasil export belum ada atau lebih tua dari weights sumbernya."""
+    if not os.path.exists(path):
+        return True
+    if source_path and os.path.exists(source_path):
+        return os.path.getmtime(path) < os.path.getmtime(source_path)
+    return False
+
+
+@contextmanager
+def export_lock(cache_dir):
+    """Lock file antar proses supaya beberapa worker tidak export ke file yang sama bersamaan."""
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, ".export.lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# -------- HAR ENGINES --------
+# Semua engine menerima batch float32 NCHW (torch.Tensor) dan mengembalikan logits (np.ndarray).
+
+class EagerHAREngine:
+    name = "eager"
+
+    def __init__(self, model, device):
+        self.model = model
+        self.device = device
+
+    def __call__(self, batch):
+        with torch.no_grad():
+            return self.model(batch.to(self.device)).cpu().numpy()
+
+
+class TorchScriptHAREngine:
+    name = "torchscript"
+
+    def __init__(self, path, device):
+        self.device = device
+        module = torch.jit.load(path, map_location=device)
+        module.eval()
+        self.module = torch.jit.optimize_for_inference(module)
+
+    @staticmethod
+    def export(model, path, img_size):
+        example = torch.randn(1, 3, img_size, img_size)
+        with torch.no_grad():
+            traced = torch.jit.trace(model.cpu().eval(), example)
+            traced = torch.jit.freeze(traced)
+        traced.save(path)
+
+    def __call__(self, batch):
+        with torch.no_grad():
+            return self.module(batch.to(self.device)).cpu().numpy()
+
+
+class OnnxHAREngine:
+    name = "onnx"
+
+    def __init__(self, path, device=None):
+        if ort is None:
+            raise RuntimeError("onnxruntime is not installed")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    @staticmethod
+    def export(model, path, img_size):
+        example = torch.randn(1, 3, img_size, img_size)
+        with torch.no_grad():
+            torch.onnx.export(
+                model.cpu().eval(),
+                example,
+                path,
+                input_names=["input"],
+                output_names=["logits"],
+                dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+                opset_version=17,
+            )
+
+    def __call__(self, batch):
+        inp = batch.detach().cpu().numpy().astype(np.float32, copy=False)
+        return self.session.run(None, {self.input_name: inp})[0]
+
+
+class QuantizedHAREngine:
+    """ModelHAR INT8 (lihat quantize.py). Kernel quantized hanya jalan di CPU."""
+
+    def __init__(self, qmodel, mode):
+        self.name = mode
+        self.model = qmodel
+
+    def __call__(self, batch):
+        with torch.no_grad():
+            return self.model(batch.cpu()).numpy()
+
+
+def build_har_engine(name, model, device, cache_dir, weights_path, img_size,
+                     calib_dir=None, quant_backend=None):
+    """
+    Buat engine HAR sesuai nama. TorchScript / ONNX di-export sekali ke
+    `cache_dir` dan di-export ulang kalau weights sumber lebih baru.
+    Model eager dipindah ke CPU saat export lalu dikembalikan ke `device`.
+    Mode int8 dimuat dari cache state dict quantized (lihat quantize.py).
+    """
+    if name == "eager":
+        return EagerHAREngine(model, device)
+
+    with export_lock(cache_dir):
+        return _build_cached_har_engine(name, model, device, cache_dir, weights_path, img_size,
+                                        calib_dir, quant_backend)
+
+
+def _build_cached_har_engine(name, model, device, cache_dir, weights_path, img_size,
+                             calib_dir, quant_backend):
+    if name == "torchscript":
+        path = os.path.join(cache_dir, "har_model.torchscript.pt")
+        if _is_stale(path, weights_path):
+            print(f"Exporting HAR TorchScript -> {path}")
+            TorchScriptHAREngine.export(model, path, img_size)
+            model.to(device)
+        return TorchScriptHAREngine(path, device)
+
+    if name == "onnx":
+        path = os.path.join(cache_dir, "har_model.onnx")
+        if _is_stale(path, weights_path):
+            print(f"Exporting HAR ONNX -> {path}")
+            OnnxHAREngine.export(model, path, img_size)
+            model.to(device)
+        return OnnxHAREngine(path, device)
+
+    if name in ("int8-dynamic", "int8-static"):
+        from quantize import load_or_build_quantized
+        qmodel = load_or_build_quantized(model, name, cache_dir, weights_path, img_size,
+                                         calib_dir=calib_dir, backend=quant_backend)
+        return QuantizedHAREngine(qmodel, name)
+
+    raise ValueError(f"Unknown HAR engine '{name}', choose one of {HAR_ENGINES}")
+
+
+# -------- YOLO ENGINES --------
+
+def resolve_yolo_engine(name, weights_path, cache_dir, imgsz):
+    """
+    Return path model YOLO untuk engine yang dipilih. Export ultralytics
+    (TorchScript / ONNX) dibuat sekali di `cache_dir` dengan imgsz tetap.
+    """
+    if name == "pytorch":
+        return weights_path
+    if name not in YOLO_ENGINES:
+        raise ValueError(f"Unknown YOLO engine '{name}', choose one of {YOLO_ENGINES}")
+
+    from ultralytics import YOLO
+
+    ext = {"torchscript": ".torchscript", "onnx": ".onnx"}[name]
+    stem = os.path.splitext(os.path.basename(weights_path))[0]
+    path = os.path.join(cache_dir, f"{stem}_{imgsz}{ext}")
+    with export_lock(cache_dir):
+        if _is_stale(path, weights_path):
+            print(f"Exporting YOLO {name} -> {path}")
+            exported = YOLO(weights_path).export(format=name, imgsz=imgsz, verbose=False)
+            shutil.move(exported, path)
+    return path
+
+
+# -------- SELF-CHECK --------
+
+def _median_latency_ms(fn, runs):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000.0)
+    return float(np.median(times))
+
+
+def _softmax(logits):
+    e = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def load_check_frame(path, size, calib_dir=None):
+    """
+    Frame sampel tetap untuk self-check (RGB uint8): `path`, gambar pertama di
+    `calib_dir` (frame kamera asli, urut nama), atau frame sintetis ber-seed tetap
+    (orang + background bertekstur) jika keduanya tidak ada. Return (frame, sumber).
+    """
+    if not path and calib_dir and os.path.isdir(calib_dir):
+        from quantize import list_frames
+        frames = list_frames(calib_dir)
+        path = frames[0][0] if frames else None
+    if path:
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is not None:
+            return cv2.cvtColor(img, cv2.COLOR_BGR2RGB), path
+        print(f"Cannot read self-check image {path}, using synthetic frame")
+
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (size, size, 3), dtype=np.uint8), (0, 0), 3)
+    cv2.rectangle(frame, (size // 3, size // 4), (2 * size // 3, size - 1), (60, 90, 160), -1)
+    cv2.circle(frame, (size // 2, size // 5), size // 9, (210, 180, 150), -1)
+    return frame, "synthetic"
+
+
+def self_check_har(engines, batch, tolerance, runs=5):
+    """
+    Bandingkan semua engine HAR dengan engine pertama (referensi, biasanya eager)
+    pada `batch` (crop sampel yang sudah dinormalisasi, NCHW).
+    Return list dict per engine: latency, selisih probabilitas, label sama atau tidak.
+    """
+    reference = None
+    report = []
+    for engine in engines:
+        probs = _softmax(engine(batch))  # sekalian warm-up
+        latency = _median_latency_ms(lambda: engine(batch), runs)
+        if reference is None:
+            reference = probs
+        max_diff = float(np.abs(probs - reference).max())
+        same_labels = bool((probs.argmax(axis=1) == reference.argmax(axis=1)).all())
+        report.append({
+            "engine": engine.name,
+            "latency_ms": latency,
+            "batch_size": len(batch),
+            "max_prob_diff": max_diff,
+            "same_labels": same_labels,
+            "ok": same_labels and max_diff <= tolerance,
+        })
+    return report
+
+
+def self_check_yolo(models, frame, imgsz, conf, runs=5):
+    """Latency tiap engine YOLO dan jumlah box orang pada frame sampel yang sama."""
+    report = []
+    for name, model in models:
+        run = lambda: model(frame, imgsz=imgsz, conf=conf, classes=[0], verbose=False)
+        results = run()
+        latency = _median_latency_ms(run, runs)
+        boxes = sum(len(r.boxes) for r in results) if results else 0
+        report.append({"engine": name, "latency_ms": latency, "boxes": boxes})
+    counts = {r["boxes"] for r in report}
+    for r in report:
+        r["ok"] = len(counts) == 1
+    return report
+
+
+def print_report(title, report):
+    print(f"--- {title} engine self-check ---")
+    for r in report:
+        status = "OK" if r["ok"] else "MISMATCH"
+        extra = ", ".join(f"{k}={v}" for k, v in r.items() if k not in ("engine", "latency_ms", "ok"))
+        print(f"[{status}] {r['engine']:<12} {r['latency_ms']:8.2f} ms  {extra}")
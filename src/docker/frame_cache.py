@@ -0,0 +1,70 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class FrameResultCache:
+    """
+    Cache hasil inference per koneksi untuk frame yang hampir identik.
+
+    Kunci cache adalah thumbnail grayscale kecil dari frame yang sudah di-decode.
+    Frame dianggap sama jika mean abs diff thumbnail <= `threshold` (skala 0-255).
+    Entry dibuang setelah `ttl` detik supaya hasil tetap di-refresh berkala
+    walaupun scene diam.
+    """
+
+    def __init__(self, threshold=1.0, ttl=0.5, max_entries=4, thumb_size=16):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max(1, int(max_entries))
+        self.thumb_size = thumb_size
+
+        self._entries = []  # list (stored_at, signature, response)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def signature(self, frame_rgb):
+        gray = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2GRAY)
+        thumb = cv2.resize(gray, (self.thumb_size, self.thumb_size), interpolation=cv2.INTER_AREA)
+        return thumb.astype(np.int16)
+
+    def _evict_expired(self, now):
+        fresh = [e for e in self._entries if now - e[0] <= self.ttl]
+        self.evictions += len(self._entries) - len(fresh)
+        self._entries = fresh
+
+    def lookup(self, signature, now=None):
+        """Return response yang di-cache untuk frame mirip, atau None."""
+        now = time.monotonic() if now is None else now
+        self._evict_expired(now)
+
+        best, best_diff = None, None
+        for _, sig, response in self._entries:
+            diff = float(np.mean(np.abs(sig - signature)))
+            if diff <= self.threshold and (best_diff is None or diff < best_diff):
+                best, best_diff = response, diff
+
+        if best is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return best
+
+    def store(self, signature, response, now=None):
+        now = time.monotonic() if now is None else now
+        self._entries.append((now, signature, response))
+        if len(self._entries) > self.max_entries:
+            self._entries.pop(0)
+            self.evictions += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
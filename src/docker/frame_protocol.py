@@ -0,0 +1,170 @@
+"""
+Protokol frame biner robot <-> inference server (versi 1).
+
+Satu pesan WebSocket biner = header 22 byte + payload:
+
+    offset  size  field
+    0       2     magic b"PB"
+    2       1     version (1)
+    3       1     pixel format  (1=RGB, 2=BGR, 3=GRAY)
+    4       1     encoding      (0=RAW, 1=JPEG)
+    5       1     jpeg quality  (0 untuk RAW)
+    6       2     width
+    8       2     height
+    10      4     sequence number
+    14      8     capture timestamp (detik, float64)
+
+Pixel format adalah urutan channel array *sebelum* encode, dan sama dengan
+urutan setelah decode (JPEG menyimpan channel apa adanya), jadi tiap sisi hanya
+konversi warna jika memang butuh format lain. Pesan tanpa magic diperlakukan
+sebagai JPEG BGR lama (klien versi sebelumnya).
+
+Sebelum frame pertama klien boleh mengirim pesan teks hello (JSON) untuk
+negosiasi encoding / kualitas JPEG / ukuran maksimum; lihat `hello_request`
+dan `negotiate`.
+
+Modul ini dipakai server (di-copy ke image) dan klien (src.docker.frame_protocol),
+jadi hanya bergantung pada numpy dan cv2.
+"""
+import json
+import struct
+
+import cv2
+import numpy as np
+
+MAGIC = b"PB"
+VERSION = 1
+HEADER = struct.Struct("<2sBBBBHHId")
+
+PIXFMT_RGB = 1
+PIXFMT_BGR = 2
+PIXFMT_GRAY = 3
+
+ENCODING_RAW = 0
+ENCODING_JPEG = 1
+
+PIXFMT_NAMES = {"rgb": PIXFMT_RGB, "bgr": PIXFMT_BGR, "gray": PIXFMT_GRAY}
+ENCODING_NAMES = {"raw": ENCODING_RAW, "jpeg": ENCODING_JPEG}
+
+_CHANNELS = {PIXFMT_RGB: 3, PIXFMT_BGR: 3, PIXFMT_GRAY: 1}
+_TO_RGB = {PIXFMT_BGR: cv2.COLOR_BGR2RGB, PIXFMT_GRAY: cv2.COLOR_GRAY2RGB}
+
+
+class FrameHeader:
+    __slots__ = ("version", "pixfmt", "encoding", "quality", "width", "height", "seq", "capture_ts")
+
+    def __init__(self, pixfmt, encoding, width, height, seq=0, capture_ts=0.0, quality=0, version=VERSION):
+        self.version = version
+        self.pixfmt = pixfmt
+        self.encoding = encoding
+        self.quality = quality
+        self.width = width
+        self.height = height
+        self.seq = seq
+        self.capture_ts = capture_ts
+
+    def pack(self):
+        return HEADER.pack(MAGIC, self.version, self.pixfmt, self.encoding, self.quality,
+                           self.width, self.height, self.seq & 0xFFFFFFFF, self.capture_ts)
+
+
+def downscale(frame, max_side):
+    """Perkecil frame supaya sisi terpanjang <= max_side (0 = tidak diubah)."""
+    if not max_side:
+        return frame
+    h, w = frame.shape[:2]
+    longest = max(h, w)
+    if longest <= max_side:
+        return frame
+    scale = max_side / float(longest)
+    return cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def encode_frame(frame, pixfmt, encoding, seq=0, capture_ts=0.0, quality=80):
+    """Frame (urutan channel = pixfmt) -> bytes pesan biner."""
+    h, w = frame.shape[:2]
+    if encoding == ENCODING_JPEG:
+        ok, buffer = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+        if not ok:
+            raise ValueError("JPEG encode failed")
+        payload = buffer.tobytes()
+    elif encoding == ENCODING_RAW:
+        payload = np.ascontiguousarray(frame).tobytes()
+        quality = 0
+    else:
+        raise ValueError(f"Unknown encoding {encoding}")
+
+    header = FrameHeader(pixfmt, encoding, w, h, seq=seq, capture_ts=capture_ts, quality=quality)
+    return header.pack() + payload
+
+
+def is_framed(data):
+    return len(data) >= HEADER.size and data[:2] == MAGIC
+
+
+def decode_frame(data):
+    """
+    Bytes pesan -> (header atau None untuk pesan lama, frame RGB atau None jika rusak).
+    Konversi warna hanya dilakukan jika pixel format bukan RGB.
+    """
+    if not is_framed(data):
+        frame_bgr = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if frame_bgr is None:
+            return None, None
+        return None, cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+
+    _, version, pixfmt, encoding, quality, width, height, seq, capture_ts = HEADER.unpack_from(data)
+    header = FrameHeader(pixfmt, encoding, width, height, seq=seq, capture_ts=capture_ts,
+                         quality=quality, version=version)
+    if version != VERSION or pixfmt not in _CHANNELS:
+        return header, None
+
+    payload = memoryview(data)[HEADER.size:]
+    channels = _CHANNELS[pixfmt]
+    if encoding == ENCODING_RAW:
+        if len(payload) != width * height * channels:
+            return header, None
+        frame = np.frombuffer(payload, np.uint8).reshape((height, width, channels) if channels > 1 else (height, width))
+    elif encoding == ENCODING_JPEG:
+        flag = cv2.IMREAD_GRAYSCALE if channels == 1 else cv2.IMREAD_COLOR
+        frame = cv2.imdecode(np.frombuffer(payload, np.uint8), flag)
+        if frame is None:
+            return header, None
+    else:
+        return header, None
+
+    if pixfmt in _TO_RGB:
+        frame = cv2.cvtColor(frame, _TO_RGB[pixfmt])
+    return header, frame
+
+
+# -------- NEGOTIATION --------
+
+def hello_request(encodings=("jpeg", "raw"), pixel_formats=("bgr", "rgb", "gray"), jpeg_quality=80, max_side=0):
+    """Pesan teks hello dari klien: kemampuan + preferensi (urutan = prioritas)."""
+    return json.dumps({
+        "type": "hello",
+        "version": VERSION,
+        "encodings": list(encodings),
+        "pixel_formats": list(pixel_formats),
+        "jpeg_quality": int(jpeg_quality),
+        "max_side": int(max_side),
+    })
+
+
+def negotiate(request, server_encodings, server_jpeg_quality, server_max_side):
+    """
+    Pilih setting di server: encoding pertama klien yang didukung server,
+    kualitas JPEG = min(klien, server), max_side = yang paling kecil (0 = bebas).
+    Return dict balasan hello.
+    """
+    encoding = next((e for e in request.get("encodings", []) if e in server_encodings), "jpeg")
+    quality = min(int(request.get("jpeg_quality", server_jpeg_quality)), int(server_jpeg_quality))
+    sides = [s for s in (int(request.get("max_side", 0)), int(server_max_side)) if s > 0]
+    return {
+        "type": "hello",
+        "version": VERSION,
+        "encoding": encoding,
+        "jpeg_quality": quality,
+        "max_side": min(sides) if sides else 0,
+    }
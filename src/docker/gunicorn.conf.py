@@ -0,0 +1,34 @@
+"""
+Multi-worker server dengan satu salinan weights.
+
+gunicorn -c gunicorn.conf.py server:app
+
+Dengan preload_app, server.py di-import sekali di master (PRELOAD_MODELS=1
+memuat ModelHAR di sana), lalu worker di-fork dan memakai tensor yang sama
+secara copy-on-write. Engine, warm-up dan thread pool dibuat di tiap worker.
+Koneksi WebSocket dibagi ke worker oleh kernel lewat socket listen bersama.
+"""
+import gc
+import os
+
+os.environ.setdefault("PRELOAD_MODELS", "1")
+
+bind = f"0.0.0.0:{os.getenv('SERVER_PORT', '8000')}"
+workers = int(os.getenv("SERVER_WORKERS", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+
+
+def pre_fork(server, worker):
+    # Objek yang sudah ada tidak lagi disentuh GC di worker, jadi page-nya tidak ikut ter-copy
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import torch
+
+    # Bagi core ke semua worker supaya thread intra-op tidak saling berebut
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    torch.set_num_threads(threads)
+    server.log.info(f"Worker {worker.pid}: torch threads = {threads}")
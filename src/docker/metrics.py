@@ -0,0 +1,106 @@
+"""
+Metrics ringan dengan format teks Prometheus untuk endpoint /metrics.
+
+Tanpa lock: semua observe() / inc() dipanggil dari thread event loop
+(termasuk callback HARBatcher), jadi biaya per frame hanya bisect + increment.
+"""
+from bisect import bisect_left
+
+# Bucket latency dalam detik (0.5 ms .. 5 s)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+def _merge_labels(labels, extra):
+    merged = dict(labels)
+    merged.update(extra)
+    return merged
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, label_name=None):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_name = label_name
+        self._series = {}  # label value -> [bucket counts..., +Inf], sum
+
+    def _get(self, label_value):
+        series = self._series.get(label_value)
+        if series is None:
+            series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+        return series
+
+    def observe(self, value, label_value=None):
+        counts, _ = series = self._get(label_value)
+        counts[bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_value, (counts, total) in self._series.items():
+            base = {self.label_name: label_value} if self.label_name else {}
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(_merge_labels(base, {'le': bound}))} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{_format_labels(_merge_labels(base, {'le': '+Inf'}))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(base)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(base)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_name=None):
+        self.name = name
+        self.help_text = help_text
+        self.label_name = label_name
+        self._values = {}
+
+    def inc(self, amount=1, label_value=None):
+        self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_value, value in self._values.items():
+            base = {self.label_name: label_value} if self.label_name else {}
+            lines.append(f"{self.name}{_format_labels(base)} {value}")
+        return lines
+
+
+class Gauge:
+    """Nilai dibaca saat scrape lewat callback, tidak ada biaya di jalur frame."""
+
+    def __init__(self, name, help_text, read_fn, labels=None):
+        self.name = name
+        self.help_text = help_text
+        self.read_fn = read_fn
+        self.labels = labels or {}
+
+    def render(self):
+        value = self.read_fn()
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge",
+                f"{self.name}{_format_labels(self.labels)} {value}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -2,12 +2,18 @@ from torch import nn
 from torchvision import models
 import torch.nn.functional as F
 
+# Hyperparameter head hasil training densenet_har_nofreeze.pth
+HAR_HIDDEN1 = 640
+HAR_DROPOUT_RATE = 0.31417882494899535
+
 class ModelHAR(nn.Module):
-    def __init__(self, num_classes, hidden1, dropout_rate):
+    def __init__(self, num_classes, hidden1, dropout_rate, pretrained=True):
         super(ModelHAR, self).__init__()
 
         # Load DenseNet & Freeze
-        self.base_model = models.densenet121(weights=models.DenseNet121_Weights.IMAGENET1K_V1)
+        # pretrained=False untuk inference: weights ImageNet langsung ditimpa checkpoint HAR
+        weights = models.DenseNet121_Weights.IMAGENET1K_V1 if pretrained else None
+        self.base_model = models.densenet121(weights=weights)
         # for param in self.base_model.parameters():
         #     param.requires_grad = False
         
@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+import torch
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+def resize_crop(crop, img_size, out=None):
+    """
+    Resize crop RGB uint8 ke (img_size, img_size), mendekati Resize bilinear
+    antialias PIL: INTER_AREA untuk sumbu yang mengecil, INTER_LINEAR untuk
+    sumbu yang membesar. Crop orang biasanya mengecil di tinggi tapi membesar
+    di lebar, jadi kedua sumbu di-resize terpisah (satu interpolasi untuk
+    keduanya menyimpang jauh dari PIL pada crop bertekstur).
+    """
+    h, w = crop.shape[:2]
+    if h != img_size:
+        crop = cv2.resize(crop, (w, img_size), interpolation=cv2.INTER_AREA if h > img_size else cv2.INTER_LINEAR)
+    interp = cv2.INTER_AREA if w > img_size else cv2.INTER_LINEAR
+    if out is None:
+        return cv2.resize(crop, (img_size, img_size), interpolation=interp)
+    cv2.resize(crop, (img_size, img_size), dst=out, interpolation=interp)
+    return out
+
+
+def resize_crop_pil(crop, img_size, out=None):
+    """Resize lewat PIL (sama persis dengan transforms.Resize lama), fallback jika resize_crop di luar toleransi."""
+    from PIL import Image
+
+    resized = np.asarray(Image.fromarray(crop).resize((img_size, img_size), Image.BILINEAR))
+    if out is None:
+        return resized
+    np.copyto(out, resized)
+    return out
+
+
+def check_crops(img_size):
+    """Crop uji untuk warm-up: gradient + tekstur (seed tetap), rasio mengecil/membesar campuran."""
+    rng = np.random.default_rng(0)
+    crops = [np.linspace(0, 255, 300 * 180 * 3, dtype=np.float32).reshape(300, 180, 3).astype(np.uint8)]
+    for h, w in ((300, 180), (2 * img_size + 64, img_size + 40), (img_size // 2, img_size // 3)):
+        noise = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+        crops.append(cv2.GaussianBlur(noise, (0, 0), 1.5))
+    return crops
+
+
+class BatchNormalizer:
+    """
+    Pengganti ToTensor + Normalize untuk batch crop yang sudah di-resize.
+    Menulis ke tensor NCHW float32 yang dialokasikan sekali dan dipakai ulang,
+    jadi hasilnya hanya valid sampai pemanggilan berikutnya. Tidak thread-safe:
+    pakai satu instance per thread (di server: thread HARBatcher).
+    """
+
+    def __init__(self, img_size, max_batch, mean=IMAGENET_MEAN, std=IMAGENET_STD):
+        self.img_size = img_size
+        mean = np.asarray(mean, dtype=np.float32)
+        std = np.asarray(std, dtype=np.float32)
+        # (x / 255 - mean) / std  ==  x * scale + offset
+        self.scale = (1.0 / (255.0 * std)).reshape(1, 1, 1, 3)
+        self.offset = (-mean / std).reshape(1, 1, 1, 3)
+        self._allocate(max_batch)
+
+    def _allocate(self, capacity):
+        s = self.img_size
+        self.capacity = capacity
+        self._pixels = np.empty((capacity, s, s, 3), dtype=np.uint8)
+        self._work = np.empty((capacity, s, s, 3), dtype=np.float32)
+        self.tensor = torch.empty((capacity, 3, s, s), dtype=torch.float32)
+        self._out = self.tensor.numpy()  # share memory dengan tensor
+
+    def __call__(self, resized_crops):
+        n = len(resized_crops)
+        if n > self.capacity:
+            self._allocate(n)
+
+        pixels = self._pixels[:n]
+        for i, crop in enumerate(resized_crops):
+            pixels[i] = crop
+
+        work = self._work[:n]
+        np.multiply(pixels, self.scale, out=work)
+        work += self.offset
+        # NHWC -> NCHW langsung ke buffer tensor
+        np.copyto(self._out[:n], work.transpose(0, 3, 1, 2))
+        return self.tensor[:n]
+
+
+def max_abs_diff(reference_transform, crops, img_size, resize_fn=resize_crop):
+    """Selisih maksimum (satuan ternormalisasi) terhadap transform torchvision (PIL) pada semua crop."""
+    from PIL import Image
+
+    normalizer = BatchNormalizer(img_size, 1)
+    diff = 0.0
+    for crop in crops:
+        expected = reference_transform(Image.fromarray(crop)).numpy()
+        actual = normalizer([resize_fn(crop, img_size)])[0].numpy()
+        diff = max(diff, float(np.abs(expected - actual).max()))
+    return diff
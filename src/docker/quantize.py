@@ -0,0 +1,244 @@
+"""
+INT8 quantization untuk ModelHAR.
+
+- int8-dynamic: dynamic quantization untuk layer Linear di classifier.
+- int8-static : static post-training quantization untuk `features` (DenseNet),
+                dikalibrasi dengan folder frame contoh, plus Linear dynamic.
+
+Hasil quantization disimpan sebagai state dict dan dimuat ulang tanpa kalibrasi.
+
+Perbandingan dengan model FP32:
+    python quantize.py compare --frames /app/external/samples
+"""
+import argparse
+import copy
+import os
+import time
+
+import numpy as np
+import torch
+from torch import nn
+from torch.ao.quantization import quantize_dynamic, get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+from torchvision import transforms
+from PIL import Image
+
+QUANT_MODES = ("int8-dynamic", "int8-static")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def default_backend():
+    """fbgemm untuk x86, qnnpack untuk ARM."""
+    supported = torch.backends.quantized.supported_engines
+    return "fbgemm" if "fbgemm" in supported else "qnnpack"
+
+
+def quant_cache_path(cache_dir, mode, backend):
+    return os.path.join(cache_dir, f"har_{mode.replace('-', '_')}_{backend}.pth")
+
+
+def _prepare_features(features, backend, img_size):
+    example = torch.randn(1, 3, img_size, img_size)
+    return prepare_fx(features, get_default_qconfig_mapping(backend), example_inputs=(example,))
+
+
+def quantize_har(model, mode, backend, img_size, calibration=None):
+    """
+    Return salinan ModelHAR yang sudah di-quantize (CPU, eval).
+    `calibration` adalah iterable batch tensor, wajib untuk int8-static.
+    Tanpa `calibration` struktur model tetap dibuat (untuk load state dict cache).
+    """
+    if mode not in QUANT_MODES:
+        raise ValueError(f"Unknown quantization mode '{mode}', choose one of {QUANT_MODES}")
+    torch.backends.quantized.engine = backend
+
+    qmodel = copy.deepcopy(model).cpu().eval()
+    if mode == "int8-static":
+        features = _prepare_features(qmodel.features, backend, img_size)
+        if calibration is not None:
+            with torch.no_grad():
+                for batch in calibration:
+                    features(batch)
+        qmodel.features = convert_fx(features)
+
+    # Linear di classifier selalu dynamic (aktivasi kecil, tidak perlu kalibrasi)
+    qmodel.classifier = quantize_dynamic(qmodel.classifier, {nn.Linear}, dtype=torch.qint8)
+    return qmodel
+
+
+def load_or_build_quantized(model, mode, cache_dir, weights_path, img_size,
+                            calib_dir=None, backend=None):
+    """
+    Muat model quantized dari cache state dict. Kalau cache belum ada atau
+    lebih tua dari weights FP32, quantize ulang lalu simpan.
+    """
+    backend = backend or default_backend()
+    path = quant_cache_path(cache_dir, mode, backend)
+    stale = not os.path.exists(path) or (
+        os.path.exists(weights_path) and os.path.getmtime(path) < os.path.getmtime(weights_path)
+    )
+
+    if not stale:
+        qmodel = quantize_har(model, mode, backend, img_size)
+        qmodel.load_state_dict(torch.load(path, map_location="cpu"))
+        print(f"Loaded quantized HAR ({mode}, {backend}) from {path}")
+        return qmodel
+
+    calibration = None
+    if mode == "int8-static":
+        if not calib_dir or not os.path.isdir(calib_dir):
+            raise RuntimeError("int8-static needs QUANT_CALIB_DIR with sample frames")
+        calibration = list(load_frame_batches(calib_dir, img_size))
+        print(f"Calibrating {mode} on {sum(len(b) for b in calibration)} frames from {calib_dir}")
+
+    qmodel = quantize_har(model, mode, backend, img_size, calibration)
+    os.makedirs(cache_dir, exist_ok=True)
+    torch.save(qmodel.state_dict(), path)
+    print(f"Saved quantized HAR ({mode}, {backend}) to {path}")
+    return qmodel
+
+
+# -------- SAMPLE FRAMES --------
+
+def _transform(img_size):
+    return transforms.Compose([
+        transforms.Resize((img_size, img_size)),
+        transforms.ToTensor(),
+        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+    ])
+
+
+def list_frames(folder):
+    """
+    Semua gambar di folder (rekursif). Return list (path, label), label diambil
+    dari nama subfolder kalau ada (layout ImageFolder), selain itu None.
+    """
+    items = []
+    for root, _, files in os.walk(folder):
+        for f in sorted(files):
+            if f.lower().endswith(IMAGE_EXTS):
+                label = os.path.basename(root) if os.path.abspath(root) != os.path.abspath(folder) else None
+                items.append((os.path.join(root, f), label))
+    return items
+
+
+def load_frame_batches(folder, img_size, batch_size=8, with_labels=False):
+    to_tensor = _transform(img_size)
+    frames = list_frames(folder)
+    for i in range(0, len(frames), batch_size):
+        chunk = frames[i:i + batch_size]
+        batch = torch.stack([to_tensor(Image.open(p).convert("RGB")) for p, _ in chunk])
+        if with_labels:
+            yield batch, [label for _, label in chunk]
+        else:
+            yield batch
+
+
+# -------- COMPARE TOOL --------
+
+def _latency_ms(model, img_size, runs=10):
+    x = torch.randn(1, 3, img_size, img_size)
+    with torch.no_grad():
+        model(x)
+        times = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            model(x)
+            times.append((time.perf_counter() - t0) * 1000.0)
+    return float(np.median(times))
+
+
+def compare(fp32_model, class_names, frames_dir, cache_dir, weights_path, img_size,
+            calib_dir=None, backend=None, modes=QUANT_MODES):
+    """
+    Bandingkan model quantized dengan FP32 pada folder frame:
+    label agreement, drift probabilitas, akurasi (jika layout ImageFolder), speedup.
+    """
+    fp32_model = fp32_model.cpu().eval()
+    batches = list(load_frame_batches(frames_dir, img_size, with_labels=True))
+    if not batches:
+        raise RuntimeError(f"No frames found in {frames_dir}")
+
+    with torch.no_grad():
+        ref_probs = torch.cat([torch.softmax(fp32_model(b), dim=1) for b, _ in batches]).numpy()
+    labels = [label for _, ls in batches for label in ls]
+    ref_latency = _latency_ms(fp32_model, img_size)
+
+    def accuracy(probs):
+        known = [(i, l) for i, l in enumerate(labels) if l is not None and l in class_names]
+        if not known:
+            return None
+        hits = sum(1 for i, l in known if class_names[int(probs[i].argmax())] == l)
+        return hits / len(known)
+
+    report = [{
+        "mode": "fp32",
+        "latency_ms": ref_latency,
+        "speedup": 1.0,
+        "agreement": 1.0,
+        "mean_prob_drift": 0.0,
+        "max_prob_drift": 0.0,
+        "accuracy": accuracy(ref_probs),
+    }]
+
+    for mode in modes:
+        qmodel = load_or_build_quantized(fp32_model, mode, cache_dir, weights_path, img_size,
+                                         calib_dir=calib_dir or frames_dir, backend=backend)
+        with torch.no_grad():
+            probs = torch.cat([torch.softmax(qmodel(b), dim=1) for b, _ in batches]).numpy()
+        drift = np.abs(probs - ref_probs)
+        latency = _latency_ms(qmodel, img_size)
+        report.append({
+            "mode": mode,
+            "latency_ms": latency,
+            "speedup": ref_latency / latency if latency > 0 else 0.0,
+            "agreement": float((probs.argmax(axis=1) == ref_probs.argmax(axis=1)).mean()),
+            "mean_prob_drift": float(drift.mean()),
+            "max_prob_drift": float(drift.max()),
+            "accuracy": accuracy(probs),
+        })
+    return report
+
+
+def main():
+    from mobilenet_model import ModelHAR, HAR_HIDDEN1, HAR_DROPOUT_RATE
+
+    parser = argparse.ArgumentParser(description="Quantize ModelHAR and compare against FP32")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("build", "compare"):
+        p = sub.add_parser(name)
+        p.add_argument("--weights", default="/app/external/model/densenet_har_nofreeze.pth")
+        p.add_argument("--labels", default="/app/external/model/class_names.pth")
+        p.add_argument("--cache-dir", default=os.getenv("ENGINE_CACHE_DIR", "/app/external/model/engines"))
+        p.add_argument("--calib", default=os.getenv("QUANT_CALIB_DIR"))
+        p.add_argument("--backend", default=os.getenv("QUANT_BACKEND") or None)
+        p.add_argument("--img-size", type=int, default=224)
+        p.add_argument("--mode", choices=QUANT_MODES + ("all",), default="all")
+    sub.choices["compare"].add_argument("--frames", required=True)
+    args = parser.parse_args()
+
+    class_names = torch.load(args.labels)
+    # Weights ImageNet tidak perlu: langsung ditimpa checkpoint HAR di bawah
+    model = ModelHAR(num_classes=len(class_names), hidden1=HAR_HIDDEN1, dropout_rate=HAR_DROPOUT_RATE,
+                     pretrained=False)
+    model.load_state_dict(torch.load(args.weights, map_location="cpu"))
+    model.eval()
+    modes = QUANT_MODES if args.mode == "all" else (args.mode,)
+
+    if args.cmd == "build":
+        for mode in modes:
+            load_or_build_quantized(model, mode, args.cache_dir, args.weights, args.img_size,
+                                    calib_dir=args.calib, backend=args.backend)
+        return
+
+    report = compare(model, class_names, args.frames, args.cache_dir, args.weights, args.img_size,
+                     calib_dir=args.calib, backend=args.backend, modes=modes)
+    print(f"{'mode':<14}{'latency':>10}{'speedup':>9}{'agree':>8}{'drift':>9}{'max':>8}{'acc':>8}")
+    for r in report:
+        acc = f"{r['accuracy']:.3f}" if r["accuracy"] is not None else "-"
+        print(f"{r['mode']:<14}{r['latency_ms']:>8.1f}ms{r['speedup']:>8.2f}x{r['agreement']:>8.3f}"
+              f"{r['mean_prob_drift']:>9.4f}{r['max_prob_drift']:>8.4f}{acc:>8}")
+
+
+if __name__ == "__main__":
+    main()
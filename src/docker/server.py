@@ -1,25 +1,43 @@
 import os
+import gc
 import sys
+import json
+import time
+import asyncio
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # --- FIX: Matikan NNPACK sebelum load torch ---
 os.environ["USE_NNPACK"] = "0"
 
-import cv2
 import torch
 import numpy as np
 from fastapi import FastAPI, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse
 from ultralytics import YOLO
 from torchvision import transforms
 import torch.nn.functional as F
-from PIL import Image
 
 sys.path.append("/app/external")
 
 try:
-    from mobilenet_model import ModelHAR
+    from mobilenet_model import ModelHAR, HAR_HIDDEN1, HAR_DROPOUT_RATE
 except ImportError:
     print("Warning: ModelHAR definition not found. Check volume mapping.")
     class ModelHAR: pass 
+    HAR_HIDDEN1, HAR_DROPOUT_RATE = 640, 0.31417882494899535
+
+import frame_protocol
+from batcher import HARBatcher
+from metrics import Registry, Histogram, Counter, Gauge, BATCH_BUCKETS
+from tracking import PersonTracker
+from frame_cache import FrameResultCache
+from preprocess import resize_crop, resize_crop_pil, check_crops, BatchNormalizer, max_abs_diff
+from engines import (
+    build_har_engine, resolve_yolo_engine, load_check_frame, self_check_har, self_check_yolo, print_report,
+    EagerHAREngine, HAR_ENGINES, YOLO_ENGINES
+)
 
 app = FastAPI()
 
@@ -29,123 +47,764 @@ DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 YOLO_WEIGHTS = "/app/external/model/yolo11n.pt"
 MODEL_WEIGHTS = "/app/external/model/densenet_har_nofreeze.pth"
 LABEL_PATH = "/app/external/model/class_names.pth"
+ENGINE_CACHE_DIR = os.getenv("ENGINE_CACHE_DIR", "/app/external/model/engines")
+
+# Engine: HAR = eager | torchscript | onnx | int8-dynamic | int8-static, YOLO = pytorch | torchscript | onnx
+HAR_ENGINE = os.getenv("HAR_ENGINE", "eager")
+YOLO_ENGINE = os.getenv("YOLO_ENGINE", "pytorch")
+# Kalibrasi int8-static (folder frame contoh), hanya dipakai jika cache belum ada
+QUANT_CALIB_DIR = os.getenv("QUANT_CALIB_DIR", "/app/external/samples")
+QUANT_BACKEND = os.getenv("QUANT_BACKEND") or None
+# Self-check saat startup: off | selected (eager vs engine terpilih) | all
+ENGINE_SELF_CHECK = os.getenv("ENGINE_SELF_CHECK", "selected")
+ENGINE_TOLERANCE = float(os.getenv("ENGINE_TOLERANCE", "1e-3"))
+# Gambar sampel self-check; kosong = gambar pertama di QUANT_CALIB_DIR, atau frame sintetis
+ENGINE_CHECK_IMAGE = os.getenv("ENGINE_CHECK_IMAGE", "")
+
+# Multi-worker (gunicorn --preload): weights dimuat di master lalu dibagi ke worker via fork
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "0") == "1"
+
+# Satu instance YOLO per proses (dipanggil bergantian di bawah lock, paralelisme lewat
+# thread intra-op torch). Engine pytorch dimuat + di-fuse di master saat preload jadi
+# page weights-nya dibagi ke worker. YOLO_SHARED=0: satu instance per thread pool.
+YOLO_SHARED = os.getenv("YOLO_SHARED", "1") == "1"
+
+# Tanpa internet setelah restart: yolo11n.pt di-download sekali ke folder model
+YOLO_ALLOW_DOWNLOAD = os.getenv("YOLO_ALLOW_DOWNLOAD", "1") == "1"
 
 CONF_THRESH = 0.6
 IMG_SIZE = 224
 YOLO_IMGSZ = 224
 
-print(f"Server starting on {DEVICE}...")
+# Micro-batching HAR lintas koneksi
+HAR_MAX_BATCH = int(os.getenv("HAR_MAX_BATCH", "8"))
+HAR_MAX_WAIT_MS = float(os.getenv("HAR_MAX_WAIT_MS", "10"))
 
-# 1. Load YOLO
-try:
-    yolo = YOLO(YOLO_WEIGHTS)
-except Exception as e:
-    print(f"YOLO load error: {e}. Downloading default...")
-    yolo = YOLO("yolo11n.pt")
-
-# 2. Load Labels
-if os.path.exists(LABEL_PATH):
-    class_names = torch.load(LABEL_PATH)
-    print(f"Loaded classes: {class_names}")
-else:
-    class_names = ["Unknown"]
-
-num_classes = len(class_names)
-hidden1 = 640
-dropout_rate = 0.31417882494899535
+# Tracking box orang: YOLO hanya tiap N frame / saat tracking ragu / ada gerakan besar
+TRACKING = os.getenv("TRACKING", "1") == "1"
+TRACK_DETECT_EVERY = int(os.getenv("TRACK_DETECT_EVERY", "10"))
+TRACK_MIN_CONFIDENCE = float(os.getenv("TRACK_MIN_CONFIDENCE", "0.6"))
+TRACK_MOTION_THRESHOLD = float(os.getenv("TRACK_MOTION_THRESHOLD", "8.0"))
 
+# Cache hasil untuk frame yang hampir identik (per koneksi). Default mati: thumbnail 16x16
+# terlalu kasar untuk gesture tangan kecil, hasil sebelum gesture bisa terpakai ulang dan
+# menunda konfirmasi start/stop. Jika dinyalakan, threshold + TTL dibuat ketat.
+FRAME_CACHE = os.getenv("FRAME_CACHE", "0") == "1"
+FRAME_CACHE_THRESHOLD = float(os.getenv("FRAME_CACHE_THRESHOLD", "1.0"))
+FRAME_CACHE_TTL = float(os.getenv("FRAME_CACHE_TTL", "0.5"))
+FRAME_CACHE_SIZE = int(os.getenv("FRAME_CACHE_SIZE", "4"))
+
+# Protokol frame: encoding yang diterima, batas kualitas JPEG, sisi maksimum frame
+# (0 = klien kirim ukuran aslinya). Lihat frame_protocol.py.
+FRAME_ENCODINGS = [e.strip() for e in os.getenv("FRAME_ENCODINGS", "jpeg,raw").split(",") if e.strip()]
+FRAME_JPEG_QUALITY = int(os.getenv("FRAME_JPEG_QUALITY", "80"))
+FRAME_MAX_SIDE = int(os.getenv("FRAME_MAX_SIDE", "0"))
+
+# Thread pool untuk decode / YOLO / preprocess (event loop hanya I/O)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", str(INFERENCE_WORKERS * 2)))
+
+# Selisih maksimum resize cv2 vs transform torchvision lama (satuan ternormalisasi,
+# 1 level piksel ~ 0.0175). Di atas ini warm-up kembali ke resize PIL. Default sedikit di atas
+# selisih terukur crop uji (0.07), jadi regresi di jalur resize langsung ketahuan.
+PREPROCESS_TOLERANCE = float(os.getenv("PREPROCESS_TOLERANCE", "0.08"))
+
+
+server_state = {
+    "ready": False,
+    "error": None,
+    "load_seconds": None,
+    "warmup_seconds": None,
+    "preprocess_max_diff": None,
+    "preprocess_resize": "cv2",
+    "weights_loaded": False,
+}
+
+# Diisi oleh load_models()
+YOLO_MODEL_PATH = None
+class_names = ["Unknown"]
 har_model = None
-try:
-    har_model = ModelHAR(
+har_engine = None
+engine_report = {"input": None, "har": [], "yolo": []}
+
+# 1. Load YOLO
+def ensure_yolo_weights():
+    """
+    Pastikan yolo11n.pt ada di folder model (volume). Download hanya sekali,
+    hasilnya disalin ke YOLO_WEIGHTS supaya restart berikutnya tidak butuh internet.
+    """
+    if os.path.exists(YOLO_WEIGHTS):
+        return YOLO_WEIGHTS
+    if not YOLO_ALLOW_DOWNLOAD:
+        raise RuntimeError(f"YOLO weights not found at {YOLO_WEIGHTS} and YOLO_ALLOW_DOWNLOAD=0")
+
+    print(f"YOLO weights not found at {YOLO_WEIGHTS}. Downloading default...")
+    downloaded = YOLO("yolo11n.pt").ckpt_path
+    try:
+        os.makedirs(os.path.dirname(YOLO_WEIGHTS), exist_ok=True)
+        shutil.copy(downloaded, YOLO_WEIGHTS)
+        return YOLO_WEIGHTS
+    except OSError as e:
+        print(f"Cannot cache YOLO weights to {YOLO_WEIGHTS}: {e}")
+        return downloaded
+
+def load_yolo(path=None):
+    return YOLO(path or YOLO_MODEL_PATH, task="detect")
+
+# Predictor ultralytics tidak thread-safe: instance bersama dipakai di bawah lock,
+# atau (YOLO_SHARED=0) tiap worker thread punya instance sendiri
+shared_yolo = None
+shared_yolo_lock = threading.Lock()
+_yolo_local = threading.local()
+yolo_info = {"shared": YOLO_SHARED, "instances": 0, "loaded_in": None}
+
+def load_shared_yolo(path, where):
+    global shared_yolo
+    model = load_yolo(path)
+    # Fuse Conv+BN sekarang; kalau tidak, predictor mem-fuse saat inference pertama
+    # dan menulis ulang weights (page yang dibagi ke worker ikut ter-copy)
+    model.fuse()
+    shared_yolo = model
+    yolo_info["instances"] = 1
+    yolo_info["loaded_in"] = where
+
+def get_yolo():
+    model = getattr(_yolo_local, "model", None)
+    if model is None:
+        model = load_yolo()
+        _yolo_local.model = model
+        yolo_info["instances"] += 1
+        yolo_info["loaded_in"] = "worker threads"
+    return model
+
+def run_yolo(frame_rgb, **kwargs):
+    if YOLO_SHARED:
+        with shared_yolo_lock:
+            return shared_yolo(frame_rgb, **kwargs)
+    return get_yolo()(frame_rgb, **kwargs)
+
+# 2. Load HAR
+def load_har_model(num_classes):
+    """
+    Bangun ModelHAR tanpa weights ImageNet (langsung ditimpa checkpoint),
+    lalu muat densenet_har_nofreeze.pth via mmap tanpa menyalin tensor.
+    """
+    model = ModelHAR(
         num_classes=num_classes,
-        hidden1=hidden1,
-        dropout_rate=dropout_rate
+        hidden1=HAR_HIDDEN1,
+        dropout_rate=HAR_DROPOUT_RATE,
+        pretrained=False
         )
     if os.path.exists(MODEL_WEIGHTS):
-        state_dict = torch.load(MODEL_WEIGHTS, map_location=DEVICE)
-        har_model.load_state_dict(state_dict)
+        try:
+            state_dict = torch.load(MODEL_WEIGHTS, map_location=DEVICE, mmap=True, weights_only=True)
+            model.load_state_dict(state_dict, assign=True)
+        except Exception as e:
+            # Checkpoint format lama (bukan zip) tidak bisa di-mmap
+            print(f"mmap load failed ({e}), falling back to regular load")
+            state_dict = torch.load(MODEL_WEIGHTS, map_location=DEVICE)
+            model.load_state_dict(state_dict)
         print("HAR Model loaded.")
-    har_model.to(DEVICE)
-    har_model.eval()
-except Exception as e:
-    print(f"Error loading HAR Model: {e}")
+    else:
+        print(f"Warning: {MODEL_WEIGHTS} not found, HAR model has random weights")
+    model.to(DEVICE)
+    model.eval()
+    return model
+
+def run_engine_self_check():
+    """
+    Ukur latency tiap engine dan pastikan label sama dengan eager (dalam toleransi),
+    pada frame sampel tetap (ENGINE_CHECK_IMAGE). Engine yang dipakai server
+    (har_engine, shared_yolo) dipakai ulang; engine pembanding lain hanya dibuat
+    sementara dan dilepas setelah cek, jadi worker tidak menyimpan salinan ekstra.
+    """
+    if ENGINE_SELF_CHECK == "off" or har_model is None:
+        return
+
+    frame, engine_report["input"] = load_check_frame(ENGINE_CHECK_IMAGE, YOLO_IMGSZ, QUANT_CALIB_DIR)
+    print(f"Engine self-check input: {engine_report['input']}")
+
+    yolo_names = YOLO_ENGINES if ENGINE_SELF_CHECK == "all" else sorted({"pytorch", YOLO_ENGINE}, key=YOLO_ENGINES.index)
+    yolo_list = []
+    for name in yolo_names:
+        if name == YOLO_ENGINE and shared_yolo is not None:
+            yolo_list.append((name, shared_yolo))
+            continue
+        try:
+            yolo_list.append((name, load_yolo(resolve_yolo_engine(name, YOLO_WEIGHTS, ENGINE_CACHE_DIR, YOLO_IMGSZ))))
+        except Exception as e:
+            print(f"[SKIP] YOLO {name}: {e}")
+    engine_report["yolo"] = self_check_yolo(yolo_list, frame, YOLO_IMGSZ, CONF_THRESH)
+    print_report("YOLO", engine_report["yolo"])
+
+    # Input HAR = crop orang dari engine YOLO terpilih, seperti jalur inference biasa (+ versi flip)
+    serving_yolo = dict(yolo_list).get(YOLO_ENGINE)
+    box = None
+    if serving_yolo is not None:
+        box = person_box(serving_yolo(frame, imgsz=YOLO_IMGSZ, conf=CONF_THRESH, classes=[0], verbose=False))
+    crop = crop_person(frame, box)
+    resized = resize_crop(crop if crop is not None else frame, IMG_SIZE)
+    batch = BatchNormalizer(IMG_SIZE, 2)([resized, resized[:, ::-1]])
+    del yolo_list, serving_yolo
+
+    har_names = HAR_ENGINES if ENGINE_SELF_CHECK == "all" else sorted({"eager", HAR_ENGINE}, key=HAR_ENGINES.index)
+    har_list = []
+    for name in har_names:
+        if name == HAR_ENGINE and har_engine is not None:
+            har_list.append(har_engine)
+        elif name == "eager":
+            # Wrapper tipis di atas har_model, tanpa salinan weights
+            har_list.append(EagerHAREngine(har_model, DEVICE))
+        else:
+            try:
+                har_list.append(build_har_engine(name, har_model, DEVICE, ENGINE_CACHE_DIR, MODEL_WEIGHTS, IMG_SIZE,
+                                                 calib_dir=QUANT_CALIB_DIR, quant_backend=QUANT_BACKEND))
+            except Exception as e:
+                print(f"[SKIP] HAR {name}: {e}")
+    engine_report["har"] = self_check_har(har_list, batch, ENGINE_TOLERANCE)
+    print_report("HAR", engine_report["har"])
+    del har_list
+    gc.collect()
+
+def load_weights():
+    """
+    Tahap yang tidak menjalankan inference: file weights YOLO, label, ModelHAR.
+    Dengan PRELOAD_MODELS=1 (gunicorn --preload) ini dijalankan sekali di master
+    sebelum fork, sehingga tensor HAR dipakai bersama semua worker (copy-on-write,
+    checkpoint di-mmap dari page cache).
+    """
+    global YOLO_WEIGHTS, class_names, har_model
+
+    t0 = time.perf_counter()
+    print(f"Server starting on {DEVICE}...")
+
+    # 1. YOLO weights (engine pytorch: model bersama dimuat di sini, sebelum fork jika preload)
+    YOLO_WEIGHTS = ensure_yolo_weights()
+    if YOLO_SHARED and YOLO_ENGINE == "pytorch":
+        load_shared_yolo(YOLO_WEIGHTS, "master" if PRELOAD_MODELS else "worker")
+
+    # 2. Labels
+    if os.path.exists(LABEL_PATH):
+        class_names = torch.load(LABEL_PATH)
+        print(f"Loaded classes: {class_names}")
+
+    # 3. HAR model
+    try:
+        har_model = load_har_model(len(class_names))
+    except Exception as e:
+        print(f"Error loading HAR Model: {e}")
+
+    server_state["weights_loaded"] = True
+    server_state["load_seconds"] = time.perf_counter() - t0
+
+def build_engines():
+    """
+    Engine YOLO / HAR + self-check. Selalu dijalankan di proses worker karena
+    export dan inference memakai thread pool torch / onnxruntime yang tidak
+    aman dibuat sebelum fork.
+    """
+    global YOLO_MODEL_PATH, YOLO_ENGINE, HAR_ENGINE, har_engine
+
+    t0 = time.perf_counter()
+    try:
+        YOLO_MODEL_PATH = resolve_yolo_engine(YOLO_ENGINE, YOLO_WEIGHTS, ENGINE_CACHE_DIR, YOLO_IMGSZ)
+    except Exception as e:
+        print(f"YOLO {YOLO_ENGINE} export error: {e}. Using pytorch engine.")
+        YOLO_ENGINE = "pytorch"
+        YOLO_MODEL_PATH = YOLO_WEIGHTS
+    if YOLO_SHARED and shared_yolo is None:
+        # TorchScript / ONNX hasil export: runtime-nya dibuat di worker, satu per proses
+        load_shared_yolo(YOLO_MODEL_PATH, "worker")
+
+    if har_model is not None:
+        try:
+            har_engine = build_har_engine(HAR_ENGINE, har_model, DEVICE, ENGINE_CACHE_DIR, MODEL_WEIGHTS, IMG_SIZE,
+                                          calib_dir=QUANT_CALIB_DIR, quant_backend=QUANT_BACKEND)
+        except Exception as e:
+            print(f"HAR {HAR_ENGINE} engine error: {e}. Using eager engine.")
+            HAR_ENGINE = "eager"
+            har_engine = build_har_engine("eager", har_model, DEVICE, ENGINE_CACHE_DIR, MODEL_WEIGHTS, IMG_SIZE)
+        print(f"HAR engine: {HAR_ENGINE} | YOLO engine: {YOLO_ENGINE}")
+
+    run_engine_self_check()
+    server_state["load_seconds"] = (server_state["load_seconds"] or 0.0) + time.perf_counter() - t0
+
+def load_models():
+    if not server_state["weights_loaded"]:
+        load_weights()
+    build_engines()
+
+if PRELOAD_MODELS:
+    load_weights()
 
 # 4. Transforms
+# Resize crop yang dipakai prepare_frame; warm_up bisa menggantinya ke resize_crop_pil
+resize_crop_fn = resize_crop
+
+# Referensi torchvision, hanya untuk cek kecocokan preprocess cv2/NumPy saat warm-up
 to_tensor = transforms.Compose([
     transforms.Resize((IMG_SIZE, IMG_SIZE)),
     transforms.ToTensor(),
     transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
 ])
 
+# Dipakai hanya dari thread HARBatcher (buffer input dipakai ulang tiap batch)
+har_normalizer = BatchNormalizer(IMG_SIZE, HAR_MAX_BATCH)
+
+def run_har_batch(resized_crops):
+    """
+    Satu forward pass untuk semua crop (uint8, sudah di-resize) dalam batch.
+    Return list (label, confidence, probs) dengan urutan sama seperti input;
+    probs = vektor softmax lengkap (urutan = class_names) untuk smoothing di klien.
+    """
+    logits = torch.from_numpy(har_engine(har_normalizer(resized_crops)))
+    probs = F.softmax(logits, dim=1).numpy()
+
+    results = []
+    for row in probs:
+        top_idx = int(np.argmax(row))
+        top_conf = float(row[top_idx])
+        raw_label = class_names[top_idx] if top_idx < len(class_names) else "Unknown"
+        results.append((raw_label, top_conf, [round(float(p), 4) for p in row]))
+    return results
+
+# -------- METRICS --------
+metrics = Registry()
+stage_seconds = metrics.register(Histogram(
+    "inference_stage_seconds", "Per-frame time spent in each server stage", label_name="stage"))
+har_forward_seconds = metrics.register(Histogram(
+    "inference_har_forward_seconds", "HAR forward pass time per batch"))
+har_batch_size = metrics.register(Histogram(
+    "inference_har_batch_size", "Crops per HAR forward pass", buckets=BATCH_BUCKETS))
+frames_total = metrics.register(Counter(
+    "inference_frames_total", "Frames answered, by result", label_name="result"))
+frames_dropped = metrics.register(Counter(
+    "inference_frames_dropped_total", "Frames received but not answered, by reason", label_name="reason"))
+detector_runs_total = metrics.register(Counter(
+    "inference_detector_runs_total", "YOLO runs (frames not served by the tracker)"))
+
+def observe_batch(size, seconds):
+    har_forward_seconds.observe(seconds)
+    har_batch_size.observe(size)
+
+har_batcher = HARBatcher(run_har_batch, max_batch=HAR_MAX_BATCH, max_wait_ms=HAR_MAX_WAIT_MS,
+                         on_batch=observe_batch)
+
+server_stats = {
+    "active_connections": 0,
+    "frames": 0,
+    "pending": 0,
+    "detector_frames": 0,
+    "detector_runs": 0,
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "cache_evictions": 0,
+    "started_at": time.perf_counter(),
+}
+active_caches = set()
+
+metrics.register(Gauge("inference_active_connections", "Open WebSocket connections",
+                       lambda: server_stats["active_connections"]))
+metrics.register(Gauge("inference_pool_pending", "Frames waiting for or running in the inference thread pool",
+                       lambda: server_stats["pending"]))
+metrics.register(Gauge("inference_har_queue_depth", "Crops waiting for the next HAR batch",
+                       lambda: har_batcher.queue_depth()))
+metrics.register(Gauge("inference_ready", "1 once models are loaded and warmed up",
+                       lambda: int(server_state["ready"])))
+
+class ModelInfo:
+    """Identitas model / engine sebagai label (nilai selalu 1)."""
+    name = "inference_model_info"
+
+    def render(self):
+        labels = {
+            "har_engine": HAR_ENGINE,
+            "yolo_engine": YOLO_ENGINE,
+            "device": str(DEVICE),
+            "har_weights": os.path.basename(MODEL_WEIGHTS),
+            "yolo_weights": os.path.basename(str(YOLO_MODEL_PATH)),
+            "pid": os.getpid(),
+        }
+        inner = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        return [f"# HELP {self.name} Loaded model and engine identity", f"# TYPE {self.name} gauge",
+                f"{self.name}{{{inner}}} 1"]
+
+metrics.register(ModelInfo())
+
+def startup_models():
+    """Load + warm-up di thread terpisah, /ready = 503 sampai selesai."""
+    try:
+        load_models()
+        warm_up()
+        server_state["ready"] = True
+        print(f"Server ready (load {server_state['load_seconds']:.1f}s, warm-up {server_state['warmup_seconds']:.1f}s)")
+    except Exception as e:
+        server_state["error"] = str(e)
+        print(f"Server failed to start: {e}")
+
+@app.on_event("startup")
+async def start_batcher():
+    har_batcher.start()
+    threading.Thread(target=startup_models, name="model-loader", daemon=True).start()
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    await har_batcher.stop()
+    inference_pool.shutdown(wait=False)
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    body = {
+        "ready": server_state["ready"],
+        "error": server_state["error"],
+        "load_seconds": server_state["load_seconds"],
+        "warmup_seconds": server_state["warmup_seconds"],
+        "preprocess_max_diff": server_state["preprocess_max_diff"],
+        "preprocess_resize": server_state["preprocess_resize"],
+    }
+    return JSONResponse(body, status_code=200 if server_state["ready"] else 503)
+
+def worker_memory():
+    """RSS / PSS / USS proses ini dari /proc (Linux), dalam MB."""
+    info = {"pid": os.getpid()}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])  # kB
+        info["rss_mb"] = fields.get("Rss", 0) / 1024.0
+        info["pss_mb"] = fields.get("Pss", 0) / 1024.0
+        info["uss_mb"] = (fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024.0
+        info["shared_mb"] = (fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)) / 1024.0
+    except OSError:
+        pass
+    return info
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    # Dengan gunicorn multi-worker tiap scrape mengenai satu worker (lihat label pid di model_info)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+async def stats():
+    elapsed = time.perf_counter() - server_stats["started_at"]
+    return {
+        "worker": worker_memory(),
+        # Di mana weights dimuat: "master" = dibagi ke semua worker (copy-on-write),
+        # "worker" = satu salinan per proses worker
+        "model_memory": {
+            "yolo": dict(yolo_info, engine=YOLO_ENGINE),
+            "har_weights": "master" if PRELOAD_MODELS else "worker",
+            "har_engine": HAR_ENGINE,
+            "har_engine_copy": "shared weights" if HAR_ENGINE == "eager" else "per worker",
+        },
+        "active_connections": server_stats["active_connections"],
+        "frames": server_stats["frames"],
+        "frames_per_sec": (server_stats["frames"] / elapsed) if elapsed > 0 else 0.0,
+        "inference_pool": {
+            "workers": INFERENCE_WORKERS,
+            "max_pending": INFERENCE_MAX_PENDING,
+            "pending": server_stats["pending"],
+        },
+        "detector": {
+            "tracking": TRACKING,
+            "frames": server_stats["detector_frames"],
+            "runs": server_stats["detector_runs"],
+            "skip_rate": (1.0 - server_stats["detector_runs"] / server_stats["detector_frames"])
+                         if server_stats["detector_frames"] else 0.0,
+        },
+        "frame_cache": {
+            "enabled": FRAME_CACHE,
+            "hits": server_stats["cache_hits"],
+            "misses": server_stats["cache_misses"],
+            "hit_rate": server_stats["cache_hits"] / (server_stats["cache_hits"] + server_stats["cache_misses"])
+                        if (server_stats["cache_hits"] + server_stats["cache_misses"]) else 0.0,
+            "evictions": server_stats["cache_evictions"] + sum(c.evictions for c in active_caches),
+        },
+        "har_batcher": har_batcher.stats(),
+        "engines": {"har": HAR_ENGINE, "yolo": YOLO_ENGINE, "self_check": engine_report},
+    }
+
+def decode_frame(data):
+    """
+    Pesan biner -> (header protokol atau None, frame RGB atau None jika rusak).
+    Mendukung frame_protocol v1 (RAW / JPEG, RGB / BGR / GRAY) dan JPEG BGR lama.
+    """
+    return frame_protocol.decode_frame(data)
+
+def detect_person(frame_rgb):
+    """Box orang terbesar [x1, y1, x2, y2], atau None."""
+    return person_box(run_yolo(frame_rgb, imgsz=YOLO_IMGSZ, conf=CONF_THRESH, classes=[0], verbose=False))
+
+def person_box(results):
+    """Box terbesar dari hasil YOLO."""
+    best_box = None
+    max_area = 0
+
+    if results:
+        for r in results:
+            for box in r.boxes:
+                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                area = (x2 - x1) * (y2 - y1)
+                if area > max_area:
+                    max_area = area
+                    best_box = [int(x1), int(y1), int(x2), int(y2)]
+    return best_box
+
+def crop_person(frame_rgb, best_box):
+    frame_h, frame_w = frame_rgb.shape[:2]
+    if best_box is None:
+        best_box = [0, 0, frame_w, frame_h]
+
+    x1, y1, x2, y2 = best_box
+    x1, y1 = max(0, x1), max(0, y1)
+    x2, y2 = min(frame_w, x2), min(frame_h, y2)
+
+    crop = frame_rgb[y1:y2, x1:x2]
+    if crop.size > 0 and crop.shape[0] > 10 and crop.shape[1] > 10:
+        return crop
+    return None
+
+def prepare_frame(data, tracker=None, cache=None):
+    """
+    Tahap CPU sebelum HAR: decode, cek cache, YOLO / tracking, crop, resize.
+    Dijalankan di thread pool, bukan di event loop. Normalisasi dilakukan
+    sekaligus per batch di HARBatcher.
+
+    Return dict:
+      ok        : frame berhasil di-decode
+      header    : header frame_protocol (None untuk JPEG lama)
+      cached    : response dari cache (frame hampir sama), atau None
+      signature : kunci cache untuk menyimpan hasil frame ini
+      crop      : crop uint8 IMG_SIZE x IMG_SIZE, atau None
+      detected  : YOLO dijalankan untuk frame ini
+      timings   : durasi tiap tahap (ms)
+    """
+    job = {"ok": False, "header": None, "cached": None, "signature": None, "crop": None,
+           "detected": False, "timings": {}}
+    timings = job["timings"]
+
+    t0 = time.perf_counter()
+    job["header"], frame_rgb = decode_frame(data)
+    t1 = time.perf_counter()
+    timings["decode"] = (t1 - t0) * 1000.0
+    if frame_rgb is None:
+        return job
+    job["ok"] = True
+
+    if cache is not None:
+        job["signature"] = cache.signature(frame_rgb)
+        job["cached"] = cache.lookup(job["signature"])
+        t2 = time.perf_counter()
+        timings["cache"] = (t2 - t1) * 1000.0
+        t1 = t2
+        if job["cached"] is not None:
+            return job
+
+    if tracker is not None:
+        detections = tracker.detections
+        best_box = tracker.update(frame_rgb, detect_person)
+        job["detected"] = tracker.detections != detections
+    else:
+        best_box = detect_person(frame_rgb)
+        job["detected"] = True
+    t2 = time.perf_counter()
+    timings["yolo"] = (t2 - t1) * 1000.0
+
+    crop = crop_person(frame_rgb, best_box)
+    if crop is not None:
+        job["crop"] = resize_crop_fn(crop, IMG_SIZE)
+    timings["crop"] = (time.perf_counter() - t2) * 1000.0
+    return job
+
+inference_pool = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+# Backpressure: jumlah frame yang boleh antri/diproses di pool sekaligus.
+# Koneksi yang kebagian menunggu di sini, frame berikutnya tertahan di TCP buffer.
+inference_slots = None
+
+async def run_in_pool(func, *args):
+    global inference_slots
+    if inference_slots is None:
+        inference_slots = asyncio.Semaphore(INFERENCE_MAX_PENDING)
+
+    async with inference_slots:
+        server_stats["pending"] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(inference_pool, func, *args)
+        finally:
+            server_stats["pending"] -= 1
+
+def warm_up():
+    """Inference dummy untuk YOLO (instance bersama / tiap thread pool) dan HAR sebelum server ready."""
+    t0 = time.perf_counter()
+    dummy = np.zeros((YOLO_IMGSZ, YOLO_IMGSZ, 3), dtype=np.uint8)
+
+    if YOLO_SHARED:
+        inference_pool.submit(detect_person, dummy).result()
+    else:
+        # Barrier memaksa tiap thread pool mengambil tepat satu job warm-up,
+        # jadi semua instance YOLO thread-local sudah dimuat.
+        barrier = threading.Barrier(INFERENCE_WORKERS)
+        def warm_thread():
+            detect_person(dummy)
+            try:
+                barrier.wait(timeout=30)
+            except threading.BrokenBarrierError:
+                pass
+
+        for future in [inference_pool.submit(warm_thread) for _ in range(INFERENCE_WORKERS)]:
+            future.result()
+
+    if har_engine is not None:
+        inp = resize_crop(dummy, IMG_SIZE)
+        for n in sorted({1, HAR_MAX_BATCH}):
+            run_har_batch([inp] * n)
+
+    # Cek preprocess cv2/NumPy vs torchvision pada crop uji; di luar toleransi pakai resize PIL
+    global resize_crop_fn
+    diff = max_abs_diff(to_tensor, check_crops(IMG_SIZE), IMG_SIZE)
+    print(f"Preprocess max diff vs torchvision: {diff:.4f} (tolerance {PREPROCESS_TOLERANCE})")
+    if diff > PREPROCESS_TOLERANCE:
+        print("Preprocess cv2 resize out of tolerance, falling back to PIL resize")
+        resize_crop_fn = resize_crop_pil
+        server_state["preprocess_resize"] = "pil"
+        diff = max_abs_diff(to_tensor, check_crops(IMG_SIZE), IMG_SIZE, resize_fn=resize_crop_pil)
+    server_state["preprocess_max_diff"] = diff
+
+    server_state["warmup_seconds"] = time.perf_counter() - t0
+
+def handle_hello(text):
+    """Balas pesan hello klien dengan setting frame hasil negosiasi + daftar label."""
+    try:
+        request = json.loads(text)
+    except ValueError:
+        return {"type": "error", "error": "invalid JSON"}
+    if request.get("type") != "hello":
+        return {"type": "error", "error": f"unknown message type {request.get('type')!r}"}
+
+    reply = frame_protocol.negotiate(request, FRAME_ENCODINGS, FRAME_JPEG_QUALITY, FRAME_MAX_SIDE)
+    reply["labels"] = list(class_names)
+    return reply
+
 @app.websocket("/ws/inference")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    if not server_state["ready"]:
+        # 1013 = Try Again Later, client akan reconnect
+        await websocket.close(code=1013)
+        return
     print("Client connected.")
+    server_stats["active_connections"] += 1
+
+    # ?timings=1 -> response berisi durasi tiap tahap (dipakai benchmark.py)
+    with_timings = websocket.query_params.get("timings") == "1"
+    last_send_ms = 0.0
+
+    tracker = None
+    if TRACKING:
+        tracker = PersonTracker(
+            detect_every=TRACK_DETECT_EVERY,
+            min_confidence=TRACK_MIN_CONFIDENCE,
+            motion_threshold=TRACK_MOTION_THRESHOLD,
+        )
+
+    cache = None
+    if FRAME_CACHE:
+        cache = FrameResultCache(
+            threshold=FRAME_CACHE_THRESHOLD,
+            ttl=FRAME_CACHE_TTL,
+            max_entries=FRAME_CACHE_SIZE,
+        )
+        active_caches.add(cache)
     
     try:
         while True:
-            data = await websocket.receive_bytes()
-            
-            nparr = np.frombuffer(data, np.uint8)
-            frame_rgb = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            if frame_rgb is None:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text") is not None:
+                await websocket.send_json(handle_hello(message["text"]))
+                continue
+            data = message.get("bytes")
+            if not data:
+                continue
+
+            t_recv = time.perf_counter()
+            job = await run_in_pool(prepare_frame, data, tracker, cache)
+            timings = job["timings"]
+            timings["queue"] = max(0.0, (time.perf_counter() - t_recv) * 1000.0 - sum(timings.values()))
+            if not job["ok"]:
                 print("frame kosong / rusak")
+                frames_dropped.inc(label_value="corrupt")
                 continue
-                
-            frame_rgb = cv2.cvtColor(frame_rgb, cv2.COLOR_BGR2RGB)
-            
-            frame_h, frame_w = frame_rgb.shape[:2]
-            
-            response = {
-                "found": False,
-                "label": "Unknown",
-                "confidence": 0.0
-            }
-
-            # A. Deteksi YOLO
-            results = yolo(frame_rgb, imgsz=YOLO_IMGSZ, conf=CONF_THRESH, classes=[0], verbose=False)
-            best_box = None
-            max_area = 0
-            
-            if results:
-                for r in results:
-                    for box in r.boxes:
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        area = (x2 - x1) * (y2 - y1)
-                        if area > max_area:
-                            max_area = area
-                            best_box = [int(x1), int(y1), int(x2), int(y2)]
-
-            if best_box is None:
-                best_box = [0, 0, frame_w, frame_h]
-
-            # B. Klasifikasi
-            if best_box is not None and har_model is not None:
-                x1, y1, x2, y2 = best_box
-                x1, y1 = max(0, x1), max(0, y1)
-                x2, y2 = min(frame_w, x2), min(frame_h, y2)
-                
-                crop = frame_rgb[y1:y2, x1:x2]
-                
-                if crop.size > 0 and crop.shape[0] > 10 and crop.shape[1] > 10:
-                    pil_crop = Image.fromarray(crop)
-                    inp = to_tensor(pil_crop).unsqueeze(0).to(DEVICE)
-
-                    with torch.no_grad():
-                        output = har_model(inp)
-                        probs = F.softmax(output, dim=1).cpu().numpy()[0]
-                        top_idx = int(np.argmax(probs))
-                        top_conf = float(probs[top_idx])
-
-                    raw_label = class_names[top_idx] if top_idx < len(class_names) else "Unknown"
+
+            if job["cached"] is not None:
+                server_stats["cache_hits"] += 1
+                response = job["cached"]
+            else:
+                server_stats["cache_misses"] += int(cache is not None)
+                server_stats["detector_frames"] += 1
+                server_stats["detector_runs"] += int(job["detected"])
+                if job["detected"]:
+                    detector_runs_total.inc()
+                inp = job["crop"]
+
+                response = {
+                    "found": False,
+                    "label": "Unknown",
+                    "confidence": 0.0
+                }
+
+                # Klasifikasi (forward pass digabung dengan crop dari koneksi lain)
+                if inp is not None and har_engine is not None:
+                    t_har = time.perf_counter()
+                    raw_label, top_conf, probs = await har_batcher.submit(inp)
+                    timings["har"] = (time.perf_counter() - t_har) * 1000.0
                     print(f"label detected: {raw_label}")
-                    
+
                     response["found"] = True
                     response["label"] = raw_label
                     response["confidence"] = top_conf
+                    response["probs"] = probs
+
+                if cache is not None:
+                    cache.store(job["signature"], response)
+
+            header = job["header"]
+            if header is not None:
+                # Echo sequence + timestamp capture supaya klien bisa mencocokkan balasan
+                response = dict(response, seq=header.seq, capture_ts=header.capture_ts)
+
+            if with_timings:
+                # Waktu kirim frame ini baru diketahui setelah send, jadi yang dilaporkan send frame sebelumnya
+                timings["send"] = last_send_ms
+                response = dict(response, timings=timings)
 
             # Kirim hasil balik ke client
+            t_send = time.perf_counter()
             await websocket.send_json(response)
+            last_send_ms = (time.perf_counter() - t_send) * 1000.0
+            server_stats["frames"] += 1
+
+            for stage, ms in timings.items():
+                if stage != "send":
+                    stage_seconds.observe(ms / 1000.0, stage)
+            stage_seconds.observe(last_send_ms / 1000.0, "send")
+            if job["cached"] is not None:
+                frames_total.inc(label_value="cached")
+            else:
+                frames_total.inc(label_value="classified" if response["found"] else "no_person")
 
     except Exception as e:
-        print(f"Connection closed/error: {e}")
\ No newline at end of file
+        print(f"Connection closed/error: {e}")
+    finally:
+        server_stats["active_connections"] -= 1
+        if cache is not None:
+            active_caches.discard(cache)
+            server_stats["cache_evictions"] += cache.evictions
\ No newline at end of file
@@ -0,0 +1,113 @@
+import cv2
+import numpy as np
+
+
+class PersonTracker:
+    """
+    Tracker box orang per koneksi supaya YOLO tidak jalan di setiap frame.
+
+    Di antara deteksi, box digeser dengan template matching (crop grayscale dari
+    deteksi terakhir dicari di sekitar box lama). YOLO dijalankan ulang jika:
+    - sudah `detect_every` frame sejak deteksi terakhir,
+    - skor template matching (confidence tracking) di bawah `min_confidence`,
+    - gerakan (mean abs diff thumbnail grayscale vs frame deteksi) di atas `motion_threshold`.
+    """
+
+    def __init__(self, detect_every=10, min_confidence=0.6, motion_threshold=8.0,
+                 search_margin=0.25, thumb_size=32):
+        self.detect_every = max(1, int(detect_every))
+        self.min_confidence = min_confidence
+        self.motion_threshold = motion_threshold
+        self.search_margin = search_margin
+        self.thumb_size = thumb_size
+
+        self.box = None
+        self.confidence = 0.0
+        self._template = None
+        self._ref_thumb = None
+        self._frame_shape = None
+        self._since_detect = 0
+
+        self.frames = 0
+        self.detections = 0
+        self.reasons = {"first": 0, "interval": 0, "confidence": 0, "motion": 0}
+
+    def _thumb(self, gray):
+        return cv2.resize(gray, (self.thumb_size, self.thumb_size), interpolation=cv2.INTER_AREA)
+
+    def _detect(self, frame_rgb, gray, detect_fn, reason):
+        self.detections += 1
+        self.reasons[reason] += 1
+        self._since_detect = 0
+        self._ref_thumb = self._thumb(gray)
+        self._frame_shape = gray.shape
+
+        box = detect_fn(frame_rgb)
+        if box is None:
+            self.box, self._template, self.confidence = None, None, 0.0
+            return None
+
+        h, w = gray.shape[:2]
+        x1, y1, x2, y2 = box
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(w, x2), min(h, y2)
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            self.box, self._template, self.confidence = None, None, 0.0
+            return None
+
+        self.box = [x1, y1, x2, y2]
+        self._template = gray[y1:y2, x1:x2].copy()
+        self.confidence = 1.0
+        return self.box
+
+    def _track(self, gray):
+        """Geser box ke posisi template terbaik di area sekitar box lama."""
+        h, w = gray.shape[:2]
+        x1, y1, x2, y2 = self.box
+        mx = int((x2 - x1) * self.search_margin)
+        my = int((y2 - y1) * self.search_margin)
+        sx1, sy1 = max(0, x1 - mx), max(0, y1 - my)
+        sx2, sy2 = min(w, x2 + mx), min(h, y2 + my)
+
+        window = gray[sy1:sy2, sx1:sx2]
+        th, tw = self._template.shape[:2]
+        if window.shape[0] < th or window.shape[1] < tw:
+            return 0.0
+
+        scores = cv2.matchTemplate(window, self._template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = cv2.minMaxLoc(scores)
+        nx1, ny1 = sx1 + dx, sy1 + dy
+        self.box = [nx1, ny1, nx1 + tw, ny1 + th]
+        return float(score)
+
+    def update(self, frame_rgb, detect_fn):
+        """Return box orang [x1, y1, x2, y2] untuk frame ini (atau None)."""
+        self.frames += 1
+        self._since_detect += 1
+        gray = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2GRAY)
+
+        if self._ref_thumb is None or gray.shape != self._frame_shape:
+            return self._detect(frame_rgb, gray, detect_fn, "first")
+        if self._since_detect >= self.detect_every:
+            return self._detect(frame_rgb, gray, detect_fn, "interval")
+
+        motion = float(np.mean(cv2.absdiff(self._thumb(gray), self._ref_thumb)))
+        if motion > self.motion_threshold:
+            return self._detect(frame_rgb, gray, detect_fn, "motion")
+
+        if self.box is None:
+            # Tidak ada orang saat deteksi terakhir dan scene tidak berubah
+            return None
+
+        self.confidence = self._track(gray)
+        if self.confidence < self.min_confidence:
+            return self._detect(frame_rgb, gray, detect_fn, "confidence")
+        return self.box
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "detections": self.detections,
+            "skip_rate": (1.0 - self.detections / self.frames) if self.frames else 0.0,
+            "reasons": dict(self.reasons),
+        }
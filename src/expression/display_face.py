@@ -1,12 +1,10 @@
 import os
 from PIL import Image, ImageOps
-from luma.core.interface.serial import spi
-from luma.lcd.device import st7789
 from src.expression.face_map import FACE_MAPPING
+from src.hal.display import create_display
 
-serial = spi(port=0, device=0, gpio_DC=25, gpio_RST=24, speed_hz=24000000, spi_mode=0)
-device = st7789(serial, width=240, height=240, rotate=0, bgr=True, gpio_LIGHT=18, active_low=False)
-device.backlight(True)
+# ST7789 lewat SPI, atau display palsu yang merekam frame jika BOT_HAL=mock
+device = create_display(240, 240)
 
 IMAGE_CACHE = {}
 
@@ -25,6 +23,7 @@ def preload_images():
             img = Image.open(file_path).convert("RGB")
             
             img_processed = ImageOps.fit(img, (240, 240), method=Image.LANCZOS, centering=(0.5, 0.5))
+            img_processed.info["face_id"] = face_id
             
             IMAGE_CACHE[face_id] = img_processed
             print(f"[OK] {face_id}")
@@ -0,0 +1,34 @@
+"""
+Hardware abstraction layer. BOT_HAL=pi (default) memakai hardware asli
+(RPi.GPIO, display SPI ST7789, kamera V4L2, inference server Docker);
+BOT_HAL=mock mengganti semuanya dengan pengganti in-memory supaya main.py
+jalan end-to-end di Linux biasa (CI, benchmark):
+
+- gpio.py: GPIO/PWM palsu, tiap perubahan duty cycle direkam ke timeline
+- display.py: display palsu, tiap frame direkam (waktu, face id, ukuran)
+- camera.py: kamera dari file video / gambar (atau frame sintetis)
+- inference.py: koneksi inference server lokal palsu dengan skrip label
+"""
+import os
+
+from dotenv import load_dotenv
+
+# Dibaca saat import (sebelum main.py sempat load_dotenv), jadi .env dimuat di sini
+load_dotenv()
+
+BOT_HAL = os.getenv("BOT_HAL", "pi")
+MOCK = BOT_HAL == "mock"
+
+# Jumlah event maksimum yang disimpan per timeline (GPIO, display)
+BOT_MOCK_TIMELINE_SIZE = int(os.getenv("BOT_MOCK_TIMELINE_SIZE", "100000"))
+
+
+def report():
+    """Timeline semua perangkat palsu (untuk BOT_MOCK_REPORT)."""
+    from src.hal.display import MOCK_DISPLAYS
+    from src.hal.gpio import GPIO
+
+    return {
+        "pwm": [pwm.report() for pwm in getattr(GPIO, "pwms", [])],
+        "display": [display.report() for display in MOCK_DISPLAYS],
+    }
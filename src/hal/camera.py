@@ -0,0 +1,143 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+# File video, pola gambar (mis. frames/img_%04d.jpg) atau satu gambar; kosong = frame sintetis
+BOT_MOCK_CAMERA = os.getenv("BOT_MOCK_CAMERA", "")
+BOT_MOCK_CAMERA_FPS = float(os.getenv("BOT_MOCK_CAMERA_FPS", "30"))
+BOT_MOCK_CAMERA_LOOP = os.getenv("BOT_MOCK_CAMERA_LOOP", "1") == "1"
+# 0 = grab secepat mungkin (benchmark throughput), 1 = tempo kamera asli
+BOT_MOCK_CAMERA_REALTIME = os.getenv("BOT_MOCK_CAMERA_REALTIME", "1") == "1"
+
+
+def synthetic_frames(width=240, height=240, count=30):
+    """Frame BGR sintetis: kotak bergerak di latar abu-abu (ada gerakan untuk sampler)."""
+    frames = []
+    for i in range(count):
+        frame = np.full((height, width, 3), 96, np.uint8)
+        x = int((width - 60) * i / max(1, count - 1))
+        cv2.rectangle(frame, (x, height // 3), (x + 60, height // 3 + 60), (40, 160, 220), -1)
+        frames.append(frame)
+    return frames
+
+
+class FileCapture:
+    """
+    Pengganti cv2.VideoCapture dari file (atau frame sintetis jika `path`
+    kosong). Realtime: grab ditahan ke tempo `fps` tanpa drift seperti kamera
+    asli; `loop`: mulai lagi dari awal saat file habis, kalau tidak `finished`.
+
+    Gambar tunggal dan frame sintetis disimpan di RAM, video dibaca lewat
+    cv2.VideoCapture.
+    """
+
+    def __init__(self, path="", fps=30.0, loop=True, realtime=True, width=240, height=240):
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.realtime = realtime
+        self.width = width
+        self.height = height
+
+        self._video = None
+        self._frames = None
+        if not path:
+            self._frames = synthetic_frames(width, height)
+        elif os.path.isfile(path) and cv2.haveImageReader(path):
+            self._frames = [cv2.imread(path)]
+        else:
+            self._video = cv2.VideoCapture(path)
+
+        self._opened = self._frames is not None or self._video.isOpened()
+        self._index = -1
+        self._frame = None
+        self._next_due = None
+        self.grabbed = 0
+        self.finished = False
+
+    def isOpened(self):
+        return self._opened
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            self.width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            self.height = int(value)
+        elif prop == cv2.CAP_PROP_FPS:
+            self.fps = float(value)
+        else:
+            return False
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def _pace(self):
+        now = time.monotonic()
+        if self._next_due is None:
+            self._next_due = now
+        delay = self._next_due - now
+        if delay > 0:
+            time.sleep(delay)
+        self._next_due += 1.0 / self.fps
+
+    def _next_frame(self):
+        if self._frames is not None:
+            self._index += 1
+            if self._index >= len(self._frames):
+                if not self.loop:
+                    return None
+                self._index = 0
+            return self._frames[self._index]
+
+        ok, frame = self._video.read()
+        if not ok and self.loop:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._video.read()
+        return frame if ok else None
+
+    def grab(self):
+        if not self._opened or self.finished:
+            return False
+        if self.realtime:
+            self._pace()
+        frame = self._next_frame()
+        if frame is None:
+            self.finished = True
+            return False
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        self._frame = frame
+        self.grabbed += 1
+        return True
+
+    def retrieve(self, image=None, flag=None):
+        if self._frame is None:
+            return False, None
+        if image is not None and image.shape == self._frame.shape and image.dtype == self._frame.dtype:
+            np.copyto(image, self._frame)
+            return True, image
+        return True, self._frame.copy()
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def release(self):
+        self._opened = False
+        if self._video is not None:
+            self._video.release()
+
+
+def open_mock_camera():
+    return FileCapture(BOT_MOCK_CAMERA, fps=BOT_MOCK_CAMERA_FPS, loop=BOT_MOCK_CAMERA_LOOP,
+                       realtime=BOT_MOCK_CAMERA_REALTIME)
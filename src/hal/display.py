@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+from collections import deque
+
+from src.hal import BOT_MOCK_TIMELINE_SIZE, MOCK
+
+# Opsional: simpan tiap frame display palsu sebagai PNG ke folder ini
+BOT_MOCK_DISPLAY_DIR = os.getenv("BOT_MOCK_DISPLAY_DIR", "")
+
+MOCK_DISPLAYS = []
+
+
+class MockDisplay:
+    """
+    Pengganti device luma (st7789): `display(image)` direkam sebagai
+    (ts, face id, ukuran). Face id diambil dari image.info["face_id"] (diisi
+    preload_images), jadi timeline bisa dibaca tanpa membandingkan piksel.
+    """
+
+    def __init__(self, width=240, height=240, save_dir=BOT_MOCK_DISPLAY_DIR):
+        self.width = width
+        self.height = height
+        self.save_dir = save_dir
+        self.backlight_on = False
+        self.frames = 0
+        self.timeline = deque(maxlen=BOT_MOCK_TIMELINE_SIZE)
+        self._lock = threading.Lock()
+        if save_dir:
+            os.makedirs(save_dir, exist_ok=True)
+        MOCK_DISPLAYS.append(self)
+
+    def backlight(self, value):
+        self.backlight_on = bool(value)
+
+    def display(self, image):
+        ts = time.time()
+        face_id = getattr(image, "info", {}).get("face_id")
+        with self._lock:
+            self.frames += 1
+            index = self.frames
+            self.timeline.append((ts, face_id, getattr(image, "size", None)))
+        if self.save_dir:
+            image.save(os.path.join(self.save_dir, f"{index:06d}_{face_id or 'frame'}.png"))
+
+    def report(self):
+        with self._lock:
+            timeline = list(self.timeline)
+        return {"frames": self.frames, "backlight": self.backlight_on, "timeline": timeline}
+
+
+def create_display(width=240, height=240):
+    """Display ST7789 lewat SPI, atau MockDisplay jika BOT_HAL=mock."""
+    if MOCK:
+        device = MockDisplay(width, height)
+    else:
+        from luma.core.interface.serial import spi
+        from luma.lcd.device import st7789
+
+        serial = spi(port=0, device=0, gpio_DC=25, gpio_RST=24, speed_hz=24000000, spi_mode=0)
+        device = st7789(serial, width=width, height=height, rotate=0, bgr=True, gpio_LIGHT=18, active_low=False)
+    device.backlight(True)
+    return device
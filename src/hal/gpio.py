@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import deque
+
+from src.hal import BOT_MOCK_TIMELINE_SIZE, MOCK
+
+
+class MockPWM:
+    """Pengganti RPi.GPIO.PWM: tiap start / ChangeDutyCycle / stop direkam (ts, duty)."""
+
+    def __init__(self, pin, frequency):
+        self.pin = pin
+        self.frequency = frequency
+        self.duty = 0.0
+        self.running = False
+        self.changes = 0
+        self.timeline = deque(maxlen=BOT_MOCK_TIMELINE_SIZE)
+        self._lock = threading.Lock()
+
+    def _record(self, duty):
+        with self._lock:
+            self.duty = duty
+            self.changes += 1
+            self.timeline.append((time.time(), duty))
+
+    def start(self, duty):
+        self.running = True
+        self._record(float(duty))
+
+    def ChangeDutyCycle(self, duty):
+        self._record(float(duty))
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def stop(self):
+        self.running = False
+        self._record(0.0)
+
+    def report(self):
+        with self._lock:
+            timeline = list(self.timeline)
+        return {
+            "pin": self.pin,
+            "frequency": self.frequency,
+            "changes": self.changes,
+            "duty": self.duty,
+            "timeline": timeline,
+        }
+
+
+class MockGPIO:
+    """Pengganti modul RPi.GPIO (subset yang dipakai MoveServo)."""
+
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+
+    def __init__(self):
+        self.mode = None
+        self.pins = {}
+        self.pwms = []
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, initial=LOW):
+        self.pins[pin] = initial
+
+    def output(self, pin, value):
+        self.pins[pin] = value
+
+    def input(self, pin):
+        return self.pins.get(pin, self.LOW)
+
+    def PWM(self, pin, frequency):
+        pwm = MockPWM(pin, frequency)
+        self.pwms.append(pwm)
+        return pwm
+
+    def cleanup(self, pin=None):
+        if pin is None:
+            self.pins.clear()
+        else:
+            self.pins.pop(pin, None)
+
+
+if MOCK:
+    GPIO = MockGPIO()
+else:
+    import RPi.GPIO as GPIO
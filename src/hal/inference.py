@@ -0,0 +1,114 @@
+import json
+import os
+import queue
+import time
+
+from websocket import WebSocketTimeoutException
+
+from src.docker.frame_protocol import HEADER, VERSION
+
+# Skrip label yang "dilihat" server palsu: label:detik dipisah koma, berulang.
+# Waktu dihitung dari capture_ts frame pertama; "none" = tidak ada deteksi.
+BOT_MOCK_SCRIPT = os.getenv(
+    "BOT_MOCK_SCRIPT",
+    "sitting:5,start_pomodoro:4,using_laptop:60,phone:10,writing:30,stop_pomodoro:8,none:10",
+)
+BOT_MOCK_RTT_MS = float(os.getenv("BOT_MOCK_RTT_MS", "40"))
+BOT_MOCK_CONFIDENCE = float(os.getenv("BOT_MOCK_CONFIDENCE", "0.95"))
+
+NO_DETECTION = "none"
+
+
+def parse_script(text):
+    """ "a:5,b:3" -> [("a", 5.0), ("b", 3.0)] """
+    script = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        label, _, seconds = part.rpartition(":")
+        script.append((label.strip(), float(seconds)))
+    if not script:
+        raise ValueError("BOT_MOCK_SCRIPT is empty")
+    return script
+
+
+class MockInferenceConnection:
+    """
+    Pengganti koneksi websocket-client ke inference server: menjawab hello
+    dan tiap frame biner dengan label dari skrip pada capture_ts frame itu,
+    setelah `rtt` detik. Tidak ada decode / model, jadi biaya server nol dan
+    latency yang terukur murni dari pipeline robot + `rtt`.
+    """
+
+    def __init__(self, script, rtt=0.04, confidence=0.95, timeout=2.0):
+        self.script = script
+        self.cycle = sum(seconds for _, seconds in script)
+        self.rtt = rtt
+        self.confidence = confidence
+        self.timeout = timeout
+        self.connected = True
+        self._inbox = queue.Queue()
+        self._t0 = None
+        self.replies = 0
+
+    def label_at(self, capture_ts):
+        if self._t0 is None:
+            self._t0 = capture_ts
+        t = (capture_ts - self._t0) % self.cycle if self.cycle > 0 else 0.0
+        for label, seconds in self.script:
+            if t < seconds:
+                return label
+            t -= seconds
+        return self.script[-1][0]
+
+    def send(self, text):
+        request = json.loads(text)
+        if request.get("type") == "hello":
+            encodings = request.get("encodings") or ["jpeg"]
+            labels = sorted({label for label, _ in self.script if label != NO_DETECTION})
+            reply = {
+                "type": "hello",
+                "version": VERSION,
+                "encoding": encodings[0],
+                "jpeg_quality": request.get("jpeg_quality", 80),
+                "max_side": request.get("max_side", 0),
+                "labels": labels,
+            }
+            self._inbox.put((0.0, json.dumps(reply)))
+
+    def send_binary(self, payload):
+        seq, capture_ts = HEADER.unpack_from(payload)[-2:]
+        label = self.label_at(capture_ts)
+        found = label != NO_DETECTION
+        reply = {
+            "found": found,
+            "label": label if found else "",
+            "confidence": self.confidence if found else 0.0,
+            "seq": seq,
+            "capture_ts": capture_ts,
+        }
+        self.replies += 1
+        self._inbox.put((time.monotonic() + self.rtt, json.dumps(reply)))
+
+    def recv(self):
+        if not self.connected:
+            raise ConnectionError("mock connection closed")
+        try:
+            due, message = self._inbox.get(timeout=self.timeout)
+        except queue.Empty:
+            raise WebSocketTimeoutException("mock recv timeout")
+        # Balasan FIFO dengan RTT sama, jadi cukup tunggu sampai jatuh tempo
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        return message
+
+    def close(self):
+        self.connected = False
+
+
+def mock_connect(url, timeout):
+    """connect_fn untuk PipelinedInferenceClient saat BOT_HAL=mock."""
+    return MockInferenceConnection(parse_script(BOT_MOCK_SCRIPT), rtt=BOT_MOCK_RTT_MS / 1000.0,
+                                   confidence=BOT_MOCK_CONFIDENCE, timeout=timeout)
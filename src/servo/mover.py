@@ -1,4 +1,4 @@
-import RPi.GPIO as GPIO
+from src.hal.gpio import GPIO
 import time
 
 class MoveServo:
@@ -29,10 +29,20 @@ class MoveServo:
         # Kita tidak mematikan output di sini agar gerakan halus terjaga
         # selama loop work/break move.
 
-    def work_move(self, duration: float):
+    def _wait(self, seconds, cancel=None):
+        """
+        Tunggu antar langkah gerakan. Return True jika `cancel` (threading.Event)
+        di-set, supaya gerakan panjang bisa dihentikan perintah baru.
+        """
+        if cancel is None:
+            time.sleep(seconds)
+            return False
+        return cancel.wait(seconds)
+
+    def work_move(self, duration: float, cancel=None):
         """
         Bergerak dari 0 ke 180 derajat secara bertahap
-        selama durasi yang ditentukan.
+        selama durasi yang ditentukan. Berhenti di tempat jika `cancel` di-set.
         """
         print(f"Starting work_move: 0 -> 180 degrees in {duration} seconds.")
         start_angle = 180
@@ -44,15 +54,16 @@ class MoveServo:
         
         for angle in range(start_angle, end_angle - 1, -1):
             self._set_angle(angle)
-            time.sleep(step_delay)
+            if self._wait(step_delay, cancel):
+                break
             
         # Matikan sinyal sebentar untuk mencegah jitter setelah selesai
         self.pwm.ChangeDutyCycle(0)
 
-    def break_move(self, duration: float):
+    def break_move(self, duration: float, cancel=None):
         """
         Bergerak dari 180 ke 0 derajat (mundur/-180) secara bertahap
-        selama durasi yang ditentukan.
+        selama durasi yang ditentukan. Berhenti di tempat jika `cancel` di-set.
         """
         print(f"Starting break_move: 180 -> 0 degrees in {duration} seconds.")
         start_angle = 0
@@ -63,28 +74,29 @@ class MoveServo:
         # Loop mundur dari 180 ke 0
         for angle in range(start_angle, end_angle + 1):
             self._set_angle(angle)
-            time.sleep(step_delay)
+            if self._wait(step_delay, cancel):
+                break
 
         self.pwm.ChangeDutyCycle(0)
 
-    def default_move(self):
+    def default_move(self, cancel=None):
         """
         Bergerak ke 180 derajat
         """
         print("Move to default")
         self._set_angle(180)
-        time.sleep(0.5)
+        self._wait(0.5, cancel)
         self.pwm.ChangeDutyCycle(0)
 
-    def zero_move(self):
+    def zero_move(self, cancel=None):
         """
         Bergerak ke 0 derajat
         """
         print("Move to 0")
         self._set_angle(0)
-        time.sleep(0.5)
+        self._wait(0.5, cancel)
 
-    def taunt(self):
+    def taunt(self, cancel=None):
         """
         Gerakan mengejek: 45 derajat ke kanan dan kiri (relative to center)
         sebanyak 4 kali.
@@ -100,15 +112,18 @@ class MoveServo:
         for _ in range(2):
             # Gerak ke +45
             self._set_angle(pos_high)
-            time.sleep(self.taunt_speed)
+            if self._wait(self.taunt_speed, cancel):
+                break
             
             # Gerak ke -45
             self._set_angle(pos_low)
-            time.sleep(self.taunt_speed)
+            if self._wait(self.taunt_speed, cancel):
+                break
             
-        # Kembali ke posisi idle
-        self._set_angle(180)
-        time.sleep(0.8)
+        # Kembali ke posisi idle (dilewati jika dibatalkan: perintah baru yang menentukan posisi)
+        if cancel is None or not cancel.is_set():
+            self._set_angle(180)
+            self._wait(0.8, cancel)
         self.pwm.ChangeDutyCycle(0)
 
     def cleanup(self):